@@ -0,0 +1,49 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import structlog
+
+from power_stash.config import DATA_DIR
+
+logger = structlog.get_logger()
+
+DEFAULT_CACHE_DIR = DATA_DIR / "cache" / "entsoe"
+
+
+class FrameCache:
+    """Local cache of raw frames, stored as pickle files in `folder/namespace/key.pkl`.
+
+    Only meant for frames produced by this package on the same host (pickle files are trusted).
+    """
+
+    def __init__(self, folder: Path = DEFAULT_CACHE_DIR) -> None:
+        self.folder = folder
+
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.folder / namespace / f"{key}.pkl"
+
+    def get(self, namespace: str, key: str) -> pd.DataFrame | None:
+        """Load a cached frame, None if missing."""
+        path = self._path(namespace, key)
+        if not path.exists():
+            return None
+        try:
+            return pd.read_pickle(path)  # noqa: S301
+        except Exception as e:
+            # e.g. partially written file, fetch again
+            logger.warning(event="Invalid cached frame, ignoring.", path=path, error=e)
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, namespace: str, key: str, df: pd.DataFrame) -> None:
+        """Cache a frame, written atomically."""
+        path = self._path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        df.to_pickle(tmp_path)
+        tmp_path.replace(path)
+
+    def clear(self, namespace: str) -> None:
+        """Remove all the frames of a namespace."""
+        shutil.rmtree(self.folder / namespace, ignore_errors=True)
@@ -1,6 +1,31 @@
+from enum import Enum
+from functools import lru_cache
+
 from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings
 
+from power_stash.inputs.http import (
+    DEFAULT_CONNECT_TIMEOUT_SECS,
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_READ_TIMEOUT_SECS,
+)
+
+
+class GenerationLayout(str, Enum):
+    # a row by timestamp and production type, c.f. `EntsoeHourlyGeneration`
+    LONG = "long"
+    # a row by timestamp, with a column by production type, c.f. `EntsoeHourlyGenerationWide`
+    WIDE = "wide"
+
+
+class ResolutionMode(str, Enum):
+    # series are stored as fetched, e.g. quarter-hourly load in the hourly tables
+    NATIVE = "native"
+    # sub-hourly series are averaged by hour, only the hourly series are stored
+    HOURLY = "hourly"
+    # sub-hourly series are also stored as fetched, c.f. `EntsoeNativeConsumption`
+    BOTH = "both"
+
 
 class EntsoeEnv(BaseSettings):
     security_token: SecretStr = Field(
@@ -8,3 +33,50 @@ class EntsoeEnv(BaseSettings):
         description="Web Api Security Token from the ENTSO-E platform.",
         alias="entsoe_security_token",
     )
+    generation_psr_workers: int = Field(
+        default=0,
+        description="""
+        Fetch generation with concurrent sub-requests by production type (psr_type),
+        0 to fetch all production types in a single request.
+        """,
+        alias="entsoe_generation_psr_workers",
+    )
+    capacity_year_workers: int = Field(
+        default=4,
+        description="Number of years of installed capacity fetched concurrently.",
+        alias="entsoe_capacity_year_workers",
+    )
+    streaming_parser: bool = Field(
+        default=True,
+        description="Parse generation documents with the streaming parser instead of entsoe-py.",
+        alias="entsoe_streaming_parser",
+    )
+    http_pool_maxsize: int = Field(
+        default=DEFAULT_POOL_MAXSIZE,
+        description="Number of keep-alive connections to the API kept open by each process.",
+        alias="entsoe_http_pool_maxsize",
+    )
+    connect_timeout_secs: float = Field(
+        default=DEFAULT_CONNECT_TIMEOUT_SECS,
+        alias="entsoe_connect_timeout_secs",
+    )
+    read_timeout_secs: float = Field(
+        default=DEFAULT_READ_TIMEOUT_SECS,
+        alias="entsoe_read_timeout_secs",
+    )
+    generation_layout: GenerationLayout = Field(
+        default=GenerationLayout.LONG,
+        description="Table generation is stored to, the long layout is also exposed as a view.",
+        alias="entsoe_generation_layout",
+    )
+    resolution_mode: ResolutionMode = Field(
+        default=ResolutionMode.NATIVE,
+        description="Normalization of sub-hourly load and generation to the hourly tables.",
+        alias="entsoe_resolution_mode",
+    )
+
+
+@lru_cache(maxsize=1)
+def get_entsoe_env() -> EntsoeEnv:
+    """Load the ENTSO-E settings once, on first use rather than at import time."""
+    return EntsoeEnv()  # type: ignore
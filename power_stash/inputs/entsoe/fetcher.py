@@ -1,40 +1,210 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
 import structlog
 from entsoe import Area, EntsoePandasClient
-from entsoe.exceptions import NoMatchingDataError
+from entsoe.decorators import year_limited
+from entsoe.exceptions import InvalidPSRTypeError, NoMatchingDataError
+from entsoe.mappings import PSRTYPE_MAPPINGS, lookup_area
 from entsoe.misc import year_blocks
 from entsoe.parsers import parse_generation
 from pandas.tseries.offsets import YearBegin, YearEnd
 from requests import HTTPError
-from tenacity import (
-    retry,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_exponential,
-    wait_fixed,
-)
-
-from power_stash.inputs.entsoe.config import EntsoeEnv
+
+from power_stash.inputs.entsoe.cache import FrameCache
+from power_stash.inputs.entsoe.config import get_entsoe_env
+from power_stash.inputs.entsoe.parsers import parse_generation as parse_generation_streaming
 from power_stash.inputs.entsoe.request import EntsoeRequest, RequestType
+from power_stash.inputs.http import get_session
 from power_stash.models.fetcher import FetcherInterface
 
 logger = structlog.get_logger()
 
-entsoe_env = EntsoeEnv()  # type: ignore
-
 DEFAULT_RESOLUTION_DAY_HEAD_PRICE: str = "60T"
 
 RETURN_NET_GENERATTION: bool = False
 
-MAX_RETRY = 3
-MAX_WAIT_PERIOD = 60
+# production types (psr_type) reported in the actual generation per production type.
+GENERATION_PSR_TYPES: list[str] = [
+    t for t in PSRTYPE_MAPPINGS if t.startswith("B") and t not in ("B21", "B22", "B23", "B24")
+]
+
+
+class IncompleteFetchError(Exception):
+    """Raised when some sub-requests of a request failed, the others being cached."""
 
 
 class EntsoeFetcher(FetcherInterface):
     def __init__(self) -> None:
+        entsoe_env = get_entsoe_env()
+        # keep-alive connections are shared by all the fetchers (and threads) of the process.
+        self.session = get_session(pool_maxsize=entsoe_env.http_pool_maxsize)
         self.client = EntsoePandasClient(
             api_key=entsoe_env.security_token.get_secret_value(),
+            session=self.session,
+            # no retries (nor sleeps) inside the worker, failed requests are rescheduled by the
+            # service c.f. `power_stash.services.retry`.
+            retry_count=1,
+            retry_delay=0,
+            timeout=(entsoe_env.connect_timeout_secs, entsoe_env.read_timeout_secs),
         )
+        self.generation_psr_workers = entsoe_env.generation_psr_workers
+        self.capacity_year_workers = entsoe_env.capacity_year_workers
+        self.streaming_parser = entsoe_env.streaming_parser
+        self.cache = FrameCache()
+
+    def _parse_generation(self, text: str, nett: bool = False) -> pd.DataFrame:
+        if self.streaming_parser:
+            return parse_generation_streaming(text, nett=nett)
+        return parse_generation(text, nett=nett)
+
+    @year_limited
+    def _query_generation(
+        self,
+        area: Area,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        psr_type: str | None = None,
+        nett: bool = False,
+    ) -> pd.DataFrame:
+        """Query generation, c.f. `EntsoePandasClient.query_generation`, with the chosen parser."""
+        area = lookup_area(area)
+        text = super(EntsoePandasClient, self.client).query_generation(
+            country_code=area,
+            start=start,
+            end=end,
+            psr_type=psr_type,
+        )
+        df = self._parse_generation(text, nett=nett)
+        df = df.tz_convert(area.tz)
+        return df.truncate(before=start, after=end)
+
+    def _fetch_generation_psr_type(
+        self,
+        area: Area,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        psr_type: str,
+        nett: bool,
+    ) -> pd.DataFrame:
+        """Query the generation of a single production type, with (resource, type) columns."""
+        try:
+            df = self._query_generation(
+                area=area,
+                start=start,
+                end=end,
+                nett=nett,
+                psr_type=psr_type,
+            )
+        except (NoMatchingDataError, InvalidPSRTypeError):
+            # no data for the production type, or production type unknown to the client
+            return pd.DataFrame()
+        except HTTPError as e:
+            # production type not available for the area
+            if "Bad Request for url" not in str(e):
+                raise e
+            return pd.DataFrame()
+        if not isinstance(df.columns, pd.MultiIndex):
+            df.columns = pd.MultiIndex.from_tuples(
+                [(c, "Actual Aggregated") for c in df.columns],
+                names=["resource", "type"],
+            )
+        return df
+
+    def _fetch_generation_by_psr_type(
+        self,
+        request: EntsoeRequest,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+    ) -> pd.DataFrame:
+        """Query generation with concurrent sub-requests by production type, merged afterwards.
+
+        Sub-requests are cached until the whole request succeeds, so that only the production
+        types that failed are fetched again when the request is retried.
+        """
+        cache_namespace = f"generation/{hash(request)}"
+        frames: dict[str, pd.DataFrame] = {}
+        for psr_type in GENERATION_PSR_TYPES:
+            df_cached = self.cache.get(cache_namespace, psr_type)
+            if df_cached is not None:
+                frames[psr_type] = df_cached
+        missing_psr_types = [t for t in GENERATION_PSR_TYPES if t not in frames]
+
+        errors: dict[str, Exception] = {}
+        with ThreadPoolExecutor(max_workers=self.generation_psr_workers) as executor:
+            futures = {
+                executor.submit(
+                    self._fetch_generation_psr_type,
+                    area=request.area,
+                    start=start,
+                    end=end,
+                    psr_type=psr_type,
+                    nett=(request.net_number or RETURN_NET_GENERATTION),
+                ): psr_type
+                for psr_type in missing_psr_types
+            }
+            for future in as_completed(futures):
+                psr_type = futures[future]
+                try:
+                    frames[psr_type] = future.result()
+                except Exception as e:
+                    errors[psr_type] = e
+                    continue
+                self.cache.put(cache_namespace, psr_type, frames[psr_type])
+
+        if errors:
+            logger.warning(
+                event="Failed fetching some production types.",
+                request=request,
+                failed_psr_types=sorted(errors),
+                count_cached_psr_types=len(frames),
+            )
+            raise IncompleteFetchError(
+                f"failed fetching psr_type(s) {sorted(errors)}",
+            ) from next(iter(errors.values()))
+
+        self.cache.clear(cache_namespace)
+        non_empty_frames = [t for t in frames.values() if not t.empty]
+        if not non_empty_frames:
+            raise NoMatchingDataError
+        return pd.concat(non_empty_frames, axis=1).sort_index(axis=1)
+
+    def _fetch_installed_capacity_block(
+        self,
+        area: Area,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        psr_type: str | None = None,
+    ) -> pd.DataFrame:
+        """Query the installed capacity of a year block, cached locally for past years."""
+        cache_namespace = f"installed_capacity/{area.name}"
+        cache_key = f"{start.year}_{psr_type or 'all'}"
+        # capacities of past years are not revised anymore
+        is_past_year = end <= pd.Timestamp.now(tz="UTC").replace(
+            month=1,
+            day=1,
+            hour=0,
+            minute=0,
+            second=0,
+            microsecond=0,
+        )
+        if is_past_year:
+            df_cached = self.cache.get(cache_namespace, cache_key)
+            if df_cached is not None:
+                return df_cached
+        try:
+            text = super(EntsoePandasClient, self.client).query_installed_generation_capacity(
+                country_code=area,
+                start=start,
+                end=end,
+                psr_type=psr_type,
+            )
+        except NoMatchingDataError:
+            return pd.DataFrame()
+        df_block = self._parse_generation(text)
+        if is_past_year:
+            self.cache.put(cache_namespace, cache_key, df_block)
+        return df_block
 
     def _fetch_installed_capacity(
         self,
@@ -46,37 +216,32 @@ class EntsoeFetcher(FetcherInterface):
         """Query installed capacity.
 
         Use the raw client instead as the `EntsoePandasClient` seems to drop data when trucating
-        frames inside the `year_limited` wrapper.
+        frames inside the `year_limited` wrapper. Year blocks are fetched concurrently.
         """
         blocks = year_blocks(start=start, end=end)
-        all_blocks_df = []
-        for _start, _end in blocks:
-            text = super(EntsoePandasClient, self.client).query_installed_generation_capacity(
-                country_code=area,
-                start=_start,
-                end=_end,
-                psr_type=psr_type,
+        with ThreadPoolExecutor(max_workers=self.capacity_year_workers) as executor:
+            all_blocks_df = list(
+                executor.map(
+                    lambda block: self._fetch_installed_capacity_block(
+                        area=area,
+                        start=block[0],
+                        end=block[1],
+                        psr_type=psr_type,
+                    ),
+                    blocks,
+                ),
             )
-            df_block = parse_generation(text)
-            # Truncate to YearBegin and YearEnd, because answer is always year-based
-            df_block = df_block.truncate(before=start - YearBegin(), after=end + YearEnd())
-            all_blocks_df.append(df_block)
+        all_blocks_df = [t for t in all_blocks_df if not t.empty]
+        if not all_blocks_df:
+            raise NoMatchingDataError
 
         df = pd.concat(all_blocks_df, axis=0)
+        # Truncate to YearBegin and YearEnd, because answer is always year-based
+        df = df.sort_index().truncate(before=start - YearBegin(), after=end + YearEnd())
 
         df.drop_duplicates(inplace=True)
         return df
 
-    @retry(
-        wait=wait_fixed(MAX_WAIT_PERIOD),
-        stop=stop_after_attempt(MAX_RETRY),
-        retry=retry_if_exception_type(HTTPError),
-    )
-    @retry(
-        wait=wait_exponential(multiplier=1, max=MAX_WAIT_PERIOD),
-        stop=stop_after_attempt(MAX_RETRY),
-        retry=retry_if_exception_type(ConnectionError),
-    )
     def fetch_data(self, *, request: EntsoeRequest) -> pd.DataFrame | None:  # noqa: D102
         _start = pd.to_datetime(request.start)
         _end = pd.to_datetime(request.end)
@@ -88,9 +253,11 @@ class EntsoeFetcher(FetcherInterface):
                         start=_start,
                         end=_end,
                     )
+                case RequestType.GENERATION if self.generation_psr_workers > 0:
+                    result = self._fetch_generation_by_psr_type(request, start=_start, end=_end)
                 case RequestType.GENERATION:
-                    result = self.client.query_generation(
-                        country_code=request.area,
+                    result = self._query_generation(
+                        area=request.area,
                         start=_start,
                         end=_end,
                         nett=(request.net_number or RETURN_NET_GENERATTION),
@@ -109,8 +276,8 @@ class EntsoeFetcher(FetcherInterface):
                     # the data is yearly in this case so let's ovewrite the _start and _end to YS.
                     _start = _start.replace(month=12, day=1)
                     _end = _end.replace(month=12, day=31)
-                    result = self.client.query_installed_generation_capacity(
-                        country_code=request.area,
+                    result = self._fetch_installed_capacity(
+                        area=request.area,
                         start=_start,
                         end=_end,
                         psr_type=None,  # all types
@@ -135,4 +302,5 @@ class EntsoeFetcher(FetcherInterface):
                 raise e
             result = None
 
+        self.session.log_stats()
         return result
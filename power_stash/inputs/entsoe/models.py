@@ -5,15 +5,15 @@ import pandas as pd
 from sqlmodel import Field
 
 from power_stash.inputs.entsoe.request import Area
-from power_stash.models.storage.database import BaseTableModel
+from power_stash.models.storage.database import VersionedTableModel
+from power_stash.models.storage.labels import AreaLabel, ResourceLabel, UnitLabel, label_field
 
 
-class EntsoeHourlyConsumption(BaseTableModel, table=True):
+class EntsoeHourlyConsumption(VersionedTableModel, table=True):
     timestamp: dt.datetime = Field(primary_key=True)
     value: float
-    unit: str
-    area: Area
-    last_updated: dt.datetime = Field(default=dt.datetime.now(tz=dt.timezone.utc))
+    unit: str = label_field(UnitLabel)
+    area: Area = label_field(AreaLabel, Area)
 
     def __init__(
         self,
@@ -22,6 +22,7 @@ class EntsoeHourlyConsumption(BaseTableModel, table=True):
         super().__init__(**data)
         # override uid property
         self.uid = self.compute_uid()
+        self.content_hash = self.compute_content_hash()
 
     def compute_uid(self) -> str:
         """Unique identifier based on fields."""
@@ -42,14 +43,13 @@ class EntsoeHourlyConsumption(BaseTableModel, table=True):
         )
 
 
-class EntsoeHourlyGeneration(BaseTableModel, table=True):
+class EntsoeHourlyGeneration(VersionedTableModel, table=True):
     timestamp: dt.datetime = Field(primary_key=True)
     aggregated_value: float | None
     consumption_value: float | None
-    unit: str
-    area: Area
-    resource: str
-    last_updated: dt.datetime = Field(default=dt.datetime.now(tz=dt.timezone.utc))
+    unit: str = label_field(UnitLabel)
+    area: Area = label_field(AreaLabel, Area)
+    resource: str = label_field(ResourceLabel)
 
     def __init__(
         self,
@@ -58,6 +58,7 @@ class EntsoeHourlyGeneration(BaseTableModel, table=True):
         super().__init__(**data)
         # override uid property
         self.uid = self.compute_uid()
+        self.content_hash = self.compute_content_hash()
 
     def compute_uid(self) -> str:
         """Unique identifier based on fields."""
@@ -80,12 +81,234 @@ class EntsoeHourlyGeneration(BaseTableModel, table=True):
         )
 
 
-class EntsoeHourlyDayAheadPrice(BaseTableModel, table=True):
+class EntsoeNativeConsumption(VersionedTableModel, table=True):
+    """Consumption of an area reported below the hour (e.g. by quarter-hour), as fetched."""
+
+    timestamp: dt.datetime = Field(primary_key=True)
+    value: float
+    unit: str = label_field(UnitLabel)
+    area: Area = label_field(AreaLabel, Area)
+    resolution_minutes: int
+
+    def __init__(
+        self,
+        **data,  # noqa: ANN003
+    ) -> None:
+        super().__init__(**data)
+        # override uid property
+        self.uid = self.compute_uid()
+        self.content_hash = self.compute_content_hash()
+
+    def compute_uid(self) -> str:
+        """Unique identifier based on fields."""
+        uid_params = f"{self.area}_{self.timestamp}"
+        return hashlib.sha1(uid_params.encode("utf-8")).hexdigest()  # noqa: S324
+
+    @classmethod
+    def from_raw_record(cls, data: pd.Series, area: Area) -> "EntsoeNativeConsumption":  # noqa: ANN102
+        """Parse pd.Series, with the `resolution_minutes` of its series, into a new model."""
+        data = data.where(pd.notna(data), None)
+
+        timestamp: pd.Timestamp = data["timestamp"]
+        return cls(
+            timestamp=timestamp.to_pydatetime(),
+            value=data["Actual Load"],
+            unit="MW",
+            area=area,
+            resolution_minutes=data["resolution_minutes"],
+        )
+
+
+class EntsoeNativeGeneration(VersionedTableModel, table=True):
+    """Generation of an area reported below the hour (e.g. by quarter-hour), as fetched."""
+
+    timestamp: dt.datetime = Field(primary_key=True)
+    aggregated_value: float | None
+    consumption_value: float | None
+    unit: str = label_field(UnitLabel)
+    area: Area = label_field(AreaLabel, Area)
+    resource: str = label_field(ResourceLabel)
+    resolution_minutes: int
+
+    def __init__(
+        self,
+        **data,  # noqa: ANN003
+    ) -> None:
+        super().__init__(**data)
+        # override uid property
+        self.uid = self.compute_uid()
+        self.content_hash = self.compute_content_hash()
+
+    def compute_uid(self) -> str:
+        """Unique identifier based on fields."""
+        uid_params = f"{self.resource}_{self.area}_{self.timestamp}"
+        return hashlib.sha1(uid_params.encode("utf-8")).hexdigest()  # noqa: S324
+
+    @classmethod
+    def from_raw_record(cls, data: pd.Series, area: Area) -> "EntsoeNativeGeneration":  # noqa: ANN102
+        """Parse pd.Series, with the `resolution_minutes` of its series, into a new model."""
+        data = data.where(pd.notna(data), None)
+
+        timestamp: pd.Timestamp = data["timestamp"]
+        return cls(
+            timestamp=timestamp.to_pydatetime(),
+            aggregated_value=data["Actual Aggregated"],
+            consumption_value=data.get("Actual Consumption"),
+            unit="MW",
+            area=area,
+            resource=data["resource"],
+            resolution_minutes=data["resolution_minutes"],
+        )
+
+
+# columns of the wide generation table by production type, c.f. `entsoe.mappings.PSRTYPE_MAPPINGS`
+WIDE_GENERATION_RESOURCES = {
+    "Biomass": "biomass",
+    "Fossil Brown coal/Lignite": "fossil_brown_coal_lignite",
+    "Fossil Coal-derived gas": "fossil_coal_derived_gas",
+    "Fossil Gas": "fossil_gas",
+    "Fossil Hard coal": "fossil_hard_coal",
+    "Fossil Oil": "fossil_oil",
+    "Fossil Oil shale": "fossil_oil_shale",
+    "Fossil Peat": "fossil_peat",
+    "Geothermal": "geothermal",
+    "Hydro Pumped Storage": "hydro_pumped_storage",
+    "Hydro Run-of-river and poundage": "hydro_run_of_river_and_poundage",
+    "Hydro Water Reservoir": "hydro_water_reservoir",
+    "Marine": "marine",
+    "Nuclear": "nuclear",
+    "Other renewable": "other_renewable",
+    "Solar": "solar",
+    "Waste": "waste",
+    "Wind Offshore": "wind_offshore",
+    "Wind Onshore": "wind_onshore",
+    "Other": "other",
+    "Energy storage": "energy_storage",
+}
+
+GENERATION_LONG_VIEW_NAME = "entsoehourlygenerationlong"
+
+# suffix of the columns of the wide generation table by type of value
+WIDE_GENERATION_TYPES = {
+    "Actual Aggregated": "aggregated",
+    "Actual Consumption": "consumption",
+}
+
+
+class EntsoeHourlyGenerationWide(VersionedTableModel, table=True):
+    """Generation of an area, with a column by production type and type of value.
+
+    Alternative layout of `EntsoeHourlyGeneration`, with a single row by timestamp. The long
+    layout is exposed by the `entsoehourlygenerationlong` view (c.f. `long_view_query`).
+    """
+
+    timestamp: dt.datetime = Field(primary_key=True)
+    unit: str = label_field(UnitLabel)
+    area: Area = label_field(AreaLabel, Area)
+    biomass_aggregated: float | None = None
+    biomass_consumption: float | None = None
+    fossil_brown_coal_lignite_aggregated: float | None = None
+    fossil_brown_coal_lignite_consumption: float | None = None
+    fossil_coal_derived_gas_aggregated: float | None = None
+    fossil_coal_derived_gas_consumption: float | None = None
+    fossil_gas_aggregated: float | None = None
+    fossil_gas_consumption: float | None = None
+    fossil_hard_coal_aggregated: float | None = None
+    fossil_hard_coal_consumption: float | None = None
+    fossil_oil_aggregated: float | None = None
+    fossil_oil_consumption: float | None = None
+    fossil_oil_shale_aggregated: float | None = None
+    fossil_oil_shale_consumption: float | None = None
+    fossil_peat_aggregated: float | None = None
+    fossil_peat_consumption: float | None = None
+    geothermal_aggregated: float | None = None
+    geothermal_consumption: float | None = None
+    hydro_pumped_storage_aggregated: float | None = None
+    hydro_pumped_storage_consumption: float | None = None
+    hydro_run_of_river_and_poundage_aggregated: float | None = None
+    hydro_run_of_river_and_poundage_consumption: float | None = None
+    hydro_water_reservoir_aggregated: float | None = None
+    hydro_water_reservoir_consumption: float | None = None
+    marine_aggregated: float | None = None
+    marine_consumption: float | None = None
+    nuclear_aggregated: float | None = None
+    nuclear_consumption: float | None = None
+    other_renewable_aggregated: float | None = None
+    other_renewable_consumption: float | None = None
+    solar_aggregated: float | None = None
+    solar_consumption: float | None = None
+    waste_aggregated: float | None = None
+    waste_consumption: float | None = None
+    wind_offshore_aggregated: float | None = None
+    wind_offshore_consumption: float | None = None
+    wind_onshore_aggregated: float | None = None
+    wind_onshore_consumption: float | None = None
+    other_aggregated: float | None = None
+    other_consumption: float | None = None
+    energy_storage_aggregated: float | None = None
+    energy_storage_consumption: float | None = None
+
+    def __init__(
+        self,
+        **data,  # noqa: ANN003
+    ) -> None:
+        super().__init__(**data)
+        # override uid property
+        self.uid = self.compute_uid()
+        self.content_hash = self.compute_content_hash()
+
+    def compute_uid(self) -> str:
+        """Unique identifier based on fields."""
+        uid_params = f"{self.area}_{self.timestamp}"
+        return hashlib.sha1(uid_params.encode("utf-8")).hexdigest()  # noqa: S324
+
+    @classmethod
+    def from_raw_record(cls, data: pd.Series, area: Area) -> "EntsoeHourlyGenerationWide":  # noqa: ANN102
+        """Parse pd.Series, with a `<resource>_<type>` entry by column, into a new model."""
+        data = data.where(pd.notna(data), None)
+
+        timestamp: pd.Timestamp = data["timestamp"]
+        return cls(
+            timestamp=timestamp.to_pydatetime(),
+            unit="MW",
+            area=area,
+            **data.drop("timestamp").to_dict(),
+        )
+
+    @classmethod
+    def long_view_query(cls) -> str:  # noqa: ANN102
+        """Query of the view exposing the table in the layout of `EntsoeHourlyGeneration`.
+
+        Areas and units are joined from their lookup tables, exposing labels instead of ids.
+        """
+        values = ",\n".join(
+            f"('{resource}', g.{column}_aggregated, g.{column}_consumption)"
+            for resource, column in WIDE_GENERATION_RESOURCES.items()
+        )
+        return f"""
+        SELECT
+            g.timestamp,
+            t.aggregated_value,
+            t.consumption_value,
+            u.label AS unit,
+            a.label AS area,
+            t.resource,
+            g.last_updated
+        FROM "{cls.__tablename__}" AS g
+        JOIN "{UnitLabel.__tablename__}" AS u ON u.id = g.unit
+        JOIN "{AreaLabel.__tablename__}" AS a ON a.id = g.area
+        CROSS JOIN LATERAL (VALUES
+            {values}
+        ) AS t(resource, aggregated_value, consumption_value)
+        WHERE t.aggregated_value IS NOT NULL OR t.consumption_value IS NOT NULL
+        """
+
+
+class EntsoeHourlyDayAheadPrice(VersionedTableModel, table=True):
     timestamp: dt.datetime = Field(primary_key=True)
     value: float
-    unit: str
-    area: Area
-    last_updated: dt.datetime = Field(default=dt.datetime.now(tz=dt.timezone.utc))
+    unit: str = label_field(UnitLabel)
+    area: Area = label_field(AreaLabel, Area)
 
     def __init__(
         self,
@@ -94,6 +317,7 @@ class EntsoeHourlyDayAheadPrice(BaseTableModel, table=True):
         super().__init__(**data)
         # override uid property
         self.uid = self.compute_uid()
+        self.content_hash = self.compute_content_hash()
 
     def compute_uid(self) -> str:
         """Unique identifier based on fields."""
@@ -114,13 +338,12 @@ class EntsoeHourlyDayAheadPrice(BaseTableModel, table=True):
         )
 
 
-class EntsoeYearlyInstalledCapacity(BaseTableModel, table=True):
-    year: int
-    resource: str
+class EntsoeYearlyInstalledCapacity(VersionedTableModel, table=True):
+    year: int = Field(primary_key=True)
+    resource: str = label_field(ResourceLabel)
     value: float
-    unit: str
-    area: Area
-    last_updated: dt.datetime = Field(default=dt.datetime.now(tz=dt.timezone.utc))
+    unit: str = label_field(UnitLabel)
+    area: Area = label_field(AreaLabel, Area)
 
     def __init__(
         self,
@@ -129,6 +352,7 @@ class EntsoeYearlyInstalledCapacity(BaseTableModel, table=True):
         super().__init__(**data)
         # override uid property
         self.uid = self.compute_uid()
+        self.content_hash = self.compute_content_hash()
 
     def compute_uid(self) -> str:
         """Unique identifier based on fields."""
@@ -1,42 +1,147 @@
+from typing import Iterator
+
 import pandas as pd
+import structlog
 
 from power_stash.inputs.entsoe import models
+from power_stash.inputs.entsoe.config import GenerationLayout, ResolutionMode, get_entsoe_env
 from power_stash.inputs.entsoe.request import EntsoeRequest, RequestType
+from power_stash.inputs.entsoe.resolution import HOURLY, detect_resolutions, resample_hourly
 from power_stash.models.processor import BaseProcessor
 from power_stash.models.storage.database import BaseTableModel
 
+logger = structlog.get_logger()
+
+# request types whose series can be reported below the hour (e.g. by quarter-hour)
+NORMALIZED_REQUEST_TYPES = (RequestType.CONSUMPTION, RequestType.GENERATION)
+
 
 class EntsoeProcessor(BaseProcessor):
+    def __init__(
+        self,
+        generation_layout: GenerationLayout | None = None,
+        resolution_mode: ResolutionMode | None = None,
+    ) -> None:
+        if generation_layout is None:
+            generation_layout = get_entsoe_env().generation_layout
+        if resolution_mode is None:
+            resolution_mode = get_entsoe_env().resolution_mode
+        self.generation_layout = generation_layout
+        self.resolution_mode = resolution_mode
+
+    def normalize(
+        self,
+        *,
+        df_raw: pd.DataFrame,
+        request: EntsoeRequest,
+    ) -> list[tuple[pd.DataFrame, pd.Series | None]]:
+        """Normalize the series of a raw frame to the hourly resolution of the tables.
+
+        Returns the frames to transform, with the native resolution of their columns for the
+        frames of sub-hourly series to store as fetched (None for the hourly tables).
+        """
+        if (
+            self.resolution_mode == ResolutionMode.NATIVE
+            or request.request_type not in NORMALIZED_REQUEST_TYPES
+            or df_raw.empty
+        ):
+            return [(df_raw, None)]
+        resolutions = detect_resolutions(df_raw)
+        is_sub_hourly = resolutions < HOURLY
+        if not is_sub_hourly.any():
+            return [(df_raw, None)]
+        logger.debug(
+            event="Resampled sub-hourly series by hour.",
+            request=request,
+            resolutions=resolutions[is_sub_hourly].astype(str).to_dict(),
+        )
+        frames = [(resample_hourly(df_raw), None)]
+        if self.resolution_mode == ResolutionMode.BOTH:
+            # hourly series are only stored in the hourly tables
+            frames.append(
+                (df_raw.loc[:, is_sub_hourly.to_numpy()], resolutions[is_sub_hourly]),
+            )
+        return frames
+
+    @staticmethod
+    def _to_wide_generation(df: pd.DataFrame) -> pd.DataFrame:
+        """Name the columns of a generation frame after the ones of the wide table."""
+        if not isinstance(df.columns, pd.MultiIndex):
+            df.columns = pd.MultiIndex.from_tuples([(c, "Actual Aggregated") for c in df.columns])
+        columns = {}
+        for resource, value_type in df.columns:
+            if (
+                resource in models.WIDE_GENERATION_RESOURCES
+                and value_type in models.WIDE_GENERATION_TYPES
+            ):
+                columns[(resource, value_type)] = (
+                    f"{models.WIDE_GENERATION_RESOURCES[resource]}_"
+                    f"{models.WIDE_GENERATION_TYPES[value_type]}"
+                )
+        unknown_columns = [t for t in df.columns if t not in columns]
+        if unknown_columns:
+            logger.warning(
+                event="Dropped generation columns missing in the wide table.",
+                columns=unknown_columns,
+            )
+        df = df[list(columns)]
+        df.columns = list(columns.values())
+        return df
+
     def transform(self, *, df_raw: pd.DataFrame, request: EntsoeRequest) -> list[BaseTableModel]:
         """Transform raw DataFrame to parsed model."""
+        records = []
+        for df, resolutions in self.normalize(df_raw=df_raw, request=request):
+            records.extend(self._transform_frame(df, request=request, resolutions=resolutions))
+        return records
+
+    def _transform_frame(
+        self,
+        df_raw: pd.DataFrame,
+        *,
+        request: EntsoeRequest,
+        resolutions: pd.Series | None = None,
+    ) -> list[BaseTableModel]:
+        """Transform a (normalized) raw DataFrame, to the native tables with `resolutions`."""
         df = df_raw.copy()
         df.index.name = "timestamp"
         df.reset_index(inplace=True)
         match request.request_type:
+            case RequestType.CONSUMPTION if resolutions is not None:
+                df["resolution_minutes"] = int(resolutions.min() / pd.Timedelta(minutes=1))
+                base_model = models.EntsoeNativeConsumption
             case RequestType.CONSUMPTION:
                 base_model = models.EntsoeHourlyConsumption
+            case RequestType.GENERATION if (
+                resolutions is None and self.generation_layout == GenerationLayout.WIDE
+            ):
+                df = self._to_wide_generation(df.set_index("timestamp")).reset_index()
+                base_model = models.EntsoeHourlyGenerationWide
             case RequestType.GENERATION:
+                df.set_index("timestamp", inplace=True)
                 if not isinstance(df.columns, pd.MultiIndex):
                     # re-create multi index
-                    df.set_index("timestamp", inplace=True)
                     df.columns = pd.MultiIndex.from_tuples(
                         [(c, "Actual Aggregated") for c in df.columns],
                         names=["resource", "type"],
                     )
-                    df.reset_index(inplace=True)
-                # melt multi-index columns
-                df = df.melt(
-                    id_vars=["timestamp"],
-                    var_name=["resource", "type"],
-                    value_name="value",
-                )
+                # melt multi-index columns, named after their levels. Timestamps are kept in
+                # the index, as melting multi-index columns with an `id_vars` column fails.
+                df.columns.names = ["resource", "type"]
+                df = df.melt(value_name="value", ignore_index=False).reset_index()
                 # pivot by type
                 df = df.pivot(
                     index=["timestamp", "resource"],
                     columns="type",
                     values="value",
                 ).reset_index()
-                base_model = models.EntsoeHourlyGeneration
+                if resolutions is not None:
+                    # resolution of the series of each resource
+                    resolutions = resolutions.groupby(level=0).min() / pd.Timedelta(minutes=1)
+                    df["resolution_minutes"] = df["resource"].map(resolutions).astype(int)
+                    base_model = models.EntsoeNativeGeneration
+                else:
+                    base_model = models.EntsoeHourlyGeneration
             case RequestType.DAY_AHEAD_PRICE:
                 base_model = models.EntsoeHourlyDayAheadPrice
             case RequestType.INSTALLED_GENERATION_CAPACITY:
@@ -64,3 +169,37 @@ class EntsoeProcessor(BaseProcessor):
         del df
 
         return records
+
+    def transform_batches(
+        self,
+        *,
+        df_raw: pd.DataFrame,
+        request: EntsoeRequest,
+        batch_size: int,
+    ) -> Iterator[list[BaseTableModel]]:
+        """Transform raw DataFrame to parsed models, in batches of consecutive timestamps.
+
+        Generation frames have a column by resource (and type), they are sliced by rows so that
+        the intermediate long frames only ever hold one batch.
+        """
+        # frames are normalized as a whole, so that batches never split an hour
+        for df, resolutions in self.normalize(df_raw=df_raw, request=request):
+            if request.request_type != RequestType.GENERATION or not df.index.is_unique:
+                # e.g. repeated timestamps, that fail the pivot of the whole frame
+                yield self._transform_frame(df, request=request, resolutions=resolutions)
+                continue
+            if not df.index.is_monotonic_increasing:
+                # records are ordered by timestamp
+                df = df.sort_index(kind="stable")
+            if resolutions is None and self.generation_layout == GenerationLayout.WIDE:
+                # a record by timestamp
+                rows_by_batch = batch_size
+            else:
+                count_resources = df.columns.get_level_values(0).nunique()
+                rows_by_batch = max(batch_size // max(count_resources, 1), 1)
+            for i in range(0, len(df), rows_by_batch):
+                yield self._transform_frame(
+                    df.iloc[i : i + rows_by_batch],
+                    request=request,
+                    resolutions=resolutions,
+                )
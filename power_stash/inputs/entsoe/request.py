@@ -1,11 +1,16 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 from typing import Literal
 
 from entsoe.mappings import Area
 from pydantic import Field
 
-from power_stash.models.request import BaseRequest, BaseRequestBuilder
+from power_stash.models.request import (
+    BaseRequest,
+    BaseRequestBuilder,
+    PollingSchedule,
+    RevisionWindow,
+)
 from power_stash.utils import generate_monthly_datetime_chunks
 
 
@@ -24,6 +29,18 @@ class RequestType(str, Enum):
         return self.value
 
 
+# relative cost of request types, e.g. generation covers ~20 production types per timestamp.
+REQUEST_TYPE_COST_WEIGHTS = {
+    RequestType.CONSUMPTION: 1.0,
+    RequestType.GENERATION: 20.0,
+    RequestType.DAY_AHEAD_PRICE: 1.0,
+    RequestType.INSTALLED_GENERATION_CAPACITY: 0.1,
+}
+
+# relative cost of resolutions, as number of points per hour.
+RESOLUTION_COST_WEIGHTS = {"60T": 1.0, "30T": 2.0, "15T": 4.0}
+
+
 class EntsoeRequest(BaseRequest):
     area: Area = Field(description="Area, zone-key or country code.")
     request_type: RequestType = Field(description="type of data requested.")
@@ -42,12 +59,86 @@ class EntsoeRequest(BaseRequest):
         """,
     )
 
+    def estimated_cost(self) -> float:
+        """Relative cost of the request, weighted by request type and resolution."""
+        return (
+            super().estimated_cost()
+            * REQUEST_TYPE_COST_WEIGHTS.get(self.request_type, 1.0)
+            * RESOLUTION_COST_WEIGHTS.get(self.resolution or "60T", 1.0)
+        )
+
+
+# publication times of the ENTSO-E transparency platform (UTC).
+ENTSOE_POLLING_SCHEDULES = [
+    # actuals are published within the hour following the operating period, and revised later.
+    PollingSchedule(
+        name="consumption",
+        interval=timedelta(hours=1),
+        offset=timedelta(minutes=30),
+        lookback=timedelta(hours=3),
+        request_fields={"request_type": RequestType.CONSUMPTION},
+    ),
+    PollingSchedule(
+        name="generation",
+        interval=timedelta(hours=1),
+        offset=timedelta(minutes=30),
+        lookback=timedelta(hours=3),
+        request_fields={"request_type": RequestType.GENERATION},
+    ),
+    # day-ahead prices of the next day are published after the auction (~12:45 CET).
+    PollingSchedule(
+        name="day-ahead price",
+        interval=timedelta(days=1),
+        offset=timedelta(hours=12, minutes=30),
+        lookahead=timedelta(days=2),
+        request_fields={"request_type": RequestType.DAY_AHEAD_PRICE},
+    ),
+    PollingSchedule(
+        name="installed generation capacity",
+        interval=timedelta(days=1),
+        lookahead=timedelta(days=1),
+        request_fields={"request_type": RequestType.INSTALLED_GENERATION_CAPACITY},
+    ),
+]
+
+
+# how long after publication ENTSO-E data still gets revised (e.g. late metering of actuals).
+ENTSOE_REVISION_WINDOWS = [
+    RevisionWindow(
+        name="consumption",
+        window=timedelta(days=14),
+        request_fields={"request_type": RequestType.CONSUMPTION},
+    ),
+    RevisionWindow(
+        name="generation",
+        window=timedelta(days=14),
+        request_fields={"request_type": RequestType.GENERATION},
+    ),
+    RevisionWindow(
+        name="day-ahead price",
+        window=timedelta(days=3),
+        request_fields={"request_type": RequestType.DAY_AHEAD_PRICE},
+    ),
+]
+
 
 class EntsoeRequestBuilder(BaseRequestBuilder):
     def __init__(self) -> None:
         self.areas = list(Area)
         self.request_types = list(RequestType)
 
+    def polling_schedules(self) -> list[PollingSchedule]:
+        """Schedules to poll new data, aligned with the ENTSO-E publication times."""
+        return ENTSOE_POLLING_SCHEDULES
+
+    def revision_windows(self) -> list[RevisionWindow]:
+        """Trailing windows over which ENTSO-E revises published data."""
+        return ENTSOE_REVISION_WINDOWS
+
+    def parse_request(self, data: dict) -> EntsoeRequest:
+        """Parse a request serialised with `model_dump(mode="json")`."""
+        return EntsoeRequest.model_validate(data)
+
     def build_default_requests(
         self,
         start: datetime,
@@ -59,6 +150,40 @@ class EntsoeRequestBuilder(BaseRequestBuilder):
         Download all areas as defined in enum Area,
         for all request_types defined in enum RequestType.
         """
+        request_types = [
+            t
+            for t in self.request_types
+            if t
+            in [
+                # RequestType.INSTALLED_GENERATION_CAPACITY,
+                RequestType.CONSUMPTION,
+            ]
+        ]
+        return self.build_requests(
+            start=start,
+            end=end,
+            chunk_months=chunk_months,
+            request_types=request_types,
+        )
+
+    def build_requests(
+        self,
+        start: datetime,
+        end: datetime,
+        chunk_months: int | None = None,
+        areas: list[Area | str] | None = None,
+        request_types: list[RequestType | str] | None = None,
+    ) -> list[EntsoeRequest]:
+        """Return the requests of the given areas and request types (all by default).
+
+        Areas can be given by name (e.g. "DE_LU") and request types by value (e.g. "generation").
+        """
+        if areas is None:
+            areas = self.areas
+        if request_types is None:
+            request_types = self.request_types
+        areas = [Area[t] if isinstance(t, str) else t for t in areas]
+        request_types = [RequestType(t) for t in request_types]
         if chunk_months:
             starts_ends = generate_monthly_datetime_chunks(
                 start=start,
@@ -69,12 +194,9 @@ class EntsoeRequestBuilder(BaseRequestBuilder):
             starts_ends = [(start, end)]
         all_requests = []
         for _start, _end in starts_ends:
-            for area in self.areas:
-                for request_type in self.request_types:
-                    if request_type not in [
-                        # RequestType.INSTALLED_GENERATION_CAPACITY,
-                        RequestType.CONSUMPTION,
-                    ]:
+            for area in areas:
+                for request_type in request_types:
+                    if request_type == RequestType.INSTALLED_GENERATION_CAPACITY:
                         continue
                     new_request = EntsoeRequest(
                         start=_start,
@@ -84,4 +206,15 @@ class EntsoeRequestBuilder(BaseRequestBuilder):
                     )
                     all_requests.append(new_request)
 
+        if RequestType.INSTALLED_GENERATION_CAPACITY in request_types:
+            # yearly data, fetched by year blocks in a single request per area
+            for area in areas:
+                new_request = EntsoeRequest(
+                    start=start,
+                    end=end,
+                    area=area,
+                    request_type=RequestType.INSTALLED_GENERATION_CAPACITY,
+                )
+                all_requests.append(new_request)
+
         return all_requests
@@ -0,0 +1,29 @@
+import pandas as pd
+
+HOURLY = pd.Timedelta(hours=1)
+
+
+def detect_resolutions(df: pd.DataFrame) -> pd.Series:
+    """Native resolution of each column of a frame indexed by timestamps.
+
+    The resolution of a column is its most frequent step between timestamps with a value,
+    so that columns reported hourly among quarter-hourly ones (i.e. with gaps) are told
+    apart. Columns with less than two values are assumed hourly.
+    """
+    timestamps = df.index.to_series(index=range(len(df)))
+    resolutions = {}
+    for i, column in enumerate(df.columns):
+        steps = timestamps[df.iloc[:, i].notna().to_numpy()].diff()
+        # repeated timestamps (e.g. revisions) are not steps
+        steps = steps[steps > pd.Timedelta(0)]
+        resolutions[column] = steps.value_counts().idxmax() if len(steps) > 0 else HOURLY
+    return pd.Series(resolutions, index=df.columns, dtype="timedelta64[ns]")
+
+
+def resample_hourly(df: pd.DataFrame) -> pd.DataFrame:
+    """Average the columns of a frame indexed by timestamps over each hour.
+
+    Values in MW averaged over an hour are the energy (MWh) of that hour. Hours without any
+    value are dropped.
+    """
+    return df.resample(HOURLY, label="left", closed="left").mean().dropna(how="all")
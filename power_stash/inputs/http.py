@@ -0,0 +1,95 @@
+import os
+import threading
+from dataclasses import dataclass
+
+import requests
+import structlog
+from requests.adapters import HTTPAdapter
+
+logger = structlog.get_logger()
+
+DEFAULT_POOL_MAXSIZE = 16
+
+DEFAULT_CONNECT_TIMEOUT_SECS = 10.0
+
+DEFAULT_READ_TIMEOUT_SECS = 120.0
+
+# number of calls to `PooledSession.log_stats` between two logs, i.e. the size of a batch.
+DEFAULT_STATS_LOG_INTERVAL = 100
+
+
+@dataclass(frozen=True)
+class SessionStats:
+    """Counters of the HTTP requests sent by a session."""
+
+    count_requests: int
+    count_new_connections: int
+
+    @property
+    def count_reused_connections(self) -> int:
+        """Requests sent over an already open (keep-alive) connection."""
+        return max(self.count_requests - self.count_new_connections, 0)
+
+
+class PooledSession(requests.Session):
+    """Session keeping connections alive in a pool shared by the threads of a process.
+
+    Compressed responses are accepted, and retries are left to the caller.
+    """
+
+    def __init__(self, pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> None:
+        super().__init__()
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_maxsize,
+            pool_maxsize=pool_maxsize,
+            max_retries=0,
+        )
+        self.mount("https://", self.adapter)
+        self.mount("http://", self.adapter)
+        self.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+        self._count_log_calls = 0
+        self._log_lock = threading.Lock()
+
+    def stats(self) -> SessionStats:
+        """Count the requests sent and the connections opened, over all pools."""
+        pools = self.adapter.poolmanager.pools
+        # the container of pools can't be iterated (not thread-safe), its keys are a copy
+        keys = pools.keys()
+        return SessionStats(
+            count_requests=sum(pools[t].num_requests for t in keys),
+            count_new_connections=sum(pools[t].num_connections for t in keys),
+        )
+
+    def log_stats(self, every: int = DEFAULT_STATS_LOG_INTERVAL) -> None:
+        """Log the cumulative stats of the session, once per batch of `every` calls."""
+        with self._log_lock:
+            self._count_log_calls += 1
+            if self._count_log_calls % every:
+                return
+        stats = self.stats()
+        logger.debug(
+            event="HTTP session stats.",
+            pid=os.getpid(),
+            count_requests=stats.count_requests,
+            count_new_connections=stats.count_new_connections,
+            count_reused_connections=stats.count_reused_connections,
+        )
+
+
+# sessions by process (connections can't be shared with forked processes) and pool size.
+_sessions: dict[tuple[int, int], PooledSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> PooledSession:
+    """Session shared by all the clients of the current process."""
+    key = (os.getpid(), pool_maxsize)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = PooledSession(pool_maxsize=pool_maxsize)
+                _sessions[key] = session
+                logger.debug(event="Created pooled HTTP session.", pool_maxsize=pool_maxsize)
+    return session
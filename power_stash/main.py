@@ -1,18 +1,24 @@
 import datetime as dt
 from enum import Enum
-from typing import Callable
+from typing import TYPE_CHECKING, Callable, Optional
 
 import structlog
 import typer
-from dask.diagnostics import ProgressBar
-from distributed import Client, SpecCluster
 from typing_extensions import Annotated
 
-from power_stash.models.fetcher import FetcherInterface
-from power_stash.models.processor import BaseProcessor
-from power_stash.models.request import BaseRequestBuilder
-from power_stash.outputs.database.repository import DatabaseRepository
-from power_stash.services.service import PowerConsumerService
+if TYPE_CHECKING:
+    # heavy imports (dask, distributed, pandas, source specific clients, ...) are deferred
+    # to the commands needing them to keep the CLI startup fast.
+    from distributed import SpecCluster
+
+    from power_stash.models.fetcher import FetcherInterface
+    from power_stash.models.processor import BaseProcessor
+    from power_stash.models.request import BaseRequestBuilder
+    from power_stash.models.storage.coverage import CoverageIndex
+    from power_stash.models.storage.database import DatabaseRepository
+    from power_stash.models.storage.queue import WorkQueue
+    from power_stash.services.frames import FrameService
+    from power_stash.services.service import PowerConsumerService
 
 logger = structlog.getLogger()
 app = typer.Typer()
@@ -23,6 +29,21 @@ DEFAULT_WORKER_NUMBER = 1
 
 DEFAULT_THREADS_BY_WORKER = 5
 
+DEFAULT_MAX_ATTEMPTS = 3
+
+DEFAULT_NEGATIVE_CACHE_TTL_DAYS = 30
+
+DEFAULT_MONTHLY_CHUNKS = 1
+
+DEFAULT_QUEUE_BATCH_SIZE = 10
+
+DEFAULT_QUEUE_LEASE_SECS = 300
+
+# import time budget of the CLI module, c.f. `benchmark-import` command
+DEFAULT_MAX_IMPORT_SECONDS = 0.5
+
+DEFAULT_SHUTDOWN_TIMEOUT_SECS = 60
+
 
 class DataSource(str, Enum):
     ENTSOE = "entsoe"
@@ -54,8 +75,13 @@ def parse_datetime(datetime_str: str) -> dt.datetime:
     raise ValueError(f"No valid format found for date: {datetime_str}")
 
 
-def load_source(source: DataSource) -> tuple[BaseRequestBuilder, FetcherInterface, BaseProcessor]:
-    """Load all ressources associated with the chosen data source."""
+def load_source(
+    source: DataSource,
+) -> tuple["BaseRequestBuilder", Callable[[], "FetcherInterface"], Callable[[], "BaseProcessor"]]:
+    """Load all ressources associated with the chosen data source.
+
+    Fetchers and processors are returned as factories, as they are built once by each worker.
+    """
     match source:
         case DataSource.ENTSOE:
             from power_stash.inputs.entsoe.fetcher import EntsoeFetcher
@@ -63,18 +89,18 @@ def load_source(source: DataSource) -> tuple[BaseRequestBuilder, FetcherInterfac
             from power_stash.inputs.entsoe.request import EntsoeRequestBuilder
 
             request_builder = EntsoeRequestBuilder()
-            fetcher = EntsoeFetcher()
-            processor = EntsoeProcessor()
+            fetcher_factory = EntsoeFetcher
+            processor_factory = EntsoeProcessor
         case _:
             raise NotImplementedError(f"{source=} not implemented!")
 
-    return request_builder, fetcher, processor
+    return request_builder, fetcher_factory, processor_factory
 
 
 def load_repository_factory(repository_type: RepositoryType) -> Callable:
     """Load a callable to repository when required."""
 
-    def _create_sql_repository() -> DatabaseRepository:
+    def _create_sql_repository() -> "DatabaseRepository":
         from power_stash.outputs.database.repository import SqlRepository
 
         return SqlRepository()
@@ -86,12 +112,63 @@ def load_repository_factory(repository_type: RepositoryType) -> Callable:
             raise NotImplementedError(f"{repository_type=} not implemented!")
 
 
+def load_queue(repository_type: RepositoryType) -> "WorkQueue":
+    """Load the work queue shared by the workers."""
+    match repository_type:
+        case RepositoryType.DATABASE:
+            from power_stash.outputs.database.queue import SqlWorkQueue
+
+            return SqlWorkQueue()
+        case _:
+            raise NotImplementedError(f"{repository_type=} not implemented!")
+
+
+def load_coverage_index(repository_type: RepositoryType) -> "CoverageIndex":
+    """Load the index of the intervals of stored records."""
+    match repository_type:
+        case RepositoryType.DATABASE:
+            from power_stash.outputs.database.coverage import SqlCoverageIndex
+
+            return SqlCoverageIndex()
+        case _:
+            raise NotImplementedError(f"{repository_type=} not implemented!")
+
+
+def load_service(source: DataSource, repository_type: RepositoryType) -> "PowerConsumerService":
+    """Load the service for the chosen data source and repository."""
+    from power_stash.services.service import PowerConsumerService
+
+    request_builder, fetcher_factory, processor_factory = load_source(source)
+
+    repository_factory = load_repository_factory(repository_type)
+
+    return PowerConsumerService(
+        request_builder=request_builder,
+        fetcher_factory=fetcher_factory,
+        processor_factory=processor_factory,
+        repository_factory=repository_factory,
+    )
+
+
+def load_frame_service(source: DataSource) -> "FrameService":
+    """Load the service returning DataFrames for the chosen data source, e.g. in notebooks."""
+    from power_stash.services.frames import FrameService
+
+    request_builder, fetcher_factory, processor_factory = load_source(source)
+
+    return FrameService(
+        request_builder=request_builder,
+        fetcher_factory=fetcher_factory,
+        processor_factory=processor_factory,
+    )
+
+
 def load_cluster(
     cluster_type: ClusterType,
     n_workers: int,
     threads_per_worker: int,
     name: str = "Power Stash data download cluster.",
-) -> SpecCluster:
+) -> "SpecCluster":
     """Load cluster."""
     match cluster_type:
         case ClusterType.LOCAL:
@@ -146,23 +223,67 @@ def download_data(
         int,
         typer.Option(help="the number of threads per worker in the cluster."),
     ] = DEFAULT_THREADS_BY_WORKER,
+    max_attempts: Annotated[
+        int,
+        typer.Option(
+            help="the maximum number of attempts per request within the run, "
+            "retries wait for their backoff once the cluster is idle.",
+        ),
+    ] = DEFAULT_MAX_ATTEMPTS,
+    negative_cache_ttl_days: Annotated[
+        int,
+        typer.Option(help="the number of days requests known to be empty are skipped for."),
+    ] = DEFAULT_NEGATIVE_CACHE_TTL_DAYS,
+    revalidate_empty: Annotated[
+        bool,
+        typer.Option(help="send again the requests known to be empty."),
+    ] = False,
+    arrow_handoff: Annotated[
+        bool,
+        typer.Option(help="download in tasks of their own, handing frames over as Arrow files."),
+    ] = False,
+    profile: Annotated[
+        bool,
+        typer.Option(help="sample profiles of each stage on the workers, saved under data/."),
+    ] = False,
+    trace_memory: Annotated[
+        bool,
+        typer.Option(help="trace the peak memory of each request and stage (slower)."),
+    ] = False,
+    memory_budget_mb: Annotated[
+        Optional[int],
+        typer.Option(help="the memory budget of each worker, larger requests are split."),
+    ] = None,
+    transform_batch_size: Annotated[
+        Optional[int],
+        typer.Option(help="transform and store large frames in batches of this many records."),
+    ] = None,
 ) -> None:
     """CLI method to download datasets."""
+    from dask.diagnostics import ProgressBar
+    from distributed import Client
+
+    from power_stash.config import DATA_DIR
+    from power_stash.services.memory import MEBIBYTE, MemoryBudget
+    from power_stash.services.retry import RetryPolicy
+
     # parse datetime strs
     start_timestamp = parse_datetime(start)
     end_timestamp = parse_datetime(end)
 
     # load the ressources
-    request_builder, fetcher, processor = load_source(source)
+    service = load_service(source, repository_type)
 
-    repository_factory = load_repository_factory(repository_type)
+    profile_dir = None
+    if profile:
+        run_name = dt.datetime.now().strftime("%Y%m%d_%H%M%S")  # noqa: DTZ005
+        profile_dir = DATA_DIR / "profiles" / run_name
 
-    service = PowerConsumerService(
-        request_builder=request_builder,
-        fetcher=fetcher,
-        processor=processor,
-        repository_factory=repository_factory,
-    )
+    memory_budget = None
+    if trace_memory or memory_budget_mb is not None:
+        memory_budget = MemoryBudget(
+            max_bytes=memory_budget_mb * MEBIBYTE if memory_budget_mb is not None else None,
+        )
 
     cluster = load_cluster(
         cluster_type=cluster_type,
@@ -190,7 +311,18 @@ def download_data(
                 # more info: https://docs.dask.org/en/stable/scheduling.html
                 scheduler="multiprocessing",
                 n_partitions=n_workers * threads_per_worker,
+                arrow_handoff=arrow_handoff,
+                retry_policy=RetryPolicy(max_attempts=max_attempts),
+                negative_cache_ttl=dt.timedelta(days=negative_cache_ttl_days),
+                revalidate_empty=revalidate_empty,
+                profile_dir=profile_dir,
+                memory_budget=memory_budget,
+                transform_batch_size=transform_batch_size,
             )
+        if profile_dir is not None:
+            from power_stash.services.profiling import SUMMARY_NAME
+
+            typer.echo((profile_dir / SUMMARY_NAME).read_text())
     except Exception as e:
         raise e
     finally:
@@ -201,5 +333,455 @@ def download_data(
         )
 
 
+@app.command()
+def enqueue(
+    start: Annotated[
+        str,
+        typer.Option(
+            ...,
+            formats=DEFAULT_DATETIME_FORMATS,
+            help="the start date for data downloading.",
+        ),
+    ],
+    end: Annotated[
+        str,
+        typer.Option(
+            ...,
+            formats=DEFAULT_DATETIME_FORMATS,
+            help="the end date for data downloading.",
+        ),
+    ],
+    source: Annotated[
+        DataSource,
+        typer.Option(..., help="the source to download electricity data from."),
+    ],
+    repository_type: Annotated[
+        RepositoryType,
+        typer.Option(help="the repository handling the storage of processed data and the queue."),
+    ],
+    chunk_months: Annotated[
+        int,
+        typer.Option(help="the number of months covered by each request."),
+    ] = DEFAULT_MONTHLY_CHUNKS,
+    negative_cache_ttl_days: Annotated[
+        int,
+        typer.Option(help="the number of days requests known to be empty are skipped for."),
+    ] = DEFAULT_NEGATIVE_CACHE_TTL_DAYS,
+    revalidate_empty: Annotated[
+        bool,
+        typer.Option(help="send again the requests known to be empty."),
+    ] = False,
+) -> None:
+    """CLI method to plan the requests and add them to the work queue."""
+    service = load_service(source, repository_type)
+    queue = load_queue(repository_type)
+    queue.init_db()
+    service.enqueue_requests(
+        queue,
+        start=parse_datetime(start),
+        end=parse_datetime(end),
+        chunk_months=chunk_months,
+        negative_cache_ttl=dt.timedelta(days=negative_cache_ttl_days),
+        revalidate_empty=revalidate_empty,
+    )
+
+
+@app.command()
+def work(
+    source: Annotated[
+        DataSource,
+        typer.Option(..., help="the source to download electricity data from."),
+    ],
+    repository_type: Annotated[
+        RepositoryType,
+        typer.Option(help="the repository handling the storage of processed data and the queue."),
+    ],
+    batch_size: Annotated[
+        int,
+        typer.Option(help="the number of requests claimed at once."),
+    ] = DEFAULT_QUEUE_BATCH_SIZE,
+    threads: Annotated[
+        int,
+        typer.Option(help="the number of requests processed concurrently."),
+    ] = DEFAULT_THREADS_BY_WORKER,
+    lease_secs: Annotated[
+        int,
+        typer.Option(help="the duration claimed requests are reserved for, renewed by heartbeat."),
+    ] = DEFAULT_QUEUE_LEASE_SECS,
+    max_attempts: Annotated[
+        int,
+        typer.Option(help="the maximum number of attempts per request."),
+    ] = DEFAULT_MAX_ATTEMPTS,
+    wait: Annotated[
+        bool,
+        typer.Option(help="keep polling for new requests when the queue is empty."),
+    ] = False,
+) -> None:
+    """CLI method to process requests from the work queue, start as many as needed."""
+    from power_stash.services.retry import RetryPolicy
+
+    service = load_service(source, repository_type)
+    queue = load_queue(repository_type)
+    # workers may start before the requests are enqueued, make sure db and tables are ready
+    queue.init_db()
+    service.run_queue_worker(
+        queue,
+        batch_size=batch_size,
+        n_threads=threads,
+        lease=dt.timedelta(seconds=lease_secs),
+        exit_when_empty=not wait,
+        retry_policy=RetryPolicy(max_attempts=max_attempts),
+    )
+
+
+@app.command()
+def serve(
+    source: Annotated[
+        DataSource,
+        typer.Option(..., help="the source to download electricity data from."),
+    ],
+    repository_type: Annotated[
+        RepositoryType,
+        typer.Option(help="the repository handling the storage of processed data."),
+    ],
+    threads: Annotated[
+        int,
+        typer.Option(help="the number of requests processed concurrently."),
+    ] = DEFAULT_THREADS_BY_WORKER,
+    max_attempts: Annotated[
+        int,
+        typer.Option(help="the maximum number of attempts per request."),
+    ] = DEFAULT_MAX_ATTEMPTS,
+    shutdown_timeout_secs: Annotated[
+        int,
+        typer.Option(
+            help="the time given to in-flight requests to complete on shutdown, "
+            "before registering them as failed (the process still waits for them to exit).",
+        ),
+    ] = DEFAULT_SHUTDOWN_TIMEOUT_SECS,
+    negative_cache_ttl_days: Annotated[
+        int,
+        typer.Option(help="the number of days requests known to be empty are skipped for."),
+    ] = DEFAULT_NEGATIVE_CACHE_TTL_DAYS,
+) -> None:
+    """CLI method to keep polling new data as it gets published, until stopped."""
+    from power_stash.services.daemon import PollingDaemon
+    from power_stash.services.retry import RetryPolicy
+
+    service = load_service(source, repository_type)
+    daemon = PollingDaemon(
+        service,
+        n_threads=threads,
+        retry_policy=RetryPolicy(max_attempts=max_attempts),
+        shutdown_timeout_secs=shutdown_timeout_secs,
+        negative_cache_ttl=dt.timedelta(days=negative_cache_ttl_days),
+    )
+    daemon.run()
+
+
+@app.command()
+def refresh(
+    source: Annotated[
+        DataSource,
+        typer.Option(..., help="the source to download electricity data from."),
+    ],
+    repository_type: Annotated[
+        RepositoryType,
+        typer.Option(help="the repository handling the storage of processed data."),
+    ],
+    threads: Annotated[
+        int,
+        typer.Option(help="the number of requests processed concurrently."),
+    ] = DEFAULT_THREADS_BY_WORKER,
+    max_attempts: Annotated[
+        int,
+        typer.Option(
+            help="the maximum number of attempts per request within the run, "
+            "retries wait for their backoff once the cluster is idle.",
+        ),
+    ] = DEFAULT_MAX_ATTEMPTS,
+    window_days: Annotated[
+        Optional[list[str]],
+        typer.Option(help="override the trailing window of a request type, e.g. 'generation=30'."),
+    ] = None,
+) -> None:
+    """CLI method to re-fetch recent data, picking up the revisions of the source."""
+    from power_stash.services.retry import RetryPolicy
+
+    service = load_service(source, repository_type)
+    windows = service.request_builder.revision_windows()
+    for override in window_days or []:
+        name, _, days = override.partition("=")
+        matching_windows = [t for t in windows if t.name == name]
+        if not matching_windows:
+            raise typer.BadParameter(
+                f"unknown window {name!r}, expected one of {[t.name for t in windows]}.",
+            )
+        windows = [
+            t.model_copy(update={"window": dt.timedelta(days=float(days))}) if t.name == name else t
+            for t in windows
+        ]
+    service.refresh_revisions(
+        scheduler="threads",
+        n_partitions=threads,
+        retry_policy=RetryPolicy(max_attempts=max_attempts),
+        windows=windows,
+    )
+
+
+@app.command()
+def reingest(
+    table: Annotated[
+        str,
+        typer.Option(help="the table to rewrite, e.g. 'entsoehourlygeneration'."),
+    ],
+    start: Annotated[
+        str,
+        typer.Option(help="the start of the period to rewrite, extended to whole chunks."),
+    ],
+    end: Annotated[
+        str,
+        typer.Option(help="the end of the period to rewrite, extended to whole chunks."),
+    ],
+    source: Annotated[
+        DataSource,
+        typer.Option(..., help="the source to download electricity data from."),
+    ],
+    repository_type: Annotated[
+        RepositoryType,
+        typer.Option(help="the repository handling the storage of processed data."),
+    ],
+    threads: Annotated[
+        int,
+        typer.Option(help="the number of requests processed concurrently."),
+    ] = DEFAULT_THREADS_BY_WORKER,
+    max_attempts: Annotated[
+        int,
+        typer.Option(
+            help="the maximum number of attempts per request within the run, "
+            "retries wait for their backoff once the cluster is idle.",
+        ),
+    ] = DEFAULT_MAX_ATTEMPTS,
+) -> None:
+    """CLI method to rewrite the records of a table over a period."""
+    from power_stash.outputs.database.tables import table_request_types
+    from power_stash.services.retry import RetryPolicy
+
+    models = {t.__tablename__: t for t in table_request_types}
+    if table not in models:
+        raise typer.BadParameter(f"unknown table {table!r}, expected one of {sorted(models)}.")
+    model = models[table]
+
+    service = load_service(source, repository_type)
+    service.reingest(
+        model=model,
+        request_type=table_request_types[model],
+        start=parse_datetime(start),
+        end=parse_datetime(end),
+        scheduler="threads",
+        n_partitions=threads,
+        retry_policy=RetryPolicy(max_attempts=max_attempts),
+    )
+
+
+@app.command()
+def coverage(
+    repository_type: Annotated[
+        RepositoryType,
+        typer.Option(help="the repository handling the storage of processed data."),
+    ],
+    start: Annotated[
+        str,
+        typer.Option(help="the start of the period to look for gaps in."),
+    ],
+    end: Annotated[
+        str,
+        typer.Option(help="the end of the period to look for gaps in."),
+    ],
+    area: Annotated[
+        Optional[list[str]],
+        typer.Option(help="only include these areas, e.g. 'DE_LU', all by default."),
+    ] = None,
+    request_type: Annotated[
+        Optional[list[str]],
+        typer.Option(help="only include these request types, e.g. 'generation'."),
+    ] = None,
+    backfill: Annotated[
+        bool,
+        typer.Option(help="download the data missing in the gaps found."),
+    ] = False,
+    source: Annotated[
+        Optional[DataSource],
+        typer.Option(help="the source to download the missing data from, with --backfill."),
+    ] = None,
+    threads: Annotated[
+        int,
+        typer.Option(help="the number of requests processed concurrently, with --backfill."),
+    ] = DEFAULT_THREADS_BY_WORKER,
+    max_attempts: Annotated[
+        int,
+        typer.Option(
+            help="the maximum number of attempts per request within the run, "
+            "retries wait for their backoff once the cluster is idle.",
+        ),
+    ] = DEFAULT_MAX_ATTEMPTS,
+    output: Annotated[
+        Optional[str],
+        typer.Option(help="a CSV file to save the gaps of each series to."),
+    ] = None,
+) -> None:
+    """CLI method to report the gaps in the stored data, and optionally fill them."""
+    import pandas as pd
+
+    from power_stash.services.coverage import find_gaps, load_intervals, merge_gaps
+    from power_stash.services.retry import RetryPolicy
+
+    if backfill and source is None:
+        raise typer.BadParameter("--source is required with --backfill.")
+
+    coverage_index = load_coverage_index(repository_type)
+    coverage_index.init_db()
+    count_intervals = coverage_index.refresh_coverage()
+    intervals = load_intervals(coverage_index, areas=area, request_types=request_type)
+    gaps = find_gaps(intervals, start=parse_datetime(start), end=parse_datetime(end))
+    logger.info(
+        event="Indexed coverage.",
+        count_intervals=count_intervals,
+        count_gaps=len(gaps),
+    )
+    if output is not None:
+        gaps.to_csv(output, index=False)
+    if gaps.empty:
+        typer.echo("No gaps found.")
+        return
+    report = gaps.groupby(["table_name", "area"]).agg(
+        count_gaps=("duration", "count"),
+        missing=("duration", "sum"),
+        first_gap=("start", "min"),
+        last_gap=("end", "max"),
+    )
+    with pd.option_context("display.max_rows", None, "display.max_columns", None):
+        typer.echo(report.sort_values("missing", ascending=False).to_string())
+
+    if backfill:
+        service = load_service(source, repository_type)
+        service.fill_gaps(
+            merge_gaps(gaps),
+            scheduler="threads",
+            n_partitions=threads,
+            retry_policy=RetryPolicy(max_attempts=max_attempts),
+        )
+
+
+@app.command()
+def stats(
+    repository_type: Annotated[
+        RepositoryType,
+        typer.Option(help="the repository handling the storage of processed data."),
+    ],
+    start: Annotated[
+        Optional[str],
+        typer.Option(help="only include the requests starting from this date."),
+    ] = None,
+    end: Annotated[
+        Optional[str],
+        typer.Option(help="only include the requests starting before this date."),
+    ] = None,
+    group_by: Annotated[
+        Optional[list[str]],
+        typer.Option(help="the request fields to group by, e.g. 'area', or 'month'."),
+    ] = None,
+    top: Annotated[
+        Optional[int],
+        typer.Option(help="the number of most expensive groups to report, all by default."),
+    ] = None,
+    output: Annotated[
+        Optional[str],
+        typer.Option(help="a CSV file to save the full report to."),
+    ] = None,
+) -> None:
+    """CLI method to report the resources used by past requests, by area, type and month."""
+    import pandas as pd
+
+    from power_stash.services.stats import DEFAULT_GROUP_BY, load_statuses, summarise_statuses
+
+    repository = load_repository_factory(repository_type)()
+    df = load_statuses(
+        repository,
+        start=parse_datetime(start) if start is not None else None,
+        end=parse_datetime(end) if end is not None else None,
+    )
+    if df.empty:
+        logger.info(event="No request statuses found.")
+        return
+    try:
+        report = summarise_statuses(df, group_by=group_by or DEFAULT_GROUP_BY)
+    except ValueError as e:
+        raise typer.BadParameter(str(e)) from e
+    if output is not None:
+        report.to_csv(output)
+    with pd.option_context("display.max_rows", None, "display.max_columns", None):
+        typer.echo(report.head(top).to_string() if top is not None else report.to_string())
+
+
+@app.command()
+def rebuild_manifest(
+    folder: Annotated[
+        str,
+        typer.Option(help="the folder of the local store to index again, e.g. 'data/frames'."),
+    ],
+    extension: Annotated[
+        str,
+        typer.Option(help="the extension of the files to index."),
+    ] = "parquet",
+) -> None:
+    """CLI method to rebuild the manifest of a local store, e.g. after files changed outside it."""
+    from pathlib import Path
+
+    from power_stash.outputs.localfs.blob_client import LocalClient
+
+    count_files, count_stale_entries = LocalClient().rebuild_manifest(
+        folder=Path(folder),
+        extension=extension,
+    )
+    typer.echo(f"Indexed {count_files} file(s), removed {count_stale_entries} stale entries.")
+
+
+@app.command()
+def benchmark_import(
+    max_seconds: Annotated[
+        float,
+        typer.Option(help="the maximum accepted import time of the CLI, in seconds."),
+    ] = DEFAULT_MAX_IMPORT_SECONDS,
+    n_runs: Annotated[
+        int,
+        typer.Option(help="the number of measurements, the fastest one is kept."),
+    ] = 3,
+    top: Annotated[
+        int,
+        typer.Option(help="the number of slowest modules to report."),
+    ] = 10,
+) -> None:
+    """CLI method to measure the import time of the CLI, failing if above budget."""
+    from power_stash.utils import measure_import_time
+
+    measures = [measure_import_time("power_stash.main") for _ in range(max(n_runs, 1))]
+    import_seconds, slowest_modules = min(measures, key=lambda x: x[0])
+
+    logger.info(
+        event="Measured CLI import time.",
+        import_seconds=round(import_seconds, 3),
+        max_seconds=max_seconds,
+        slowest_modules={k: round(v, 3) for k, v in slowest_modules[:top]},
+    )
+    if import_seconds > max_seconds:
+        logger.error(
+            event="CLI import time above budget!",
+            import_seconds=round(import_seconds, 3),
+            max_seconds=max_seconds,
+        )
+        raise typer.Exit(code=1)
+
+
 if __name__ == "__main__":
     app()
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 import pandas as pd
 
@@ -16,3 +17,17 @@ class BaseProcessor(ABC):
     ) -> list[BaseTableModel]:
         """Process a raw DataFrame."""
         pass
+
+    def transform_batches(
+        self,
+        *,
+        df_raw: pd.DataFrame,
+        request: BaseRequest,
+        batch_size: int,  # noqa: ARG002
+    ) -> Iterator[list[BaseTableModel]]:
+        """Process a raw DataFrame in batches of about `batch_size` records, yielded lazily.
+
+        Records are the same as the ones of `transform`, in the same order. By default, the
+        whole DataFrame is processed at once.
+        """
+        yield self.transform(df_raw=df_raw, request=request)
@@ -2,8 +2,9 @@ import datetime as dt
 import hashlib
 from abc import ABC, abstractmethod
 from enum import Enum
+from typing import Any
 
-from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, ValidationError, field_validator
 
 
 class RequestStatusType(Enum):
@@ -18,6 +19,11 @@ class BaseRequest(BaseModel):
     start: dt.datetime
     end: dt.datetime
     _status: RequestStatusType | None = None
+    _attempts: int = 0
+    _last_error: str | None = None
+    _next_attempt_at: dt.datetime | None = None
+    _fingerprint: str | None = None
+    _metrics: dict[str, float] = PrivateAttr(default_factory=dict)
 
     @field_validator("start", "end")
     def validate_date(cls, v: dt.datetime) -> dt.datetime:
@@ -41,6 +47,110 @@ class BaseRequest(BaseModel):
         """Set the value of status using the provided value."""
         self._status = value
 
+    @property
+    def metrics(self) -> dict[str, float]:
+        """Resources used to process the request (durations, row counts, ...)."""
+        return self._metrics
+
+    def reset_metrics(self) -> None:
+        """Discard the metrics recorded (e.g. by a previous attempt)."""
+        # not cleared in place, copies of the request share the same dict
+        self._metrics = {}
+
+    def add_metric(self, name: str, value: float) -> None:
+        """Add a value to a metric of the request."""
+        self._metrics[name] = self._metrics.get(name, 0) + value
+
+    def estimated_cost(self) -> float:
+        """Relative cost of the request, used to schedule requests without past measurements.
+
+        Defaults to the number of days covered by the request.
+        """
+        return max((self.end - self.start).total_seconds() / 86_400, 0)
+
+    @property
+    def attempts(self) -> int:
+        """The number of times the request was attempted."""
+        return self._attempts
+
+    @attempts.setter
+    def attempts(self, value: int) -> None:
+        """Set the number of attempts."""
+        self._attempts = value
+
+    @property
+    def last_error(self) -> str | None:
+        """The class name of the last error raised by the request."""
+        return self._last_error
+
+    @last_error.setter
+    def last_error(self, value: str | None) -> None:
+        """Set the class name of the last error."""
+        self._last_error = value
+
+    @property
+    def next_attempt_at(self) -> dt.datetime | None:
+        """When the request should be attempted again, None if not to be retried."""
+        return self._next_attempt_at
+
+    @next_attempt_at.setter
+    def next_attempt_at(self, value: dt.datetime | None) -> None:
+        """Set the time of the next attempt."""
+        self._next_attempt_at = value
+
+    @property
+    def fingerprint(self) -> str | None:
+        """Hash of the raw data fetched by the request, to detect changes between fetches."""
+        return self._fingerprint
+
+    @fingerprint.setter
+    def fingerprint(self, value: str | None) -> None:
+        """Set the hash of the raw data fetched."""
+        self._fingerprint = value
+
+
+class PollingSchedule(BaseModel):
+    """When to poll a subset of requests, and which time window to fetch at each poll.
+
+    Polls happen every `interval`, `offset` after the interval boundary (e.g. once the data is
+    published). Each poll fetches from the end of the previous poll (at most `lookback` before
+    the poll, to pick up late publications) to `lookahead` after the poll.
+    """
+
+    name: str
+    interval: dt.timedelta
+    offset: dt.timedelta = dt.timedelta(0)
+    lookback: dt.timedelta = dt.timedelta(0)
+    lookahead: dt.timedelta = dt.timedelta(0)
+    request_fields: dict[str, Any] = Field(
+        default={},
+        description="Field values of the requests polled by the schedule.",
+    )
+
+    def matches(self, request: BaseRequest) -> bool:
+        """Whether a request is polled by the schedule."""
+        return all(getattr(request, k, None) == v for k, v in self.request_fields.items())
+
+
+class RevisionWindow(BaseModel):
+    """Trailing window over which a subset of requests is refreshed to pick up revisions.
+
+    Requests are re-fetched over the last `window` (aligned on days), whatever their status: in
+    a single request per area by default, or in chunks of `chunk` to locate the revisions.
+    """
+
+    name: str
+    window: dt.timedelta
+    chunk: dt.timedelta | None = None
+    request_fields: dict[str, Any] = Field(
+        default={},
+        description="Field values of the requests refreshed over the window.",
+    )
+
+    def matches(self, request: BaseRequest) -> bool:
+        """Whether a request is refreshed over the window."""
+        return all(getattr(request, k, None) == v for k, v in self.request_fields.items())
+
 
 class BaseRequestBuilder(ABC):
     @abstractmethod
@@ -52,3 +162,43 @@ class BaseRequestBuilder(ABC):
     ) -> list[BaseRequest]:
         """Build a series of default requests compatible with a fetcher."""
         pass
+
+    def build_requests(
+        self,
+        start: dt.datetime,
+        end: dt.datetime,
+        chunk_months: int | None = None,
+        **filters,  # noqa: ANN003
+    ) -> list[BaseRequest]:
+        """Build the requests matching filters (e.g. areas), the default ones without filters."""
+        if filters:
+            raise NotImplementedError(f"Filtering requests by {sorted(filters)} not implemented!")
+        return self.build_default_requests(start=start, end=end, chunk_months=chunk_months)
+
+    def build_matching_requests(
+        self,
+        start: dt.datetime,
+        end: dt.datetime,
+        request_fields: dict[str, Any],
+        chunk_months: int | None = None,
+    ) -> list[BaseRequest]:
+        """Build the requests with the given field values (e.g. of a polling schedule).
+
+        Values are passed as filters of `build_requests` named after the plural of their field
+        (e.g. `request_types` for `request_type`).
+        """
+        filters = {f"{k}s": [v] for k, v in request_fields.items()}
+        return self.build_requests(start=start, end=end, chunk_months=chunk_months, **filters)
+
+    @abstractmethod
+    def parse_request(self, data: dict) -> BaseRequest:
+        """Parse a request serialised with `model_dump(mode="json")`."""
+        pass
+
+    def polling_schedules(self) -> list[PollingSchedule]:
+        """Schedules to poll new data, aligned with the publication of the source."""
+        return []
+
+    def revision_windows(self) -> list[RevisionWindow]:
+        """Trailing windows over which the source revises published data."""
+        return []
@@ -0,0 +1,33 @@
+import datetime as dt
+from typing import Protocol
+
+from sqlmodel import Field
+
+from power_stash.models.storage.database import BaseTableModel
+
+
+class CoverageInterval(BaseTableModel, table=True):
+    """Contiguous interval of stored records of a series (area, request type and resource).
+
+    Intervals are computed from the stored records themselves (c.f. `CoverageIndex`), unlike
+    request statuses that only tell a request ran.
+    """
+
+    table_name: str
+    request_type: str
+    area: str
+    resource: str | None = Field(default=None, description="None for tables without resources.")
+    start: dt.datetime
+    end: dt.datetime = Field(description="End of the last record (excluded).")
+    row_count: int
+    indexed_at: dt.datetime = Field(
+        default_factory=lambda: dt.datetime.now(tz=dt.timezone.utc),
+    )
+
+
+class CoverageIndex(Protocol):
+    """Generic interface for indexing the intervals of stored records."""
+
+    def refresh_coverage(self) -> int:
+        """Compute the intervals of all the indexed tables again, returning their number."""
+        pass
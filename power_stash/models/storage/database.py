@@ -1,8 +1,10 @@
 import datetime as dt
+import hashlib
 from abc import ABC
 from typing import Any, Optional, Protocol, Type
 
-from sqlmodel import JSON, Column, Field, SQLModel
+from sqlalchemy import ColumnElement
+from sqlmodel import JSON, Column, Field, SQLModel, and_, or_
 from sqlmodel.sql.expression import Select, SelectOfScalar
 
 from power_stash.models.request import BaseRequest, RequestStatusType
@@ -16,12 +18,64 @@ class BaseTableModel(ABC, SQLModel):
     )
 
 
+class VersionedTableModel(BaseTableModel):
+    """Records that can be revised by the source, keeping a hash of their content."""
+
+    content_hash: str | None = Field(
+        default=None,
+        description="Hash of the content of the record, to detect revisions.",
+    )
+    last_updated: dt.datetime = Field(
+        default_factory=lambda: dt.datetime.now(tz=dt.timezone.utc),
+    )
+
+    def compute_content_hash(self) -> str:
+        """Hash of the fields of the record, except identifiers and timestamps of the update."""
+        content = self.model_dump_json(exclude={"uid", "content_hash", "last_updated"})
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()  # noqa: S324
+
+
 class RequestStatus(BaseTableModel, table=True):
     name: str
     start: dt.datetime
     end: dt.datetime
     status: RequestStatusType | None
     request: dict[str, Any] = Field(default={}, sa_column=Column(JSON))
+    attempts: int | None = Field(default=0)
+    last_error: str | None = Field(default=None, description="Class of the last error raised.")
+    next_attempt_at: dt.datetime | None = Field(
+        default=None,
+        description="When to retry a failed request, None if not to be retried (anymore).",
+    )
+    updated_at: dt.datetime | None = Field(
+        default_factory=lambda: dt.datetime.now(tz=dt.timezone.utc),
+        description="When the status was last recorded.",
+    )
+    duration_secs: float | None = Field(default=None, description="Time spent processing.")
+    fetch_duration_secs: float | None = Field(default=None, description="Time spent fetching.")
+    transform_duration_secs: float | None = Field(
+        default=None,
+        description="Time spent transforming.",
+    )
+    store_duration_secs: float | None = Field(default=None, description="Time spent storing.")
+    payload_bytes: int | None = Field(
+        default=None,
+        description="Size in memory of the raw data fetched.",
+    )
+    peak_memory_growth_bytes: int | None = Field(
+        default=None,
+        description="Largest growth of the peak resident memory of a worker by a stage.",
+    )
+    traced_peak_bytes: int | None = Field(
+        default=None,
+        description="Peak memory allocated by a stage of the request, when traced.",
+    )
+    row_count: int | None = Field(default=None, description="Number of records produced.")
+    fingerprint: str | None = Field(default=None, description="Hash of the raw data fetched.")
+    changed_row_count: int | None = Field(
+        default=None,
+        description="Number of records inserted or revised when stored.",
+    )
 
     @classmethod
     def from_request(cls, request: BaseRequest) -> "RequestStatus":  # noqa: ANN102
@@ -33,6 +87,45 @@ class RequestStatus(BaseTableModel, table=True):
             end=request.end,
             status=request.status,
             request=request.model_dump(mode="json"),
+            attempts=request.attempts,
+            last_error=request.last_error,
+            next_attempt_at=request.next_attempt_at,
+            duration_secs=request.metrics.get("duration_secs"),
+            fetch_duration_secs=request.metrics.get("fetch_duration_secs"),
+            transform_duration_secs=request.metrics.get("transform_duration_secs"),
+            store_duration_secs=request.metrics.get("store_duration_secs"),
+            payload_bytes=request.metrics.get("payload_bytes"),
+            peak_memory_growth_bytes=request.metrics.get("peak_memory_growth_bytes"),
+            traced_peak_bytes=request.metrics.get("traced_peak_bytes"),
+            row_count=request.metrics.get("row_count"),
+            fingerprint=request.fingerprint,
+            changed_row_count=request.metrics.get("changed_row_count"),
+        )
+
+    @classmethod
+    def skip_condition(
+        cls,  # noqa: ANN102
+        now: dt.datetime,
+        no_data_ttl: dt.timedelta | None = None,
+    ) -> ColumnElement[bool]:
+        """Condition matching the requests not to attempt (again) at a given time.
+
+        Successful requests are skipped, as well as failed ones that are either not due yet,
+        or that gave up after a permanent error (no next attempt planned).
+        Empty requests are skipped until `no_data_ttl` has elapsed since they were recorded,
+        for good if None.
+        Failures recorded before attempts were tracked have no `last_error` and are retried.
+        """
+        no_data_condition = cls.status == RequestStatusType.NO_DATA
+        if no_data_ttl is not None:
+            no_data_condition = and_(no_data_condition, cls.updated_at > now - no_data_ttl)
+        return or_(
+            cls.status.not_in([RequestStatusType.FAILURE, RequestStatusType.NO_DATA]),
+            no_data_condition,
+            and_(
+                cls.last_error.is_not(None),
+                or_(cls.next_attempt_at.is_(None), cls.next_attempt_at > now),
+            ),
         )
 
 
@@ -55,8 +148,12 @@ class DatabaseRepository(Protocol):
         """Add or Update a record."""
         pass
 
-    def bulk_add(self, *, records: list[BaseTableModel]) -> None:
-        """Bulk add records, with update logic."""
+    def bulk_add(self, *, records: list[BaseTableModel]) -> int:
+        """Bulk add records, with update logic, returning the number of new or revised records."""
+        pass
+
+    def bulk_add_or_update(self, *, records: list[BaseTableModel]) -> None:
+        """Bulk add records, overwriting the existing ones."""
         pass
 
     def get_existing_uids(
@@ -0,0 +1,182 @@
+import threading
+from enum import Enum
+from typing import Any, Callable, Type
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Dialect, Engine, SmallInteger, Table, TypeDecorator
+from sqlmodel import Field, SQLModel
+
+
+class LabelTableModel(SQLModel):
+    """Lookup table of the labels (e.g. areas) repeated in the rows of the fact tables."""
+
+    id: int | None = Field(default=None, primary_key=True, sa_type=SmallInteger)
+    label: str = Field(unique=True)
+
+
+class AreaLabel(LabelTableModel, table=True):
+    pass
+
+
+class ResourceLabel(LabelTableModel, table=True):
+    pass
+
+
+class UnitLabel(LabelTableModel, table=True):
+    pass
+
+
+LabelLoader = Callable[[Type[LabelTableModel]], dict[str, int]]
+
+
+class LabelCache:
+    """Ids of the labels of the lookup tables of a database, shared by its engines in a process.
+
+    Labels are registered by the repository before inserting records, labels of other
+    processes are loaded on first read with `loader`.
+    """
+
+    def __init__(self, loader: LabelLoader | None = None) -> None:
+        self.ids: dict[str, dict[str, int]] = {}
+        self.labels: dict[str, dict[int, str]] = {}
+        self.loader = loader
+        self.lock = threading.Lock()
+
+    def add(self, model: Type[LabelTableModel], ids: dict[str, int]) -> None:
+        """Cache the ids of labels of a lookup table."""
+        with self.lock:
+            self.ids.setdefault(model.__tablename__, {}).update(ids)
+            self.labels.setdefault(model.__tablename__, {}).update(
+                {v: k for k, v in ids.items()},
+            )
+
+    def missing(self, model: Type[LabelTableModel], labels: set[str]) -> set[str]:
+        """Labels without a cached id."""
+        return labels - self.ids.get(model.__tablename__, {}).keys()
+
+    def get_id(self, model: Type[LabelTableModel], label: str) -> int:
+        """Id of a label registered by the repository, (re)loading the lookup table if unknown."""
+        ids = self.ids.get(model.__tablename__, {})
+        if label not in ids and self.loader is not None:
+            self.add(model, self.loader(model))
+            ids = self.ids.get(model.__tablename__, {})
+        try:
+            return ids[label]
+        except KeyError as e:
+            raise KeyError(
+                f"Label {label!r} not registered in {model.__tablename__}, "
+                "labels are registered by the repository when adding records.",
+            ) from e
+
+    def get_label(self, model: Type[LabelTableModel], id_: int) -> str:
+        """Label of an id, (re)loading the lookup table if unknown."""
+        labels = self.labels.get(model.__tablename__, {})
+        if id_ not in labels and self.loader is not None:
+            self.add(model, self.loader(model))
+            labels = self.labels.get(model.__tablename__, {})
+        try:
+            return labels[id_]
+        except KeyError as e:
+            raise KeyError(f"Unknown id {id_} in {model.__tablename__}.") from e
+
+
+# label caches by database URL, and by dialect of the engines bound to them
+_label_caches: dict[str, LabelCache] = {}
+_dialect_label_caches: WeakKeyDictionary[Dialect, LabelCache] = WeakKeyDictionary()
+_label_caches_lock = threading.Lock()
+
+
+def bind_label_cache(engine: Engine, loader: LabelLoader) -> LabelCache:
+    """Label cache of the database of an engine, created with `loader` on first use.
+
+    Engines of the same database share a cache, used by the encoded columns of their
+    statements (c.f. `get_label_cache`).
+    """
+    url = engine.url.render_as_string(hide_password=False)
+    with _label_caches_lock:
+        label_cache = _label_caches.get(url)
+        if label_cache is None:
+            label_cache = LabelCache(loader)
+            _label_caches[url] = label_cache
+        _dialect_label_caches[engine.dialect] = label_cache
+    return label_cache
+
+
+def get_label_cache(dialect: Dialect) -> LabelCache:
+    """Label cache bound to the engine of a dialect."""
+    try:
+        return _dialect_label_caches[dialect]
+    except KeyError as e:
+        raise KeyError(
+            "No label cache bound to the engine, labels are bound by the repository.",
+        ) from e
+
+
+class EncodedLabel(TypeDecorator):
+    """Label stored as the small integer id of its row in a lookup table.
+
+    Values are bound and loaded as labels (or members of `enum_type`, by name), so that the
+    encoding is transparent to the models and queries.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(
+        self,
+        label_model: Type[LabelTableModel],
+        enum_type: Type[Enum] | None = None,
+    ) -> None:
+        super().__init__()
+        self.label_model = label_model
+        self.enum_type = enum_type
+
+    def to_label(self, value: Any) -> str:  # noqa: ANN401
+        """Label of a value of the column."""
+        if isinstance(value, Enum):
+            return value.name
+        return str(value)
+
+    def process_bind_param(
+        self,
+        value: Any,  # noqa: ANN401
+        dialect: Dialect,
+    ) -> int | None:
+        """Id of the label of a value, bound to statements."""
+        if value is None:
+            return None
+        return get_label_cache(dialect).get_id(self.label_model, self.to_label(value))
+
+    def process_result_value(
+        self,
+        value: int | None,
+        dialect: Dialect,
+    ) -> Any:  # noqa: ANN401
+        """Label of an id returned by queries, as the enum of the column if any."""
+        if value is None:
+            return None
+        label = get_label_cache(dialect).get_label(self.label_model, value)
+        if self.enum_type is not None:
+            return self.enum_type[label]
+        return label
+
+    @property
+    def python_type(self) -> type:
+        """Type of the values of the column."""
+        return self.enum_type or str
+
+
+def encoded_columns(table: Table) -> dict[str, EncodedLabel]:
+    """Types of the encoded columns of a table, by column name."""
+    return {c.name: c.type for c in table.columns if isinstance(c.type, EncodedLabel)}
+
+
+def label_field(
+    label_model: Type[LabelTableModel],
+    enum_type: Type[Enum] | None = None,
+) -> Any:  # noqa: ANN401
+    """Field of a table model stored as the id of its label in a lookup table."""
+    return Field(
+        sa_type=EncodedLabel(label_model, enum_type),
+        foreign_key=f"{label_model.__tablename__}.id",
+    )
@@ -0,0 +1,67 @@
+import datetime as dt
+from typing import Any, Protocol
+
+from sqlmodel import JSON, Column, Field
+
+from power_stash.models.request import BaseRequest
+from power_stash.models.storage.database import BaseTableModel, RequestStatus
+
+
+class QueuedRequest(BaseTableModel, table=True):
+    name: str
+    request: dict[str, Any] = Field(default={}, sa_column=Column(JSON))
+    priority: float = Field(default=0, description="Estimated cost, claimed by decreasing order.")
+    enqueued_at: dt.datetime = Field(
+        default_factory=lambda: dt.datetime.now(tz=dt.timezone.utc),
+    )
+    not_before: dt.datetime | None = Field(
+        default=None,
+        description="The request can't be claimed before this time (e.g. retry backoff).",
+    )
+    lease_owner: str | None = Field(default=None, description="Worker holding the request.")
+    lease_expires_at: dt.datetime | None = Field(
+        default=None,
+        description="Claimed requests are released if their lease is not extended in time.",
+    )
+
+    @classmethod
+    def from_request(
+        cls,  # noqa: ANN102
+        request: BaseRequest,
+        priority: float = 0,
+    ) -> "QueuedRequest":
+        """Create a QueuedRequest from a BaseRequest, sharing the uid of its RequestStatus."""
+        return cls(
+            uid=RequestStatus.from_request(request).uid,
+            name=type(request).__name__,
+            request=request.model_dump(mode="json"),
+            priority=priority,
+        )
+
+
+class WorkQueue(Protocol):
+    """Generic interface for a queue of requests shared by several workers."""
+
+    def enqueue(self, *, records: list[QueuedRequest]) -> int:
+        """Add requests to the queue, ignoring the ones already queued."""
+        pass
+
+    def claim(self, *, owner: str, batch_size: int, lease: dt.timedelta) -> list[QueuedRequest]:
+        """Claim a batch of available requests, for the duration of a lease."""
+        pass
+
+    def heartbeat(self, *, owner: str, uids: list[str], lease: dt.timedelta) -> int:
+        """Extend the lease of requests claimed by a worker."""
+        pass
+
+    def ack(self, *, owner: str, uid: str) -> None:
+        """Remove a processed request from the queue."""
+        pass
+
+    def release(self, *, owner: str, uid: str, not_before: dt.datetime | None = None) -> None:
+        """Give a claimed request back to the queue, to be retried after `not_before`."""
+        pass
+
+    def count(self) -> int:
+        """Count the requests in the queue."""
+        pass
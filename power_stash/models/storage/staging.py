@@ -0,0 +1,55 @@
+import datetime as dt
+from typing import Protocol, Type
+
+from power_stash.models.storage.database import BaseTableModel
+
+
+class StagingRepository(Protocol):
+    """Generic interface for replacing the records of a table over a period at once.
+
+    New records are written to a staging table first, then swapped in place of the existing
+    ones, rather than upserted record by record.
+    """
+
+    def align_period(
+        self,
+        model: Type[BaseTableModel],
+        *,
+        start: dt.datetime,
+        end: dt.datetime,
+    ) -> tuple[dt.datetime, dt.datetime]:
+        """Extend a period to the boundaries of the partitions of the table it overlaps."""
+        pass
+
+    def create_staging_table(self, model: Type[BaseTableModel]) -> None:
+        """Create an empty staging table for the records of a model."""
+        pass
+
+    def use_staging_table(self, model: Type[BaseTableModel]) -> None:
+        """Write the records of a model to its staging table from now on."""
+        pass
+
+    def reset_statuses(
+        self,
+        *,
+        name: str,
+        start: dt.datetime,
+        end: dt.datetime,
+        filters: dict[str, str] | None = None,
+    ) -> int:
+        """Reset the statuses of the requests overlapping a period, returning their number."""
+        pass
+
+    def swap_staging_table(
+        self,
+        model: Type[BaseTableModel],
+        *,
+        start: dt.datetime,
+        end: dt.datetime,
+    ) -> int:
+        """Replace the records of a period by the staged ones, returning their number."""
+        pass
+
+    def drop_staging_table(self, model: Type[BaseTableModel]) -> None:
+        """Drop the staging table of a model."""
+        pass
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic import Field, PostgresDsn, SecretStr
 from pydantic_settings import BaseSettings
 
@@ -20,3 +22,9 @@ class DatabaseSettings(BaseSettings):
             port=self.port,
             path=self.db_name,
         ).unicode_string()
+
+
+@lru_cache(maxsize=1)
+def get_database_settings() -> DatabaseSettings:
+    """Load the database settings once, on first use rather than at import time."""
+    return DatabaseSettings()  # type: ignore
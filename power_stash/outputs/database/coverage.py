@@ -0,0 +1,109 @@
+import structlog
+from sqlalchemy import text
+
+from power_stash.models.storage.coverage import CoverageIndex, CoverageInterval
+from power_stash.models.storage.database import BaseTableModel
+from power_stash.models.storage.labels import encoded_columns
+from power_stash.outputs.database.repository import SqlRepository
+from power_stash.outputs.database.tables import coverage_tables
+
+logger = structlog.get_logger()
+
+# records further apart than this step are in different intervals, e.g. hourly records
+COVERAGE_STEP = "1 hour"
+
+# columns of `CoverageInterval`, in the order selected by `coverage_query`
+COVERAGE_COLUMNS = (
+    'uid, table_name, request_type, area, resource, start, "end", row_count, indexed_at'
+)
+
+
+class SqlCoverageIndex(SqlRepository, CoverageIndex):
+    """Intervals of stored records, computed with a single query by table.
+
+    Records are grouped in intervals by series (area and resource) with window functions
+    (gaps and islands): a record further than `COVERAGE_STEP` from the previous one of its
+    series starts a new interval.
+    """
+
+    @staticmethod
+    def coverage_query(model: BaseTableModel) -> str:
+        """Query of the intervals of a table, with the labels of their series."""
+        table = model.__table__
+        label_tables = {
+            name: column_type.label_model.__tablename__
+            for name, column_type in encoded_columns(table).items()
+        }
+        series_columns = [t for t in ("area", "resource") if t in table.columns]
+        partition = ", ".join(f't."{t}"' for t in series_columns)
+        series = ", ".join(f'"{t}"' for t in series_columns)
+        joins = "\n        ".join(
+            f'JOIN "{label_tables[t]}" AS l_{t} ON l_{t}.id = i."{t}"' for t in series_columns
+        )
+        resource_label = "l_resource.label" if "resource" in series_columns else "NULL::text"
+        return f"""
+        SELECT
+            md5(concat_ws('_', :table_name, l_area.label, {resource_label}, i.start::text)),
+            :table_name,
+            :request_type,
+            l_area.label,
+            {resource_label},
+            i.start,
+            i."end",
+            i.row_count,
+            now()
+        FROM (
+            SELECT
+                {series},
+                min("timestamp") AS start,
+                max("timestamp") + interval '{COVERAGE_STEP}' AS "end",
+                count(*) AS row_count
+            FROM (
+                SELECT
+                    {series},
+                    "timestamp",
+                    sum(is_start) OVER (PARTITION BY {series} ORDER BY "timestamp") AS island
+                FROM (
+                    SELECT
+                        {partition},
+                        t."timestamp",
+                        CASE
+                            WHEN t."timestamp" - lag(t."timestamp") OVER (
+                                PARTITION BY {partition} ORDER BY t."timestamp"
+                            ) <= interval '{COVERAGE_STEP}' THEN 0
+                            ELSE 1
+                        END AS is_start
+                    FROM "{table.name}" AS t
+                ) AS steps
+            ) AS islands
+            GROUP BY {series}, island
+        ) AS i
+        {joins}
+        """
+
+    def refresh_coverage(self) -> int:
+        """Compute the intervals of all the indexed tables again, returning their number.
+
+        The index is replaced in a single transaction, readers never see a partial index.
+        """
+        engine = self._get_connection()
+        count_intervals = 0
+        with engine.begin() as connection:
+            connection.execute(
+                text(f'DELETE FROM "{CoverageInterval.__tablename__}"'),  # noqa: S608
+            )
+            for model, request_type in coverage_tables:
+                result = connection.execute(
+                    text(
+                        f'INSERT INTO "{CoverageInterval.__tablename__}" ({COVERAGE_COLUMNS}) '
+                        f"{self.coverage_query(model)}",
+                    ),
+                    {"table_name": model.__tablename__, "request_type": request_type},
+                )
+                count_intervals += result.rowcount
+                logger.debug(
+                    event="Indexed coverage.",
+                    table=model.__tablename__,
+                    count_intervals=result.rowcount,
+                )
+        return count_intervals
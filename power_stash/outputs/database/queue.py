@@ -0,0 +1,119 @@
+import datetime as dt
+
+import structlog
+from sqlalchemy import Interval, func, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, delete, select, update
+
+from power_stash.models.storage.queue import QueuedRequest, WorkQueue
+from power_stash.outputs.database.repository import SqlRepository
+
+logger = structlog.get_logger()
+
+
+class SqlWorkQueue(SqlRepository, WorkQueue):
+    """Work queue stored in a Postgres table.
+
+    Workers claim batches with `SELECT ... FOR UPDATE SKIP LOCKED`, so that concurrent workers
+    (on any machine) never claim the same request. Claimed requests hold a lease, extended by
+    heartbeats, and become available again once it expires (e.g. if the worker died).
+    Times are taken from the database clock to be consistent across machines.
+    """
+
+    def enqueue(self, *, records: list[QueuedRequest]) -> int:
+        """Add requests to the queue, ignoring the ones already queued."""
+        if not records:
+            return 0
+        engine = self._get_connection()
+        statement = (
+            insert(QueuedRequest)
+            .values([t.model_dump() for t in records])
+            .on_conflict_do_nothing(index_elements=["uid"])
+        )
+        with Session(engine) as session:
+            result = session.execute(statement)
+            session.commit()
+        logger.debug(
+            event="Enqueued requests.",
+            count_requests=len(records),
+            count_new_requests=result.rowcount,
+        )
+        return result.rowcount
+
+    def claim(self, *, owner: str, batch_size: int, lease: dt.timedelta) -> list[QueuedRequest]:
+        """Claim a batch of available requests, by decreasing priority."""
+        engine = self._get_connection()
+        now = func.now()
+        available = (
+            select(QueuedRequest.uid)
+            .where(
+                (QueuedRequest.lease_expires_at.is_(None)) | (QueuedRequest.lease_expires_at < now),
+            )
+            .where((QueuedRequest.not_before.is_(None)) | (QueuedRequest.not_before <= now))
+            .order_by(QueuedRequest.priority.desc())
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        statement = (
+            update(QueuedRequest)
+            .where(QueuedRequest.uid.in_(available.scalar_subquery()))
+            .values(
+                lease_owner=owner,
+                lease_expires_at=now + literal(lease, type_=Interval()),
+            )
+            .returning(QueuedRequest.uid, QueuedRequest.name, QueuedRequest.request)
+        )
+        with Session(engine) as session:
+            claimed = [
+                QueuedRequest(uid=uid, name=name, request=request)
+                for uid, name, request in session.execute(statement).all()
+            ]
+            session.commit()
+        return claimed
+
+    def heartbeat(self, *, owner: str, uids: list[str], lease: dt.timedelta) -> int:
+        """Extend the lease of requests claimed by a worker."""
+        if not uids:
+            return 0
+        engine = self._get_connection()
+        statement = (
+            update(QueuedRequest)
+            .where(QueuedRequest.uid.in_(uids))
+            .where(QueuedRequest.lease_owner == owner)
+            .values(lease_expires_at=func.now() + literal(lease, type_=Interval()))
+        )
+        with Session(engine) as session:
+            result = session.execute(statement)
+            session.commit()
+        return result.rowcount
+
+    def ack(self, *, owner: str, uid: str) -> None:
+        """Remove a processed request from the queue."""
+        engine = self._get_connection()
+        statement = (
+            delete(QueuedRequest)
+            .where(QueuedRequest.uid == uid)
+            .where(QueuedRequest.lease_owner == owner)
+        )
+        with Session(engine) as session:
+            session.execute(statement)
+            session.commit()
+
+    def release(self, *, owner: str, uid: str, not_before: dt.datetime | None = None) -> None:
+        """Give a claimed request back to the queue, to be retried after `not_before`."""
+        engine = self._get_connection()
+        statement = (
+            update(QueuedRequest)
+            .where(QueuedRequest.uid == uid)
+            .where(QueuedRequest.lease_owner == owner)
+            .values(lease_owner=None, lease_expires_at=None, not_before=not_before)
+        )
+        with Session(engine) as session:
+            session.execute(statement)
+            session.commit()
+
+    def count(self) -> int:
+        """Count the requests in the queue."""
+        engine = self._get_connection()
+        with Session(engine) as session:
+            return session.exec(select(func.count()).select_from(QueuedRequest)).one()
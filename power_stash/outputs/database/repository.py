@@ -1,40 +1,77 @@
+import datetime as dt
 from typing import Any, Optional, Sequence, Type
 
 import pandas as pd
 import structlog
 from pandas.core.api import DataFrame as DataFrame
-from sqlalchemy import Engine, text
-from sqlalchemy.exc import IntegrityError, NotSupportedError
+from sqlalchemy import Engine, Integer, MetaData, Table, inspect, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import NotSupportedError
 from sqlmodel import Session, create_engine, select
 from sqlmodel.sql.expression import Select, SelectOfScalar
 
-from power_stash.models.storage.database import DatabaseRepository
-from power_stash.outputs.database.config import DatabaseSettings
-from power_stash.outputs.database.tables import BaseTableModel, SQLModel, hypter_tables
+from power_stash.models.storage.database import DatabaseRepository, RequestStatus
+from power_stash.models.storage.labels import (
+    LabelTableModel,
+    bind_label_cache,
+    encoded_columns,
+    get_label_cache,
+)
+from power_stash.models.storage.staging import StagingRepository
+from power_stash.outputs.database.config import get_database_settings
+from power_stash.outputs.database.tables import BaseTableModel, SQLModel, hypter_tables, views
 
 logger = structlog.get_logger()
 
+# bind parameters accepted by Postgres in a single statement
+MAX_QUERY_PARAMETERS = 32_767
 
-class SqlRepository(DatabaseRepository):
+# size of the chunks of hypertables partitioned by an integer column (e.g. 10 years)
+INTEGER_PARTITION_INTERVAL = 10
+
+STAGING_TABLE_SUFFIX = "_staging"
+
+
+def deduplicate_records(
+    records: list[BaseTableModel],
+    primary_keys: list[str],
+) -> list[BaseTableModel]:
+    """Keep the last of the records sharing a primary key (e.g. revised values of a series).
+
+    A single upsert statement can't affect the same row twice.
+    """
+    records_by_key = {tuple(getattr(t, k) for k in primary_keys): t for t in records}
+    return list(records_by_key.values())
+
+
+class SqlRepository(DatabaseRepository, StagingRepository):
     def __init__(self, init_db: bool = False) -> None:
-        self.db_settings = DatabaseSettings()  # type: ignore
+        self.db_settings = get_database_settings()
+        self._engine: Engine | None = None
+        # staging tables the records of some models are written to, by name of their table
+        self.staging_tables: dict[str, Table] = {}
         if init_db:
             self.init_db()
         self.tables = self.list_tables()
 
     def _get_connection(self) -> Engine:
-        return create_engine(
-            self.db_settings.connection,
-            echo=False,
-            pool_pre_ping=True,
-            # pool_size=40,
-            # connect_args={
-            #     "keepalives": 1,
-            #     "keepalives_idle": 30,
-            #     "keepalives_interval": 10,
-            #     "keepalives_count": 5,
-            # },
-        )
+        # the engine (and its connection pool) is created once and reused by the repository.
+        if self._engine is None:
+            self._engine = create_engine(
+                self.db_settings.connection,
+                echo=False,
+                pool_pre_ping=True,
+                # pool_size=40,
+                # connect_args={
+                #     "keepalives": 1,
+                #     "keepalives_idle": 30,
+                #     "keepalives_interval": 10,
+                #     "keepalives_count": 5,
+                # },
+            )
+            # labels of ids unknown to the process are loaded from the lookup tables
+            bind_label_cache(self._engine, loader=self.load_labels)
+        return self._engine
 
     @staticmethod
     def create_hypertable(session: Session, model: BaseTableModel, time_column_name: str) -> None:
@@ -43,14 +80,30 @@ class SqlRepository(DatabaseRepository):
         Note: Make sure the time_column_name is a primary key for the chosen table...
         """
         table_name = model.__tablename__
-        create_hypertable_query = """
-        SELECT create_hypertable(:table_name, by_range(:time_column_name), if_not_exists => TRUE);
-        """
+        params = {"table_name": table_name, "time_column_name": time_column_name}
+        if model.__table__.c[time_column_name].type.python_type is int:
+            # integer time columns (e.g. years) require an explicit partition interval
+            create_hypertable_query = """
+            SELECT create_hypertable(
+                :table_name,
+                by_range(:time_column_name, :partition_interval),
+                if_not_exists => TRUE
+            );
+            """
+            params["partition_interval"] = INTEGER_PARTITION_INTERVAL
+        else:
+            create_hypertable_query = """
+            SELECT create_hypertable(
+                :table_name,
+                by_range(:time_column_name),
+                if_not_exists => TRUE
+            );
+            """
 
         try:
             session.exec(
                 statement=text(create_hypertable_query),  # type: ignore
-                params={"table_name": table_name, "time_column_name": time_column_name},
+                params=params,
             )  # type: ignore
             session.commit()
         except NotSupportedError as e:
@@ -59,13 +112,185 @@ class SqlRepository(DatabaseRepository):
             if "not empty" not in str(e):
                 raise
 
+    @staticmethod
+    def add_missing_columns(engine: Engine) -> None:
+        """Add the (nullable) columns defined in the models but missing in existing tables.
+
+        Note: `create_all` only creates missing tables, this keeps tables created by previous
+        versions of the models up-to-date when new fields are added.
+        """
+        inspector = inspect(engine)
+        with engine.begin() as connection:
+            for table in SQLModel.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing_columns:
+                        continue
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(
+                        text(
+                            f'ALTER TABLE "{table.name}" '
+                            f'ADD COLUMN IF NOT EXISTS "{column.name}" {column_type}',
+                        ),
+                    )
+                    logger.info(
+                        event="Added missing column.",
+                        table=table.name,
+                        column=column.name,
+                    )
+
+    @staticmethod
+    def update_primary_keys(engine: Engine) -> None:
+        """Replace the primary keys of existing tables by the ones defined in the models.
+
+        Note: tables created by previous versions of the models keep their primary key, while
+        hypertables need their partitioning column (e.g. `year`) in it before being created.
+        """
+        inspector = inspect(engine)
+        with engine.begin() as connection:
+            for table in SQLModel.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing_primary_key = inspector.get_pk_constraint(table.name)
+                primary_key = [c.name for c in table.primary_key.columns]
+                if set(existing_primary_key["constrained_columns"]) == set(primary_key):
+                    continue
+                if existing_primary_key["name"] is not None:
+                    connection.execute(
+                        text(
+                            f'ALTER TABLE "{table.name}" '
+                            f'DROP CONSTRAINT "{existing_primary_key["name"]}"',
+                        ),
+                    )
+                columns = ", ".join(f'"{t}"' for t in primary_key)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD PRIMARY KEY ({columns})'))
+                logger.info(
+                    event="Updated primary key.",
+                    table=table.name,
+                    primary_key=primary_key,
+                )
+
+    @staticmethod
+    def encode_label_columns(engine: Engine) -> None:
+        """Replace the label columns of existing tables by the ids of their labels.
+
+        Note: tables created by previous versions of the models store labels (e.g. areas) in
+        each row, their distinct values are moved to the lookup tables and the columns are
+        replaced by foreign keys to them.
+        """
+        inspector = inspect(engine)
+        with engine.begin() as connection:
+            for table in SQLModel.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing_types = {c["name"]: c["type"] for c in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    existing_type = existing_types.get(column.name)
+                    if column.name not in encoded_columns(table) or existing_type is None:
+                        continue
+                    if isinstance(existing_type, Integer):
+                        # already encoded
+                        continue
+                    label_table = column.type.label_model.__tablename__
+                    encoded_name = f"{column.name}_id"
+                    for statement in (
+                        f'INSERT INTO "{label_table}" (label) '  # noqa: S608
+                        f'SELECT DISTINCT "{column.name}"::text FROM "{table.name}" '
+                        f'WHERE "{column.name}" IS NOT NULL ON CONFLICT (label) DO NOTHING',
+                        f'ALTER TABLE "{table.name}" ADD COLUMN "{encoded_name}" SMALLINT',
+                        f'UPDATE "{table.name}" AS t SET "{encoded_name}" = l.id '  # noqa: S608
+                        f'FROM "{label_table}" AS l WHERE l.label = t."{column.name}"::text',
+                        f'ALTER TABLE "{table.name}" DROP COLUMN "{column.name}"',
+                        f'ALTER TABLE "{table.name}" '
+                        f'RENAME COLUMN "{encoded_name}" TO "{column.name}"',
+                        f'ALTER TABLE "{table.name}" ALTER COLUMN "{column.name}" '
+                        f"{'DROP' if column.nullable else 'SET'} NOT NULL",
+                        f'ALTER TABLE "{table.name}" ADD FOREIGN KEY ("{column.name}") '
+                        f'REFERENCES "{label_table}" (id)',
+                    ):
+                        connection.execute(text(statement))
+                    logger.info(
+                        event="Encoded label column.",
+                        table=table.name,
+                        column=column.name,
+                        label_table=label_table,
+                    )
+
+    def load_labels(self, model: Type[LabelTableModel]) -> dict[str, int]:
+        """Load the ids of all the labels of a lookup table."""
+        with Session(self._get_connection()) as session:
+            return {t.label: t.id for t in session.exec(select(model)).all()}
+
+    def register_labels(
+        self,
+        *,
+        records: list[BaseTableModel],
+        engine: Engine | None = None,
+    ) -> None:
+        """Add the labels of records missing in the lookup tables, caching their ids.
+
+        Labels are committed before (and independently of) the records, so that cached ids
+        always exist, even if the records are rolled back.
+        """
+        columns = encoded_columns(type(records[0]).__table__) if records else {}
+        if not columns:
+            return
+        if engine is None:
+            engine = self._get_connection()
+        label_cache = get_label_cache(engine.dialect)
+        for name, column_type in columns.items():
+            label_model = column_type.label_model
+            labels = {
+                column_type.to_label(getattr(t, name))
+                for t in records
+                if getattr(t, name) is not None
+            }
+            missing_labels = label_cache.missing(label_model, labels)
+            if not missing_labels:
+                continue
+            label_table = label_model.__table__
+            with engine.begin() as connection:
+                connection.execute(
+                    insert(label_table)
+                    .values([{"label": t} for t in sorted(missing_labels)])
+                    .on_conflict_do_nothing(index_elements=["label"]),
+                )
+                ids = connection.execute(
+                    select(label_table.c.label, label_table.c.id).where(
+                        label_table.c.label.in_(missing_labels),
+                    ),
+                ).all()
+            label_cache.add(label_model, dict(ids))
+            logger.debug(
+                event="Registered labels.",
+                label_table=label_table.name,
+                labels=sorted(missing_labels),
+            )
+
+    @staticmethod
+    def create_view(session: Session, name: str, query: str) -> None:
+        """Create (or replace) a view, e.g. exposing a table in another layout."""
+        session.exec(
+            statement=text(f'CREATE OR REPLACE VIEW "{name}" AS {query}'),  # type: ignore
+        )
+        session.commit()
+
     def init_db(self) -> None:
-        """Create all tables."""
+        """Create all tables (and views)."""
         engine = self._get_connection()
         SQLModel.metadata.create_all(bind=engine, checkfirst=True)
+        # views are recreated below, once the columns they select are up-to-date
+        self.drop_views(engine)
+        self.encode_label_columns(engine)
+        self.add_missing_columns(engine)
+        self.update_primary_keys(engine)
         with Session(engine) as session:
             for model, time_column_name in hypter_tables:
                 self.create_hypertable(session, model, time_column_name)
+            for name, query in views:
+                self.create_view(session, name, query)
         logger.debug(
             event="Init SQL repository.",
             db_settings=self.db_settings,
@@ -87,15 +312,206 @@ class SqlRepository(DatabaseRepository):
         """List all tables."""
         return [t.name for t in SQLModel.metadata.sorted_tables]
 
+    @staticmethod
+    def drop_views(engine: Engine) -> None:
+        """Drop all views."""
+        with engine.begin() as connection:
+            for name, _ in views:
+                connection.execute(text(f'DROP VIEW IF EXISTS "{name}"'))
+
     def drop_tables(self) -> None:
-        """Drop all tables."""
+        """Drop all tables (and views)."""
         engine = self._get_connection()
+        self.drop_views(engine)
         BaseTableModel.metadata.drop_all(bind=engine)
 
+    @staticmethod
+    def _time_column_name(model: Type[BaseTableModel]) -> str:
+        """Time column of a hypertable partitioned by timestamps."""
+        time_column_name = dict(hypter_tables).get(model)
+        if (
+            time_column_name is None
+            or model.__table__.c[time_column_name].type.python_type is not dt.datetime
+        ):
+            raise ValueError(f"{model.__tablename__} is not a hypertable partitioned by time.")
+        return time_column_name
+
+    @staticmethod
+    def _staging_table_name(model: Type[BaseTableModel]) -> str:
+        return f"{model.__tablename__}{STAGING_TABLE_SUFFIX}"
+
+    def align_period(
+        self,
+        model: Type[BaseTableModel],
+        *,
+        start: dt.datetime,
+        end: dt.datetime,
+    ) -> tuple[dt.datetime, dt.datetime]:
+        """Extend a period to the boundaries of the chunks of the hypertable it overlaps.
+
+        So that the chunks of the period are replaced whole (c.f. `swap_staging_table`).
+        """
+        self._time_column_name(model)
+        with self._get_connection().connect() as connection:
+            chunks_start, chunks_end = connection.execute(
+                text(
+                    """
+                    SELECT min(range_start), max(range_end)
+                    FROM timescaledb_information.chunks
+                    WHERE hypertable_name = :table_name
+                        AND range_start < :end
+                        AND range_end > :start
+                    """,
+                ),
+                {"table_name": model.__tablename__, "start": start, "end": end},
+            ).one()
+        if chunks_start is None:
+            # no records stored over the period yet
+            return start, end
+        return min(start, chunks_start), max(end, chunks_end)
+
+    def create_staging_table(self, model: Type[BaseTableModel]) -> None:
+        """Create an empty staging table, with the columns and primary key of the table.
+
+        The staging table is unlogged: it's only written once, and dropped once swapped in.
+        """
+        staging_table_name = self._staging_table_name(model)
+        with self._get_connection().begin() as connection:
+            connection.execute(text(f'DROP TABLE IF EXISTS "{staging_table_name}"'))
+            connection.execute(
+                text(
+                    f'CREATE UNLOGGED TABLE "{staging_table_name}" '
+                    f'(LIKE "{model.__tablename__}" INCLUDING DEFAULTS INCLUDING INDEXES)',
+                ),
+            )
+        logger.debug(event="Created staging table.", staging_table=staging_table_name)
+
+    def use_staging_table(self, model: Type[BaseTableModel]) -> None:
+        """Write the records of a model to its staging table from now on (c.f. `bulk_add`)."""
+        self.staging_tables[model.__tablename__] = model.__table__.to_metadata(
+            MetaData(),
+            name=self._staging_table_name(model),
+        )
+
+    def reset_statuses(
+        self,
+        *,
+        name: str,
+        start: dt.datetime,
+        end: dt.datetime,
+        filters: dict[str, str] | None = None,
+    ) -> int:
+        """Reset the statuses of the requests overlapping a period, with a single statement.
+
+        Reset requests are planned again, and their raw data transformed again even if
+        unchanged (c.f. `fingerprint`). Requests are filtered by name and, with `filters`, by
+        the fields of the requests, e.g. `{"request_type": "generation"}`. Requests across the
+        bounds of the period are reset too, their records within it being replaced.
+        """
+        statement = (
+            update(RequestStatus)
+            .where(
+                RequestStatus.name == name,
+                RequestStatus.start < end,
+                RequestStatus.end > start,
+                *[RequestStatus.request[k].as_string() == v for k, v in (filters or {}).items()],
+            )
+            .values(
+                status=None,
+                attempts=0,
+                last_error=None,
+                next_attempt_at=None,
+                fingerprint=None,
+                updated_at=dt.datetime.now(tz=dt.timezone.utc),
+            )
+        )
+        with self._get_connection().begin() as connection:
+            count_statuses = connection.execute(statement).rowcount
+        logger.debug(event="Reset statuses.", name=name, count_statuses=count_statuses)
+        return count_statuses
+
+    def swap_staging_table(
+        self,
+        model: Type[BaseTableModel],
+        *,
+        start: dt.datetime,
+        end: dt.datetime,
+    ) -> int:
+        """Replace the records of a period by the staged ones, in a single transaction.
+
+        Chunks of the hypertable within the period are dropped rather than their records
+        deleted row by row, then staged records are inserted in bulk, from the staging table.
+        The staging table is dropped once swapped in. Nothing is swapped (and the stored records
+        are kept) if no records were staged, e.g. if the requests produce records of another
+        table (layout, resolution) or returned no data.
+        """
+        time_column_name = self._time_column_name(model)
+        table_name = model.__tablename__
+        staging_table_name = self._staging_table_name(model)
+        columns = ", ".join(f'"{t.name}"' for t in model.__table__.columns)
+        params = {"table_name": table_name, "start": start, "end": end}
+        with self._get_connection().begin() as connection:
+            is_empty = (
+                connection.execute(
+                    text(f'SELECT 1 FROM "{staging_table_name}" LIMIT 1'),  # noqa: S608
+                ).first()
+                is None
+            )
+            if is_empty:
+                logger.warning(
+                    event="No records staged, nothing to swap.",
+                    table=table_name,
+                    start=start,
+                    end=end,
+                )
+                connection.execute(text(f'DROP TABLE "{staging_table_name}"'))
+                return 0
+            count_dropped_chunks = len(
+                connection.execute(
+                    text(
+                        "SELECT drop_chunks(:table_name, older_than => :end, newer_than => :start)",
+                    ),
+                    params,
+                ).all(),
+            )
+            # records of chunks partially within the period (none once aligned to chunks)
+            count_deleted_records = connection.execute(
+                text(
+                    f'DELETE FROM "{table_name}" '  # noqa: S608
+                    f'WHERE "{time_column_name}" >= :start AND "{time_column_name}" < :end',
+                ),
+                params,
+            ).rowcount
+            count_records = connection.execute(
+                text(
+                    f'INSERT INTO "{table_name}" ({columns}) '  # noqa: S608
+                    f'SELECT {columns} FROM "{staging_table_name}" '
+                    f'WHERE "{time_column_name}" >= :start AND "{time_column_name}" < :end',
+                ),
+                params,
+            ).rowcount
+            connection.execute(text(f'DROP TABLE "{staging_table_name}"'))
+        logger.info(
+            event="Swapped staging table.",
+            table=table_name,
+            start=start,
+            end=end,
+            count_dropped_chunks=count_dropped_chunks,
+            count_deleted_records=count_deleted_records,
+            count_records=count_records,
+        )
+        return count_records
+
+    def drop_staging_table(self, model: Type[BaseTableModel]) -> None:
+        """Drop the staging table of a model, e.g. when a re-ingest is aborted."""
+        with self._get_connection().begin() as connection:
+            connection.execute(text(f'DROP TABLE IF EXISTS "{self._staging_table_name(model)}"'))
+
     def add(self, *, record: BaseTableModel, engine: Engine | None = None) -> bool:
         """Add record."""
         if engine is None:
             engine = self._get_connection()
+        self.register_labels(records=[record], engine=engine)
         with Session(engine) as session:
             session.add(record)
             session.commit()
@@ -105,6 +521,7 @@ class SqlRepository(DatabaseRepository):
         """Add or update record."""
         if engine is None:
             engine = self._get_connection()
+        self.register_labels(records=[record], engine=engine)
         with Session(engine) as session:
             existing_record = session.get(type(record), record.uid)
             if existing_record:
@@ -136,49 +553,115 @@ class SqlRepository(DatabaseRepository):
         *,
         records: list[BaseTableModel],
         engine: Engine | None = None,
-    ) -> bool:
-        """Bulk add records, with update logic."""
+    ) -> int:
+        """Bulk add records, with update logic.
+
+        Records are upserted: new records are inserted and, for records tracking their content
+        (`content_hash`), existing ones are only updated when their content was revised.
+        Other existing records are left untouched. Records of several models are stored table by
+        table.
+        Returns the number of records inserted or revised.
+        """
         if not records:
-            return False
+            return 0
+        model_types = list(dict.fromkeys(type(t) for t in records))
+        if len(model_types) > 1:
+            # e.g. hourly and native records of a request, stored table by table
+            return sum(
+                self.bulk_add(records=[t for t in records if type(t) is m], engine=engine)
+                for m in model_types
+            )
 
         # get SQLModel class
         model_type = type(records[0])
+        table = self.staging_tables.get(model_type.__tablename__, model_type.__table__)
+        primary_keys = [c.name for c in table.primary_key.columns]
+        records = deduplicate_records(records, primary_keys)
+        # keep statements within the limit of parameters per query
+        batch_size = max(MAX_QUERY_PARAMETERS // len(table.columns), 1)
 
-        # store all new records
         if engine is None:
             engine = self._get_connection()
+        self.register_labels(records=records, engine=engine)
+        count_upserted_records = 0
         with Session(engine) as session:
             try:
-                with session.begin():
-                    session.bulk_save_objects(
-                        records,
-                        preserve_order=False,
-                        update_changed_only=False,
+                for i in range(0, len(records), batch_size):
+                    statement = insert(table).values(
+                        [t.model_dump() for t in records[i : i + batch_size]],
                     )
-            except IntegrityError:
-                session.rollback()
-                logger.debug(event="Bulk insert failed, removing existing records.")
-                existing_uids = self.get_existing_uids(
-                    model_type=model_type,
-                )
-                new_records = [t for t in records if t.uid not in existing_uids]
-                for record in new_records:
-                    self.add(record=record, engine=engine)
-                # return self.bulk_add(records=new_records, engine=engine)
-                return True
+                    if "content_hash" in table.columns:
+                        statement = statement.on_conflict_do_update(
+                            index_elements=primary_keys,
+                            set_={
+                                c.name: statement.excluded[c.name]
+                                for c in table.columns
+                                if c.name not in primary_keys
+                            },
+                            where=table.c.content_hash.is_distinct_from(
+                                statement.excluded.content_hash,
+                            ),
+                        )
+                    else:
+                        statement = statement.on_conflict_do_nothing(index_elements=primary_keys)
+                    count_upserted_records += session.execute(statement).rowcount
+                session.commit()
             except Exception as e:
                 session.rollback()
                 raise e
-            else:
-                session.commit()
 
         logger.debug(
             event="Bulk add records successful!",
             destination_table=model_type.__name__,
-            count_new_records=len(records),
-            # count_requested_records=len(records),
+            count_requested_records=len(records),
+            count_new_or_revised_records=count_upserted_records,
+        )
+        return count_upserted_records
+
+    def bulk_add_or_update(
+        self,
+        *,
+        records: list[BaseTableModel],
+        engine: Engine | None = None,
+    ) -> None:
+        """Bulk add records, overwriting all the fields of existing ones (e.g. statuses)."""
+        if not records:
+            return
+
+        model_type = type(records[0])
+        table = model_type.__table__
+        primary_keys = [c.name for c in table.primary_key.columns]
+        records = deduplicate_records(records, primary_keys)
+        batch_size = max(MAX_QUERY_PARAMETERS // len(table.columns), 1)
+
+        if engine is None:
+            engine = self._get_connection()
+        self.register_labels(records=records, engine=engine)
+        with Session(engine) as session:
+            try:
+                for i in range(0, len(records), batch_size):
+                    statement = insert(table).values(
+                        [t.model_dump() for t in records[i : i + batch_size]],
+                    )
+                    statement = statement.on_conflict_do_update(
+                        index_elements=primary_keys,
+                        set_={
+                            c.name: statement.excluded[c.name]
+                            for c in table.columns
+                            if c.name not in primary_keys
+                        },
+                    )
+                    session.execute(statement)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                raise e
+
+        logger.debug(
+            event="Bulk add or update records successful!",
+            destination_table=model_type.__name__,
+            count_records=len(records),
         )
-        return True
 
     def get(
         self,
@@ -3,15 +3,51 @@
 from sqlmodel import SQLModel  # noqa: F401
 
 from power_stash.inputs.entsoe.models import (
+    GENERATION_LONG_VIEW_NAME,
     EntsoeHourlyConsumption,
     EntsoeHourlyDayAheadPrice,
     EntsoeHourlyGeneration,
+    EntsoeHourlyGenerationWide,
+    EntsoeNativeConsumption,
+    EntsoeNativeGeneration,
+    EntsoeYearlyInstalledCapacity,
 )
+from power_stash.inputs.entsoe.request import RequestType
+from power_stash.models.storage.coverage import CoverageInterval  # noqa: F401
 from power_stash.models.storage.database import BaseTableModel  # noqa: F401
+from power_stash.models.storage.labels import AreaLabel, ResourceLabel, UnitLabel  # noqa: F401
+from power_stash.models.storage.queue import QueuedRequest  # noqa: F401
 
 # Add in the list all models for which we want to create hypertables for
 hypter_tables = [
     (EntsoeHourlyConsumption, "timestamp"),
     (EntsoeHourlyGeneration, "timestamp"),
+    (EntsoeHourlyGenerationWide, "timestamp"),
     (EntsoeHourlyDayAheadPrice, "timestamp"),
+    (EntsoeNativeConsumption, "timestamp"),
+    (EntsoeNativeGeneration, "timestamp"),
+    (EntsoeYearlyInstalledCapacity, "year"),
 ]
+
+# views (name and query) created (or replaced) with the tables
+views = [
+    (GENERATION_LONG_VIEW_NAME, EntsoeHourlyGenerationWide.long_view_query()),
+]
+
+# tables whose intervals of stored records are indexed (hourly records), with their request type
+coverage_tables = [
+    (EntsoeHourlyConsumption, RequestType.CONSUMPTION.value),
+    (EntsoeHourlyGeneration, RequestType.GENERATION.value),
+    (EntsoeHourlyGenerationWide, RequestType.GENERATION.value),
+    (EntsoeHourlyDayAheadPrice, RequestType.DAY_AHEAD_PRICE.value),
+]
+
+# request type producing the records of each table partitioned by time, e.g. to re-ingest them
+table_request_types = {
+    EntsoeHourlyConsumption: RequestType.CONSUMPTION.value,
+    EntsoeHourlyGeneration: RequestType.GENERATION.value,
+    EntsoeHourlyGenerationWide: RequestType.GENERATION.value,
+    EntsoeHourlyDayAheadPrice: RequestType.DAY_AHEAD_PRICE.value,
+    EntsoeNativeConsumption: RequestType.CONSUMPTION.value,
+    EntsoeNativeGeneration: RequestType.GENERATION.value,
+}
@@ -1,40 +1,81 @@
+import datetime as dt
 import shutil
 from pathlib import Path
 
 import pandas as pd
 import structlog
 
+from power_stash.config import DATA_DIR
 from power_stash.models.storage.blob import StorageInterface
+from power_stash.outputs.localfs.manifest import (
+    FileManifest,
+    ManifestEntry,
+    file_checksum,
+    frame_time_range,
+)
 
 logger = structlog.getLogger()
 
 # minimum size to consider a file (raw / processed) to be valid
 MIN_VALID_SIZE_BYTES = 1e3
 
+DEFAULT_MANIFEST_PATH = DATA_DIR / "manifest.sqlite"
+
 
 class LocalClient(StorageInterface):
+    """Local store of Parquet files, indexed by a manifest.
+
+    Lookups (existence, validity, listing and time ranges) are served from the manifest,
+    updated by `store` and `delete`, without walking the file system.
+    """
+
+    def __init__(self, manifest_path: Path = DEFAULT_MANIFEST_PATH) -> None:
+        self.manifest = FileManifest(manifest_path)
+
     def exists(self, *, path: Path) -> bool:
         """Check if file exists."""
-        return path.exists()
+        return self.manifest.total_size(path) is not None
 
     def is_valid(self, *, path: Path, min_size_bytes: float = MIN_VALID_SIZE_BYTES) -> bool:
         """Check if a file is valid."""
-        if self.exists(path=path):
-            if path.is_file():
-                total_size = path.stat().st_size
-            else:
-                total_size = sum(f.stat().st_size for f in path.glob("**/*") if f.is_file())
-            return total_size > min_size_bytes
-        return False
+        total_size = self.manifest.total_size(path)
+        return total_size is not None and total_size > min_size_bytes
 
     def list_files(self, *, folder: Path, extension: str = "parquet") -> list[Path]:
         """List the available files."""
-        return folder.glob(f"*.{extension}")
+        return [t.path for t in self.manifest.list_files(folder, extension=extension)]
+
+    def find_files(
+        self,
+        *,
+        folder: Path,
+        start: dt.datetime | None = None,
+        end: dt.datetime | None = None,
+        extension: str = "parquet",
+    ) -> list[ManifestEntry]:
+        """List the files with records between start and end (included)."""
+        return self.manifest.list_files(folder, extension=extension, start=start, end=end)
 
     def store(self, *, ddf: pd.DataFrame, destination_path: Path) -> Path:
         """Store a dataset."""
         destination_path.parent.mkdir(parents=True, exist_ok=True)
-        ddf.to_parquet(destination_path)
+        # written next to its destination and renamed, so that readers never see partial files
+        tmp_path = destination_path.with_name(f".{destination_path.name}.tmp")
+        ddf.to_parquet(tmp_path)
+        tmp_path.replace(destination_path)
+        min_timestamp, max_timestamp = frame_time_range(ddf)
+        self.manifest.add(
+            [
+                ManifestEntry(
+                    path=destination_path,
+                    size_bytes=destination_path.stat().st_size,
+                    row_count=len(ddf),
+                    min_timestamp=min_timestamp,
+                    max_timestamp=max_timestamp,
+                    checksum=file_checksum(destination_path),
+                ),
+            ],
+        )
         logger.debug(
             event="Stored DataFrame",
             destination_path=destination_path,
@@ -51,8 +92,16 @@ class LocalClient(StorageInterface):
             shutil.rmtree(path.as_posix())
         else:
             raise ValueError(f"path is not a file or directory: {path}")
+        self.manifest.remove(path)
         logger.debug(
             event="Deleted path",
             path=path,
         )
         return
+
+    def rebuild_manifest(self, *, folder: Path, extension: str = "parquet") -> tuple[int, int]:
+        """Index again the files of a folder, e.g. after changes outside the store.
+
+        Returns the number of files indexed and of stale entries removed.
+        """
+        return self.manifest.rebuild(folder, extension=extension)
@@ -0,0 +1,254 @@
+import datetime as dt
+import hashlib
+import sqlite3
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+import structlog
+
+logger = structlog.getLogger()
+
+# size of the blocks read to compute the checksum of a file
+CHECKSUM_BLOCK_BYTES = 1024 * 1024
+
+# seconds waited for the lock of a manifest written by another process
+SQLITE_TIMEOUT_SECS = 30
+
+ENTRY_COLUMNS = "path, size_bytes, row_count, min_timestamp, max_timestamp, checksum"
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    """A file of a local store, as indexed in the manifest."""
+
+    path: Path
+    size_bytes: int
+    row_count: int | None = None
+    min_timestamp: dt.datetime | None = None
+    max_timestamp: dt.datetime | None = None
+    checksum: str | None = None
+
+
+def file_checksum(path: Path) -> str:
+    """Hash of the content of a file."""
+    digest = hashlib.sha1()  # noqa: S324
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(CHECKSUM_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def frame_time_range(df: pd.DataFrame) -> tuple[dt.datetime | None, dt.datetime | None]:
+    """First and last timestamps of a frame, from its index or its `timestamp` column."""
+    if isinstance(df.index, pd.DatetimeIndex):
+        timestamps = df.index
+    elif "timestamp" in df.columns:
+        timestamps = pd.DatetimeIndex(df["timestamp"])
+    else:
+        return None, None
+    timestamps = timestamps.dropna()
+    if timestamps.empty:
+        return None, None
+    if timestamps.tz is None:
+        # naive timestamps are assumed UTC
+        timestamps = timestamps.tz_localize("UTC")
+    return timestamps.min().to_pydatetime(), timestamps.max().to_pydatetime()
+
+
+def _to_text(timestamp: dt.datetime | None) -> str | None:
+    # ISO timestamps in UTC are ordered as text
+    if timestamp is None:
+        return None
+    return timestamp.astimezone(dt.timezone.utc).isoformat(timespec="microseconds")
+
+
+def _from_text(text: str | None) -> dt.datetime | None:
+    return None if text is None else dt.datetime.fromisoformat(text)
+
+
+class FileManifest:
+    """Index of the files of a local store, kept in a SQLite database.
+
+    Each update is a single transaction, so that the manifest is always consistent, even with
+    several processes writing to the same store. Files written or removed without the store
+    are only indexed once the manifest is rebuilt (c.f. `rebuild`).
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    parent TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    row_count INTEGER,
+                    min_timestamp TEXT,
+                    max_timestamp TEXT,
+                    checksum TEXT
+                )
+                """,
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS files_parent ON files (parent)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Connection committing (or rolling back) a transaction on exit."""
+        with (
+            closing(sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT_SECS)) as connection,
+            connection,
+        ):
+            yield connection
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return path.resolve().as_posix()
+
+    @staticmethod
+    def _prefix_range(path: Path) -> tuple[str, str]:
+        """Bounds of the keys of the files under a folder ("0" follows "/")."""
+        key = FileManifest._key(path)
+        return f"{key}/", f"{key}0"
+
+    @staticmethod
+    def _to_entry(row: tuple) -> ManifestEntry:
+        path, size_bytes, row_count, min_timestamp, max_timestamp, checksum = row
+        return ManifestEntry(
+            path=Path(path),
+            size_bytes=size_bytes,
+            row_count=row_count,
+            min_timestamp=_from_text(min_timestamp),
+            max_timestamp=_from_text(max_timestamp),
+            checksum=checksum,
+        )
+
+    def _insert(self, connection: sqlite3.Connection, entries: list[ManifestEntry]) -> None:
+        connection.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    self._key(t.path),
+                    self._key(t.path.parent),
+                    t.size_bytes,
+                    t.row_count,
+                    _to_text(t.min_timestamp),
+                    _to_text(t.max_timestamp),
+                    t.checksum,
+                )
+                for t in entries
+            ],
+        )
+
+    def add(self, entries: list[ManifestEntry]) -> None:
+        """Add (or replace) the entries of files."""
+        with self._connect() as connection:
+            self._insert(connection, entries)
+
+    def remove(self, path: Path) -> int:
+        """Remove the entry of a file, or of all the files under a folder."""
+        start, end = self._prefix_range(path)
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "DELETE FROM files WHERE path = ? OR (path >= ? AND path < ?)",
+                (self._key(path), start, end),
+            )
+            return cursor.rowcount
+
+    def get(self, path: Path) -> ManifestEntry | None:
+        """Entry of a file, None if not indexed."""
+        with self._connect() as connection:
+            row = connection.execute(
+                f"SELECT {ENTRY_COLUMNS} FROM files WHERE path = ?",  # noqa: S608
+                (self._key(path),),
+            ).fetchone()
+        return None if row is None else self._to_entry(row)
+
+    def total_size(self, path: Path) -> int | None:
+        """Size of a file, or of all the files under a folder, None if none indexed."""
+        start, end = self._prefix_range(path)
+        with self._connect() as connection:
+            count, size = connection.execute(
+                "SELECT COUNT(*), SUM(size_bytes) FROM files "
+                "WHERE path = ? OR (path >= ? AND path < ?)",
+                (self._key(path), start, end),
+            ).fetchone()
+        return size if count > 0 else None
+
+    def list_files(
+        self,
+        folder: Path,
+        *,
+        extension: str | None = None,
+        start: dt.datetime | None = None,
+        end: dt.datetime | None = None,
+    ) -> list[ManifestEntry]:
+        """Entries of the files of a folder, overlapping [start, end] if given."""
+        query = f"SELECT {ENTRY_COLUMNS} FROM files WHERE parent = ?"  # noqa: S608
+        params: list = [self._key(folder)]
+        if extension is not None:
+            query += " AND path LIKE ?"
+            params.append(f"%.{extension}")
+        if start is not None:
+            query += " AND max_timestamp >= ?"
+            params.append(_to_text(start))
+        if end is not None:
+            query += " AND min_timestamp <= ?"
+            params.append(_to_text(end))
+        with self._connect() as connection:
+            rows = connection.execute(f"{query} ORDER BY path", params).fetchall()
+        return [self._to_entry(t) for t in rows]
+
+    def rebuild(self, folder: Path, *, extension: str = "parquet") -> tuple[int, int]:
+        """Index again all the files of a folder, e.g. after files were changed outside the store.
+
+        Returns the number of files indexed and of stale entries removed.
+        """
+        import pyarrow.parquet as pq
+
+        entries = []
+        for path in folder.glob(f"**/*.{extension}"):
+            if not path.is_file():
+                continue
+            entry = ManifestEntry(path=path, size_bytes=path.stat().st_size)
+            try:
+                df = pq.read_table(path).to_pandas()
+                min_timestamp, max_timestamp = frame_time_range(df)
+                entry = ManifestEntry(
+                    path=path,
+                    size_bytes=entry.size_bytes,
+                    row_count=len(df),
+                    min_timestamp=min_timestamp,
+                    max_timestamp=max_timestamp,
+                    checksum=file_checksum(path),
+                )
+            except Exception as e:
+                # e.g. partially written file, indexed by size only
+                logger.warning(event="Failed reading file, indexed by size.", path=path, error=e)
+            entries.append(entry)
+
+        start, end = self._prefix_range(folder)
+        with self._connect() as connection:
+            indexed_keys = {
+                t
+                for (t,) in connection.execute(
+                    "SELECT path FROM files WHERE path >= ? AND path < ?",
+                    (start, end),
+                )
+            }
+            # entries are replaced in a single transaction
+            connection.execute("DELETE FROM files WHERE path >= ? AND path < ?", (start, end))
+            self._insert(connection, entries)
+        count_stale_entries = len(indexed_keys - {self._key(t.path) for t in entries})
+        logger.info(
+            event="Rebuilt manifest.",
+            folder=folder,
+            count_files=len(entries),
+            count_stale_entries=count_stale_entries,
+        )
+        return len(entries), count_stale_entries
@@ -0,0 +1,66 @@
+import datetime as dt
+
+import pandas as pd
+from sqlmodel import select
+
+from power_stash.models.storage.coverage import CoverageInterval
+from power_stash.models.storage.database import DatabaseRepository
+
+# a series of stored records, e.g. the generation of a production type in an area
+SERIES_COLUMNS = ["table_name", "request_type", "area", "resource"]
+
+# requests filling gaps are built by area and request type, for all the resources at once
+REQUEST_COLUMNS = ["request_type", "area"]
+
+
+def load_intervals(
+    repository: DatabaseRepository,
+    *,
+    areas: list[str] | None = None,
+    request_types: list[str] | None = None,
+) -> pd.DataFrame:
+    """Load the indexed intervals of stored records, with UTC start and end."""
+    statement = select(CoverageInterval)
+    if areas:
+        statement = statement.where(CoverageInterval.area.in_(areas))
+    if request_types:
+        statement = statement.where(CoverageInterval.request_type.in_(request_types))
+    df = repository.query(statement=statement, return_df=True)
+    for column in ("start", "end"):
+        df[column] = pd.to_datetime(df[column], utc=True)
+    return df
+
+
+def find_gaps(intervals: pd.DataFrame, *, start: dt.datetime, end: dt.datetime) -> pd.DataFrame:
+    """Gaps between the intervals of each series, over [start, end).
+
+    Only the holes between the first and the last records of a series are gaps, e.g. not the
+    period after a production type is decommissioned.
+    """
+    df = intervals.assign(resource=intervals["resource"].fillna("")).sort_values(
+        [*SERIES_COLUMNS, "start"],
+    )
+    df["next_start"] = df.groupby(SERIES_COLUMNS)["start"].shift(-1)
+    gaps = df.loc[df["next_start"] > df["end"], SERIES_COLUMNS].assign(
+        start=df["end"].clip(lower=pd.Timestamp(start)),
+        end=df["next_start"].clip(upper=pd.Timestamp(end)),
+    )
+    gaps = gaps[gaps["start"] < gaps["end"]].reset_index(drop=True)
+    gaps["duration"] = gaps["end"] - gaps["start"]
+    return gaps
+
+
+def merge_gaps(gaps: pd.DataFrame) -> pd.DataFrame:
+    """Union of the gaps of the series of each area and request type, as disjoint periods."""
+    df = gaps.sort_values([*REQUEST_COLUMNS, "start"])
+    previous_end = df.groupby(REQUEST_COLUMNS)["end"].transform(
+        lambda x: x.cummax().shift(),
+    )
+    # a period starts with each gap not overlapping (nor touching) the previous ones
+    df["period"] = (previous_end.isna() | (df["start"] > previous_end)).cumsum()
+    return (
+        df.groupby([*REQUEST_COLUMNS, "period"])
+        .agg(start=("start", "min"), end=("end", "max"))
+        .reset_index()
+        .drop(columns="period")
+    )
@@ -0,0 +1,221 @@
+import datetime as dt
+import json
+import signal
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from pathlib import Path
+from types import FrameType
+
+import structlog
+
+from power_stash.config import DATA_DIR
+from power_stash.models.request import BaseRequest, PollingSchedule, RequestStatusType
+from power_stash.models.storage.database import RequestStatus
+from power_stash.services.negative_cache import DEFAULT_TTL as DEFAULT_NEGATIVE_CACHE_TTL
+from power_stash.services.negative_cache import NegativeCache
+from power_stash.services.retry import RetryPolicy
+from power_stash.services.service import DEFAULT_MONTHLY_CHUNKS, PowerConsumerService
+from power_stash.utils import floor_timestamp
+
+logger = structlog.get_logger()
+
+DEFAULT_STATE_PATH = DATA_DIR / "daemon_state.json"
+
+DEFAULT_SHUTDOWN_TIMEOUT_SECS = 60
+
+
+def next_poll_at(schedule: PollingSchedule, now: dt.datetime) -> dt.datetime:
+    """Time of the next poll of a schedule, strictly after now."""
+    next_poll = floor_timestamp(now - schedule.offset, schedule.interval) + schedule.interval
+    return next_poll + schedule.offset
+
+
+class PollingDaemon:
+    """Long running process polling new data following the publication schedules of a source.
+
+    Fetchers, database engine and threads are kept warm between polls. On shutdown
+    (SIGINT/SIGTERM), pending requests are cancelled and in-flight ones get a grace period to
+    finish, requests that could not be completed are registered as failed and due (to be picked
+    up by the next run), and the end of the last complete window of each schedule is saved to
+    resume from there. Requests still running after the grace period can't be interrupted:
+    the process exits once they are done.
+    Requests known to return no data are not polled, unless the knowledge is older than
+    `negative_cache_ttl`.
+    """
+
+    def __init__(
+        self,
+        service: PowerConsumerService,
+        *,
+        n_threads: int,
+        retry_policy: RetryPolicy | None = None,
+        state_path: Path = DEFAULT_STATE_PATH,
+        shutdown_timeout_secs: float = DEFAULT_SHUTDOWN_TIMEOUT_SECS,
+        negative_cache_ttl: dt.timedelta = DEFAULT_NEGATIVE_CACHE_TTL,
+    ) -> None:
+        self.service = service
+        self.schedules = service.request_builder.polling_schedules()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.executor = ThreadPoolExecutor(max_workers=n_threads)
+        self.state_path = state_path
+        self.shutdown_timeout_secs = shutdown_timeout_secs
+        self.negative_cache_ttl = negative_cache_ttl
+        self.stop_event = threading.Event()
+        # end of the last window fully processed, by schedule name
+        self.cursors: dict[str, dt.datetime] = self._load_state()
+        # futures of the requests of the last poll, by schedule name
+        self.in_flight: dict[str, tuple[dt.datetime, dict[Future, BaseRequest]]] = {}
+
+    def _load_state(self) -> dict[str, dt.datetime]:
+        if not self.state_path.exists():
+            return {}
+        state = json.loads(self.state_path.read_text())
+        return {k: dt.datetime.fromisoformat(v) for k, v in state.get("cursors", {}).items()}
+
+    def _save_state(self) -> None:
+        state = {"cursors": {k: v.isoformat() for k, v in self.cursors.items()}}
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state, indent=2))
+        tmp_path.replace(self.state_path)
+
+    def _window(
+        self,
+        schedule: PollingSchedule,
+        poll_at: dt.datetime,
+    ) -> tuple[dt.datetime, dt.datetime]:
+        start = floor_timestamp(poll_at - schedule.lookback, schedule.interval)
+        cursor = self.cursors.get(schedule.name)
+        if cursor is not None:
+            # resume from the last complete window, e.g. after a downtime
+            start = min(start, cursor)
+        end = floor_timestamp(poll_at + schedule.lookahead, schedule.interval)
+        return start, end
+
+    def _poll(self, schedule: PollingSchedule, poll_at: dt.datetime) -> None:
+        if schedule.name in self.in_flight:
+            logger.warning(
+                event="Previous poll still running, skipping.",
+                schedule=schedule.name,
+                poll_at=poll_at,
+            )
+            return
+        start, end = self._window(schedule, poll_at)
+        if start >= end:
+            return
+        requests = [
+            t
+            for t in self.service.request_builder.build_matching_requests(
+                start=start,
+                end=end,
+                request_fields=schedule.request_fields,
+                chunk_months=DEFAULT_MONTHLY_CHUNKS,
+            )
+            if schedule.matches(t)
+        ]
+        negative_cache = NegativeCache.from_repository(
+            self.service._create_repository(),
+            ttl=self.negative_cache_ttl,
+        )
+        requests = negative_cache.filter_requests(requests)
+        futures = {
+            self.executor.submit(self.service._process_request, t, self.retry_policy): t
+            for t in requests
+        }
+        self.in_flight[schedule.name] = (end, futures)
+        logger.info(
+            event="Polling new data.",
+            schedule=schedule.name,
+            start=start,
+            end=end,
+            count_requests=len(requests),
+        )
+
+    def _collect(self) -> None:
+        """Advance the cursor of schedules whose last poll is complete."""
+        for name, (end, futures) in list(self.in_flight.items()):
+            if not all(t.done() for t in futures):
+                continue
+            del self.in_flight[name]
+            # requests cancelled on shutdown are registered as interrupted by the checkpoint
+            failed = [
+                t
+                for t in futures
+                if t.cancelled()
+                or t.exception() is not None
+                or t.result().status == RequestStatusType.FAILURE
+            ]
+            if failed:
+                # the window is polled again next time, from the same cursor
+                logger.error(
+                    event="Failed polling some requests!",
+                    schedule=name,
+                    count_failed_requests=len(failed),
+                )
+                continue
+            self.cursors[name] = max(end, self.cursors.get(name, end))
+            self._save_state()
+
+    def _checkpoint(self) -> None:
+        """Register the requests that could not complete before shutdown, to be retried."""
+        pending = {
+            future: request
+            for _, futures in self.in_flight.values()
+            for future, request in futures.items()
+        }
+        for future in pending:
+            future.cancel()
+        wait_futures(pending, timeout=self.shutdown_timeout_secs)
+        self._collect()
+        now = dt.datetime.now(tz=dt.timezone.utc)
+        repository = self.service._create_repository()
+        count_interrupted = 0
+        for future, request in pending.items():
+            if future.done() and not future.cancelled():
+                continue
+            request.status = RequestStatusType.FAILURE
+            request.last_error = "Interrupted"
+            request.next_attempt_at = now
+            repository.add_or_update(record=RequestStatus.from_request(request))
+            count_interrupted += 1
+        self._save_state()
+        logger.info(event="Checkpointed in-flight requests.", count_interrupted=count_interrupted)
+
+    def stop(
+        self,
+        signum: int | None = None,
+        frame: FrameType | None = None,  # noqa: ARG002
+    ) -> None:
+        """Request a graceful shutdown."""
+        logger.info(event="Stopping daemon...", signal=signum)
+        self.stop_event.set()
+
+    def run(self) -> None:
+        """Poll the schedules until stopped."""
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        repository = self.service._create_repository()
+        repository.init_db()
+
+        now = dt.datetime.now(tz=dt.timezone.utc)
+        # poll everything once at startup, then follow the schedules
+        next_polls = {t.name: now for t in self.schedules}
+        schedules = {t.name: t for t in self.schedules}
+        logger.info(event="Daemon: START", schedules=list(schedules))
+        try:
+            while not self.stop_event.is_set():
+                now = dt.datetime.now(tz=dt.timezone.utc)
+                for name, poll_at in next_polls.items():
+                    if poll_at <= now:
+                        self._poll(schedules[name], poll_at=now)
+                        next_polls[name] = next_poll_at(schedules[name], now)
+                self._collect()
+                wait_secs = (min(next_polls.values()) - now).total_seconds()
+                # wake up regularly to collect completed polls
+                self.stop_event.wait(timeout=min(max(wait_secs, 0), 10))
+        finally:
+            self._checkpoint()
+            # in-flight requests can't be interrupted, wait for them rather than exit on them
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        logger.info(event="Daemon: END")
@@ -0,0 +1,191 @@
+import datetime as dt
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import pandas as pd
+import structlog
+
+from power_stash.config import DATA_DIR
+from power_stash.models.fetcher import FetcherInterface
+from power_stash.models.processor import BaseProcessor
+from power_stash.models.request import BaseRequest, BaseRequestBuilder
+from power_stash.models.storage.database import BaseTableModel
+from power_stash.models.storage.labels import encoded_columns
+from power_stash.outputs.localfs.blob_client import LocalClient
+
+logger = structlog.get_logger()
+
+DEFAULT_FRAMES_DIR = DATA_DIR / "frames"
+
+DEFAULT_MAX_WORKERS = 8
+
+DEFAULT_MONTHLY_CHUNKS = 1
+
+# fields of the records identifying their versions rather than data
+RECORD_METADATA_FIELDS = {"uid", "content_hash", "last_updated"}
+
+
+def records_to_frame(records: list[BaseTableModel]) -> pd.DataFrame:
+    """Frame of the records of a model, one column by data field.
+
+    Datetimes are converted to UTC, and labels (e.g. areas, by name) to categories.
+    """
+    df = pd.DataFrame([t.model_dump(exclude=RECORD_METADATA_FIELDS) for t in records])
+    model = type(records[0])
+    label_columns = encoded_columns(model.__table__)
+    for column in df.columns:
+        values = df[column].dropna()
+        if values.empty:
+            if model.model_fields[column].annotation in (float, float | None):
+                # e.g. values missing for the whole request
+                df[column] = df[column].astype("float64")
+            continue
+        if column in label_columns:
+            df[column] = (
+                df[column].map(lambda x: x.name if isinstance(x, Enum) else x).astype("category")
+            )
+        elif isinstance(values.iloc[0], dt.datetime):
+            df[column] = pd.to_datetime(df[column], utc=True)
+    return df
+
+
+def concat_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate frames of records of a model, keeping categories."""
+    df = pd.concat(frames, ignore_index=True)
+    for column, dtype in frames[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            # categories differ from one frame to the other
+            df[column] = df[column].astype("category")
+    return df
+
+
+class FrameService:
+    """Fetch and transform requests in the current process, returning DataFrames.
+
+    Nothing is stored in a database: transformed frames of requests over periods that can't be
+    revised anymore (c.f. `BaseRequestBuilder.revision_windows`) are kept as Parquet files,
+    read back instead of fetched again by the next calls. Raw frames are cached by the fetchers
+    as they are by the workers of `PowerConsumerService`.
+    """
+
+    def __init__(
+        self,
+        *,
+        request_builder: BaseRequestBuilder,
+        fetcher_factory: Callable[[], FetcherInterface],
+        processor_factory: Callable[[], BaseProcessor],
+        storage: LocalClient | None = None,
+        folder: Path = DEFAULT_FRAMES_DIR,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> None:
+        self.request_builder = request_builder
+        # shared by the threads fetching requests, as in the workers of `PowerConsumerService`
+        self.fetcher = fetcher_factory()
+        self.processor = processor_factory()
+        self.storage = storage or LocalClient()
+        self.folder = folder
+        self.max_workers = max_workers
+        self.failed_requests: list[BaseRequest] = []
+
+    def _path(self, request: BaseRequest) -> Path:
+        return self.folder / type(request).__name__ / str(hash(request))
+
+    def _is_final(self, request: BaseRequest, now: dt.datetime) -> bool:
+        """Whether the data of a request can't be revised anymore."""
+        revision_windows = [
+            t.window for t in self.request_builder.revision_windows() if t.matches(request)
+        ]
+        return request.end + max(revision_windows, default=dt.timedelta(0)) <= now
+
+    def _load_request(self, request: BaseRequest, now: dt.datetime) -> dict[str, pd.DataFrame]:
+        """Frames of a request by table name, read back from the store when final."""
+        path = self._path(request)
+        is_final = self._is_final(request, now)
+        if is_final and self.storage.is_valid(path=path, min_size_bytes=0):
+            return {t.stem: pd.read_parquet(t) for t in self.storage.list_files(folder=path)}
+
+        df_raw = self.fetcher.fetch_data(request=request)
+        if df_raw is None:
+            # no data for the request
+            return {}
+        records_by_model: dict[type, list[BaseTableModel]] = defaultdict(list)
+        for record in self.processor.transform(df_raw=df_raw, request=request):
+            records_by_model[type(record)].append(record)
+        frames = {
+            model.__tablename__: records_to_frame(records)
+            for model, records in records_by_model.items()
+        }
+        if is_final:
+            for name, df in frames.items():
+                self.storage.store(ddf=df, destination_path=path / f"{name}.parquet")
+        return frames
+
+    def _try_load_request(self, request: BaseRequest, now: dt.datetime) -> dict[str, pd.DataFrame]:
+        try:
+            return self._load_request(request, now)
+        except Exception as e:
+            self.failed_requests.append(request)
+            logger.error(
+                event="Failed loading request, skipping.",
+                request=request,
+                error=e,
+            )
+            return {}
+
+    def iter_request_frames(
+        self,
+        requests: list[BaseRequest],
+    ) -> Iterator[tuple[str, pd.DataFrame]]:
+        """Yield the frames of requests by table, one request type after the other.
+
+        The requests of a request type are fetched concurrently, and only once the frames of
+        the previous request type are consumed. Failed requests are logged and skipped, c.f.
+        `failed_requests`.
+        """
+        requests_by_type: dict[Any, list[BaseRequest]] = defaultdict(list)
+        for request in requests:
+            requests_by_type[getattr(request, "request_type", None)].append(request)
+        now = dt.datetime.now(tz=dt.timezone.utc)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for request_type, typed_requests in requests_by_type.items():
+                frames_by_table: dict[str, list[pd.DataFrame]] = defaultdict(list)
+                for frames in executor.map(
+                    lambda request: self._try_load_request(request, now),
+                    typed_requests,
+                ):
+                    for name, df in frames.items():
+                        frames_by_table[name].append(df)
+                for name, frames in frames_by_table.items():
+                    logger.debug(
+                        event="Loaded frames.",
+                        request_type=request_type,
+                        table=name,
+                        count_requests=len(frames),
+                    )
+                    yield name, concat_frames(frames)
+
+    def iter_frames(
+        self,
+        *,
+        start: dt.datetime,
+        end: dt.datetime,
+        chunk_months: int | None = DEFAULT_MONTHLY_CHUNKS,
+        **filters,  # noqa: ANN003
+    ) -> Iterator[tuple[str, pd.DataFrame]]:
+        """Yield the frames, by table, of the requests between start and end.
+
+        Requests are filtered as supported by the request builder, e.g. `areas` and
+        `request_types` for ENTSO-E.
+        """
+        requests = self.request_builder.build_requests(
+            start=start,
+            end=end,
+            chunk_months=chunk_months,
+            **filters,
+        )
+        self.failed_requests = []
+        yield from self.iter_request_frames(requests)
@@ -0,0 +1,92 @@
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+from typing import TYPE_CHECKING, Iterator
+
+import structlog
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = structlog.get_logger()
+
+# shared memory backed filesystem when available, regular temporary directory otherwise.
+SHARED_MEMORY_DIR = Path("/dev/shm")  # noqa: S108
+
+
+@dataclass(frozen=True)
+class ArrowFrameHandle:
+    """Reference to a DataFrame stored as an Arrow IPC file, cheap to ship between processes."""
+
+    path: Path
+    num_rows: int
+    nbytes: int
+
+
+def import_pyarrow() -> ModuleType:
+    """Import pyarrow, an optional dependency only needed by the hand-off."""
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError(
+            "The hand-off of frames requires pyarrow, install it with the `arrow` extra "
+            "(e.g. `poetry install --extras arrow`).",
+        ) from e
+    return pa
+
+
+def create_handoff_dir() -> Path:
+    """Create a directory to exchange frames between the stages of a run."""
+    # fail before running anything if pyarrow is missing
+    import_pyarrow()
+    parent = SHARED_MEMORY_DIR if SHARED_MEMORY_DIR.is_dir() else None
+    return Path(tempfile.mkdtemp(prefix="power-stash-handoff-", dir=parent))
+
+
+def remove_handoff_dir(handoff_dir: Path) -> None:
+    """Remove a hand-off directory and all the frames left behind by failed tasks."""
+    shutil.rmtree(handoff_dir, ignore_errors=True)
+    logger.debug(
+        event="Removed hand-off directory.",
+        handoff_dir=handoff_dir,
+    )
+
+
+def write_frame(df: "pd.DataFrame", handoff_dir: Path) -> ArrowFrameHandle:
+    """Write a DataFrame as an Arrow IPC file in the hand-off directory."""
+    pa = import_pyarrow()
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    path = handoff_dir / f"{uuid.uuid4().hex}.arrow"
+    try:
+        with (
+            pa.OSFile(path.as_posix(), "wb") as sink,
+            pa.ipc.new_file(sink, table.schema) as writer,
+        ):
+            writer.write_table(table)
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+    return ArrowFrameHandle(path=path, num_rows=table.num_rows, nbytes=table.nbytes)
+
+
+@contextmanager
+def open_frame(handle: ArrowFrameHandle) -> Iterator["pd.DataFrame"]:
+    """Memory-map a frame written with `write_frame`, removing its file on exit.
+
+    The Arrow buffers are mapped without copy, and numerical columns without nulls are exposed
+    to pandas without copy either. The file is removed whether the caller succeeds or fails.
+    """
+    pa = import_pyarrow()
+
+    try:
+        with pa.memory_map(handle.path.as_posix(), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            yield table.to_pandas(split_blocks=True)
+    finally:
+        # the mapping stays valid until released, even after the file is unlinked.
+        handle.path.unlink(missing_ok=True)
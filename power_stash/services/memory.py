@@ -0,0 +1,172 @@
+import datetime as dt
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+import structlog
+
+from power_stash.models.request import BaseRequest
+from power_stash.utils import floor_timestamp
+
+logger = structlog.get_logger()
+
+# peak memory of transforming and storing a raw frame, relative to its size in memory
+DEFAULT_EXPANSION_RATIO = 8.0
+
+# how long a request waits for memory to be released by others, before being deferred
+DEFAULT_WAIT_TIMEOUT_SECS = 300
+
+# requests over budget are split in halves, down to this span
+DEFAULT_MIN_SPLIT_SPAN = dt.timedelta(days=1)
+
+MEBIBYTE = 1024 * 1024
+
+
+class MemoryBudgetExceededError(Exception):
+    """Raised when a request does not fit in the memory budget of its worker."""
+
+
+@dataclass(frozen=True)
+class MemoryBudget:
+    """Memory accounting settings of the worker processes.
+
+    Allocations are traced with `tracemalloc` (which slows allocations down), to record the
+    peak memory of each request and stage. With `max_bytes`, the transform of a request
+    reserves `expansion_ratio` times the size of its raw frame from the budget of the worker
+    process, waiting for other requests to release it if needed. Requests that can't fit
+    fail with `MemoryBudgetExceededError`, to be split or deferred.
+    """
+
+    max_bytes: int | None = None
+    expansion_ratio: float = DEFAULT_EXPANSION_RATIO
+    wait_timeout_secs: float = DEFAULT_WAIT_TIMEOUT_SECS
+
+    def estimate(self, payload_bytes: int) -> int:
+        """Estimated peak memory of processing a raw frame of a given size."""
+        return int(payload_bytes * self.expansion_ratio)
+
+    def check(self, payload_bytes: int) -> None:
+        """Fail early if a raw frame can't fit in the budget, even in an idle worker."""
+        if self.max_bytes is not None and self.estimate(payload_bytes) > self.max_bytes:
+            raise MemoryBudgetExceededError(
+                f"Estimated {self.estimate(payload_bytes) / MEBIBYTE:.0f} MiB, "
+                f"above the budget of {self.max_bytes / MEBIBYTE:.0f} MiB.",
+            )
+
+
+class MemoryAccountant:
+    """Memory reserved and traced by the requests running in the threads of a process.
+
+    Peaks are exact when requests run one at a time. With concurrent requests, the peak of
+    the process is only reset when no stage is running, and the peak of a stage is an upper
+    bound including the allocations of the other threads.
+    """
+
+    def __init__(self, budget: MemoryBudget) -> None:
+        self.budget = budget
+        self.reserved_bytes = 0
+        self.count_active_stages = 0
+        self.condition = threading.Condition()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def reserve(self, estimated_bytes: int) -> Iterator[None]:
+        """Reserve memory from the budget of the process while running a stage."""
+        if self.budget.max_bytes is None:
+            yield
+            return
+        with self.condition:
+            has_room = self.condition.wait_for(
+                lambda: (
+                    self.reserved_bytes == 0
+                    or self.reserved_bytes + estimated_bytes <= self.budget.max_bytes
+                ),
+                timeout=self.budget.wait_timeout_secs,
+            )
+            if not has_room:
+                raise MemoryBudgetExceededError(
+                    f"Timed out waiting for {estimated_bytes / MEBIBYTE:.0f} MiB "
+                    f"({self.reserved_bytes / MEBIBYTE:.0f} MiB reserved).",
+                )
+            self.reserved_bytes += estimated_bytes
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.reserved_bytes -= estimated_bytes
+                self.condition.notify_all()
+
+    @contextmanager
+    def measure(self, request: BaseRequest, stage: str) -> Iterator[None]:
+        """Record the peak memory allocated by a stage of a request, logging offenders."""
+        with self.condition:
+            if self.count_active_stages == 0:
+                tracemalloc.reset_peak()
+            self.count_active_stages += 1
+            start_bytes, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            with self.condition:
+                self.count_active_stages -= 1
+            peak_bytes = max(peak_bytes - start_bytes, 0)
+            request.metrics["traced_peak_bytes"] = max(
+                request.metrics.get("traced_peak_bytes", 0),
+                peak_bytes,
+            )
+            if self.budget.max_bytes is not None and peak_bytes > self.budget.max_bytes:
+                logger.warning(
+                    event="Request stage above the memory budget!",
+                    request=request,
+                    stage=stage,
+                    peak_mib=round(peak_bytes / MEBIBYTE),
+                    budget_mib=round(self.budget.max_bytes / MEBIBYTE),
+                )
+            else:
+                logger.debug(
+                    event="Measured request stage memory.",
+                    request=request,
+                    stage=stage,
+                    peak_mib=round(peak_bytes / MEBIBYTE),
+                )
+
+
+_accountants: dict[tuple[int, MemoryBudget], MemoryAccountant] = {}
+_accountants_lock = threading.Lock()
+
+
+def get_memory_accountant(budget: MemoryBudget) -> MemoryAccountant:
+    """Memory accountant of the current process, tracing allocations from first use."""
+    key = (os.getpid(), budget)
+    accountant = _accountants.get(key)
+    if accountant is None:
+        with _accountants_lock:
+            accountant = _accountants.get(key)
+            if accountant is None:
+                accountant = MemoryAccountant(budget)
+                _accountants[key] = accountant
+    return accountant
+
+
+def split_request(
+    request: BaseRequest,
+    min_span: dt.timedelta = DEFAULT_MIN_SPLIT_SPAN,
+) -> list[BaseRequest]:
+    """Split a request in two halves, none if the halves would be shorter than `min_span`.
+
+    Halves are new requests, without the status or attempts of the split request.
+    """
+    span = request.end - request.start
+    if span < 2 * min_span:
+        return []
+    middle = floor_timestamp(request.start + span / 2, dt.timedelta(hours=1))
+    fields = request.model_dump()
+    return [
+        type(request)(**{**fields, "start": request.start, "end": middle}),
+        type(request)(**{**fields, "start": middle, "end": request.end}),
+    ]
@@ -0,0 +1,181 @@
+import datetime as dt
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+import structlog
+from sqlmodel import select
+
+from power_stash.models.request import BaseRequest, RequestStatusType
+from power_stash.models.storage.database import DatabaseRepository, RequestStatus
+
+logger = structlog.get_logger()
+
+DEFAULT_TTL = dt.timedelta(days=30)
+
+# number of empty answers, without any data ever, after which a combination is considered empty.
+DEFAULT_MIN_EMPTY_REQUESTS = 3
+
+# fields identifying the time range of a request, anything else identifies its combination.
+TIME_RANGE_FIELDS = ("start", "end")
+
+CombinationKey = tuple[str, tuple[tuple[str, Any], ...]]
+
+
+def combination_key(name: str, request_fields: dict[str, Any]) -> CombinationKey:
+    """Identify the combination of a request (e.g. area and request type) regardless of dates."""
+    return (
+        name,
+        tuple(sorted((k, v) for k, v in request_fields.items() if k not in TIME_RANGE_FIELDS)),
+    )
+
+
+def as_utc(timestamp: dt.datetime) -> dt.datetime:
+    """Assume UTC for naive timestamps (as returned by the database)."""
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=dt.timezone.utc)
+    return timestamp
+
+
+def request_combination_key(request: BaseRequest) -> CombinationKey:
+    """Identify the combination of a request."""
+    return combination_key(type(request).__name__, request.model_dump(mode="json"))
+
+
+def has_successful_request(repository: DatabaseRepository, key: CombinationKey) -> bool:
+    """Whether any request of a combination returned data."""
+    name, request_fields = key
+    # narrow down the statuses on the text fields of the combination (e.g. area), in SQL
+    conditions = [
+        RequestStatus.request[k].as_string() == v for k, v in request_fields if isinstance(v, str)
+    ]
+    requests = repository.query(
+        statement=select(RequestStatus.request).where(
+            RequestStatus.status == RequestStatusType.SUCCESS,
+            RequestStatus.name == name,
+            *conditions,
+        ),
+        return_df=False,
+    )
+    return any(combination_key(name, t) == key for t in requests)
+
+
+@dataclass
+class NegativeCacheEntry:
+    """What is known about a combination of requests from past runs."""
+
+    empty_ranges: list[tuple[dt.datetime, dt.datetime]] = field(default_factory=list)
+    count_empty: int = 0
+    has_data: bool = False
+    last_checked_at: dt.datetime | None = None
+
+    def add_empty_range(self, start: dt.datetime, end: dt.datetime) -> None:
+        """Add a time range known to be empty, merging overlapping ranges."""
+        ranges = sorted([*self.empty_ranges, (as_utc(start), as_utc(end))])
+        merged = [ranges[0]]
+        for _start, _end in ranges[1:]:
+            last_start, last_end = merged[-1]
+            if _start <= last_end:
+                merged[-1] = (last_start, max(last_end, _end))
+            else:
+                merged.append((_start, _end))
+        self.empty_ranges = merged
+
+    def covers(self, start: dt.datetime, end: dt.datetime) -> bool:
+        """Whether a time range is known to be empty."""
+        start, end = as_utc(start), as_utc(end)
+        return any(_start <= start and end <= _end for _start, _end in self.empty_ranges)
+
+
+class NegativeCache:
+    """Index of the request combinations (e.g. area, request type) known to have no data.
+
+    Built from the history of request statuses: a request is skipped when its time range is
+    known to be empty, or when its combination never returned any data after several attempts.
+    Entries expire after `ttl` so that combinations publishing new data are revalidated.
+    """
+
+    def __init__(
+        self,
+        entries: dict[CombinationKey, NegativeCacheEntry],
+        *,
+        ttl: dt.timedelta = DEFAULT_TTL,
+        min_empty_requests: int = DEFAULT_MIN_EMPTY_REQUESTS,
+        now: dt.datetime | None = None,
+    ) -> None:
+        self.entries = entries
+        self.ttl = ttl
+        self.min_empty_requests = min_empty_requests
+        self.now = now or dt.datetime.now(tz=dt.timezone.utc)
+
+    @classmethod
+    def from_statuses(
+        cls,  # noqa: ANN102
+        statuses: Iterable[RequestStatus],
+        **kwargs,  # noqa: ANN003
+    ) -> "NegativeCache":
+        """Build the index from past request statuses."""
+        entries: dict[CombinationKey, NegativeCacheEntry] = {}
+        for status in statuses:
+            key = combination_key(status.name, status.request)
+            entry = entries.setdefault(key, NegativeCacheEntry())
+            if status.status == RequestStatusType.SUCCESS:
+                entry.has_data = True
+            elif status.status == RequestStatusType.NO_DATA:
+                entry.count_empty += 1
+                entry.add_empty_range(status.start, status.end)
+                if status.updated_at is not None and (
+                    entry.last_checked_at is None
+                    or as_utc(status.updated_at) > entry.last_checked_at
+                ):
+                    entry.last_checked_at = as_utc(status.updated_at)
+        return cls(entries, **kwargs)
+
+    @classmethod
+    def from_repository(
+        cls,  # noqa: ANN102
+        repository: DatabaseRepository,
+        **kwargs,  # noqa: ANN003
+    ) -> "NegativeCache":
+        """Build the index from the request statuses stored in a repository.
+
+        Only the statuses of empty requests are loaded, the combinations empty often enough to
+        be skipped altogether are then checked for successful requests.
+        """
+        statuses = repository.query(
+            statement=select(RequestStatus).where(
+                RequestStatus.status == RequestStatusType.NO_DATA,
+            ),
+            return_df=False,
+        )
+        negative_cache = cls.from_statuses(statuses, **kwargs)
+        for key, entry in negative_cache.entries.items():
+            if entry.count_empty >= negative_cache.min_empty_requests:
+                entry.has_data = has_successful_request(repository, key)
+        return negative_cache
+
+    def _is_fresh(self, entry: NegativeCacheEntry) -> bool:
+        if entry.last_checked_at is None:
+            return False
+        return self.now - as_utc(entry.last_checked_at) <= self.ttl
+
+    def is_known_empty(self, request: BaseRequest) -> bool:
+        """Whether the request is known to return no data."""
+        entry = self.entries.get(request_combination_key(request))
+        if entry is None or entry.has_data or not self._is_fresh(entry):
+            return False
+        if entry.count_empty >= self.min_empty_requests:
+            # the combination never published anything
+            return True
+        return entry.covers(request.start, request.end)
+
+    def filter_requests(self, requests: list[BaseRequest]) -> list[BaseRequest]:
+        """Filter out the requests known to return no data."""
+        filtered_requests = [t for t in requests if not self.is_known_empty(t)]
+        logger.info(
+            event="Skipped requests known to be empty.",
+            count_skipped_requests=len(requests) - len(filtered_requests),
+            count_empty_combinations=len(
+                [t for t in self.entries.values() if not t.has_data and self._is_fresh(t)],
+            ),
+        )
+        return filtered_requests
@@ -0,0 +1,209 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Callable, Iterator, TypeVar
+
+import structlog
+
+logger = structlog.get_logger()
+
+DEFAULT_SAMPLING_INTERVAL_SECS = 0.01
+
+# minimum time between two writes of the samples of a process, while stages are running
+DEFAULT_FLUSH_INTERVAL_SECS = 2.0
+
+DEFAULT_TOP_N = 20
+
+PROCESS_PROFILE_SUFFIX = ".folded"
+
+MERGED_PROFILE_NAME = "profile.folded"
+
+SUMMARY_NAME = "summary.txt"
+
+F = TypeVar("F", bound=Callable)
+
+# stage of the functions tagged with `profiled_as`, by code object
+_stage_codes: dict[CodeType, str] = {}
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def profiled_as(stage: str) -> Callable[[F], F]:
+    """Count the samples of a function under a stage, whichever stage it runs from.
+
+    For work deferred to a later stage, e.g. a generator of transformed batches only consumed
+    when storing them.
+    """
+
+    def decorator(func: F) -> F:
+        _stage_codes[func.__code__] = stage
+        return func
+
+    return decorator
+
+
+class StageProfiler:
+    """Sampling profiler of the stages run by the threads of a process.
+
+    A background thread samples the stack of the threads running a stage every
+    `interval_secs`, only keeping the frames called from the stage entry point. Samples are
+    taken on wall time: time spent waiting (e.g. on the network) shows as socket frames.
+    Frames of functions tagged with `profiled_as` another stage are counted under that stage.
+    Samples are counted by collapsed stack (`stage;caller;...;callee`) and written to
+    `<pid>.folded` in `profile_dir`, in the format of flamegraph.pl (and speedscope).
+    """
+
+    def __init__(
+        self,
+        profile_dir: Path,
+        interval_secs: float = DEFAULT_SAMPLING_INTERVAL_SECS,
+        flush_interval_secs: float = DEFAULT_FLUSH_INTERVAL_SECS,
+    ) -> None:
+        self.profile_dir = profile_dir
+        self.interval_secs = interval_secs
+        self.flush_interval_secs = flush_interval_secs
+        self.samples: Counter[str] = Counter()
+        # stage name and entry frame, by thread id
+        self.active_stages: dict[int, tuple[str, FrameType]] = {}
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.sampler = threading.Thread(target=self._sample_forever, daemon=True)
+        self.sampler.start()
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        with self.lock:
+            for thread_id, (stage, entry_frame) in self.active_stages.items():
+                frame = frames.get(thread_id)
+                stack = []
+                # the outermost tagged frame of another stage, if any, moves the sample
+                sample_stage, depth = stage, None
+                while frame is not None and frame is not entry_frame:
+                    stack.append(_frame_label(frame))
+                    tagged_stage = _stage_codes.get(frame.f_code)
+                    if tagged_stage is not None and tagged_stage != stage:
+                        sample_stage, depth = tagged_stage, len(stack)
+                    frame = frame.f_back
+                if depth is not None:
+                    stack = stack[:depth]
+                stack.append(sample_stage)
+                self.samples[";".join(reversed(stack))] += 1
+
+    def _sample_forever(self) -> None:
+        while True:
+            time.sleep(self.interval_secs)
+            if self.active_stages:
+                self._sample()
+
+    def flush(self) -> None:
+        """Write the samples of the process (cumulated since start)."""
+        with self.lock:
+            lines = [f"{stack} {count}\n" for stack, count in self.samples.items()]
+            self.last_flush = time.monotonic()
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / f"{os.getpid()}{PROCESS_PROFILE_SUFFIX}"
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text("".join(lines))
+        tmp_path.replace(path)
+
+    @contextmanager
+    def stage(self, name: str, entry_frame: FrameType) -> Iterator[None]:
+        """Profile the current thread while running a stage."""
+        thread_id = threading.get_ident()
+        with self.lock:
+            self.active_stages[thread_id] = (name, entry_frame)
+        try:
+            yield
+        finally:
+            with self.lock:
+                del self.active_stages[thread_id]
+                is_idle = not self.active_stages
+                is_due = time.monotonic() - self.last_flush > self.flush_interval_secs
+            # the last stage to complete always writes, so that nothing is lost when idle
+            if is_idle or is_due:
+                self.flush()
+
+
+_profilers: dict[tuple[int, Path], StageProfiler] = {}
+_profilers_lock = threading.Lock()
+
+
+def get_profiler(profile_dir: Path) -> StageProfiler:
+    """Profiler of the current process, started on first use."""
+    key = (os.getpid(), profile_dir)
+    profiler = _profilers.get(key)
+    if profiler is None:
+        with _profilers_lock:
+            profiler = _profilers.get(key)
+            if profiler is None:
+                profiler = StageProfiler(profile_dir)
+                _profilers[key] = profiler
+    return profiler
+
+
+@dataclass(frozen=True)
+class ProfiledStage:
+    """Picklable wrapper of a pipeline stage, sampled by the profiler of the worker process."""
+
+    func: Callable
+    name: str
+    profile_dir: Path
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        """Run the stage, profiled."""
+        profiler = get_profiler(self.profile_dir)
+        with profiler.stage(self.name, entry_frame=sys._getframe()):
+            return self.func(*args, **kwargs)
+
+
+def merge_profiles(profile_dir: Path, top_n: int = DEFAULT_TOP_N) -> str:
+    """Merge the profiles of all processes, and summarise the hotspots.
+
+    Writes the merged collapsed stacks to `profile.folded` (e.g. `flamegraph.pl profile.folded`
+    or drop it in speedscope), and the summary to `summary.txt`. Returns the summary.
+    """
+    samples: Counter[str] = Counter()
+    for path in profile_dir.glob(f"*{PROCESS_PROFILE_SUFFIX}"):
+        if path.name == MERGED_PROFILE_NAME:
+            continue
+        for line in path.read_text().splitlines():
+            stack, _, count = line.rpartition(" ")
+            samples[stack] += int(count)
+    (profile_dir / MERGED_PROFILE_NAME).write_text(
+        "".join(f"{stack} {count}\n" for stack, count in samples.most_common()),
+    )
+
+    total = sum(samples.values())
+    by_stage: Counter[str] = Counter()
+    self_samples: Counter[str] = Counter()
+    total_samples: Counter[str] = Counter()
+    for stack, count in samples.items():
+        frames = stack.split(";")
+        by_stage[frames[0]] += count
+        self_samples[frames[-1]] += count
+        # count recursive functions once per sample
+        for frame in set(frames[1:]):
+            total_samples[frame] += count
+
+    def _pct(count: int) -> str:
+        return f"{100 * count / total:5.1f}%" if total else "  0.0%"
+
+    lines = [f"{total} samples", "", "By stage:"]
+    lines += [f"  {_pct(count)}  {stage}" for stage, count in by_stage.most_common()]
+    lines += ["", f"Top {top_n} functions by self time:"]
+    lines += [f"  {_pct(count)}  {frame}" for frame, count in self_samples.most_common(top_n)]
+    lines += ["", f"Top {top_n} functions by total time:"]
+    lines += [f"  {_pct(count)}  {frame}" for frame, count in total_samples.most_common(top_n)]
+    summary = "\n".join(lines)
+    (profile_dir / SUMMARY_NAME).write_text(summary + "\n")
+    return summary
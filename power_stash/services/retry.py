@@ -0,0 +1,68 @@
+import datetime as dt
+from dataclasses import dataclass
+
+from entsoe.exceptions import (
+    InvalidBusinessParameterError,
+    InvalidParameterError,
+    InvalidPSRTypeError,
+)
+from pydantic import ValidationError
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY_SECS = 10
+DEFAULT_MAX_DELAY_SECS = 300
+
+# HTTP status codes worth retrying, any other 4xx is considered permanent.
+RETRYABLE_HTTP_STATUS_CODES = {408, 425, 429}
+
+# errors of requests that are invalid or not supported, sending them again can't help.
+PERMANENT_ERROR_TYPES = (
+    NotImplementedError,
+    ValidationError,
+    InvalidBusinessParameterError,
+    InvalidParameterError,
+    InvalidPSRTypeError,
+)
+
+
+def is_permanent_error(error: BaseException) -> bool:
+    """Whether retrying the request can't help (bad request, unsupported request type, ...)."""
+    if isinstance(error, PERMANENT_ERROR_TYPES):
+        return True
+    # HTTP errors (e.g. requests.HTTPError) carry the response of the failed call.
+    status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code is not None:
+        return 400 <= status_code < 500 and status_code not in RETRYABLE_HTTP_STATUS_CODES
+    return False
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff policy for failed requests.
+
+    Failed requests are not retried inside the worker (which would block its slot while
+    sleeping), they are given a `next_attempt_at` and requeued by the service once due.
+    """
+
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    base_delay_secs: float = DEFAULT_BASE_DELAY_SECS
+    max_delay_secs: float = DEFAULT_MAX_DELAY_SECS
+
+    def delay(self, attempts: int) -> dt.timedelta:
+        """Backoff delay after a given number of attempts."""
+        delay_secs = self.base_delay_secs * 2 ** max(attempts - 1, 0)
+        return dt.timedelta(seconds=min(delay_secs, self.max_delay_secs))
+
+    def next_attempt_at(
+        self,
+        *,
+        attempts: int,
+        error: BaseException,
+        now: dt.datetime | None = None,
+    ) -> dt.datetime | None:
+        """Time of the next attempt for a failed request, None when giving up on it."""
+        if is_permanent_error(error):
+            return None
+        if now is None:
+            now = dt.datetime.now(tz=dt.timezone.utc)
+        return now + self.delay(attempts)
@@ -0,0 +1,126 @@
+import heapq
+import statistics
+from typing import Iterable
+
+import structlog
+from sqlmodel import select
+
+from power_stash.models.request import BaseRequest
+from power_stash.models.storage.database import DatabaseRepository, RequestStatus
+from power_stash.services.negative_cache import (
+    CombinationKey,
+    combination_key,
+    request_combination_key,
+)
+
+logger = structlog.get_logger()
+
+SECONDS_PER_DAY = 86_400
+
+
+def _request_days(request: BaseRequest | RequestStatus) -> float:
+    # at least an hour, to avoid dividing by zero
+    return max((request.end - request.start).total_seconds() / SECONDS_PER_DAY, 1 / 24)
+
+
+class CostModel:
+    """Estimate the processing time of requests.
+
+    Past durations are used when available, normalised per day covered by the request and
+    averaged per combination of requests (e.g. area and request type). Combinations without
+    durations fall back to past row counts, then to the `estimated_cost` heuristic of the
+    requests, both scaled to seconds using the combinations with a known duration.
+    """
+
+    def __init__(
+        self,
+        *,
+        secs_per_day: dict[CombinationKey, float],
+        rows_per_day: dict[CombinationKey, float],
+    ) -> None:
+        self.secs_per_day = secs_per_day
+        self.rows_per_day = rows_per_day
+
+    @classmethod
+    def from_statuses(cls, statuses: Iterable[RequestStatus]) -> "CostModel":  # noqa: ANN102
+        """Build the model from past request statuses."""
+        durations: dict[CombinationKey, list[float]] = {}
+        row_counts: dict[CombinationKey, list[float]] = {}
+        for status in statuses:
+            key = combination_key(status.name, status.request)
+            if status.duration_secs is not None:
+                durations.setdefault(key, []).append(status.duration_secs / _request_days(status))
+            if status.row_count is not None:
+                row_counts.setdefault(key, []).append(status.row_count / _request_days(status))
+        return cls(
+            secs_per_day={k: statistics.mean(v) for k, v in durations.items()},
+            rows_per_day={k: statistics.mean(v) for k, v in row_counts.items()},
+        )
+
+    @classmethod
+    def from_repository(cls, repository: DatabaseRepository) -> "CostModel":  # noqa: ANN102
+        """Build the model from the request statuses stored in a repository."""
+        statuses = repository.query(
+            statement=select(RequestStatus).where(
+                RequestStatus.duration_secs.is_not(None) | RequestStatus.row_count.is_not(None),
+            ),
+            return_df=False,
+        )
+        return cls.from_statuses(statuses)
+
+    def estimate(self, requests: list[BaseRequest]) -> list[float]:
+        """Estimate the processing time (in seconds when measured) of requests."""
+        keys = [request_combination_key(t) for t in requests]
+        days = [_request_days(t) for t in requests]
+
+        # ratios to convert row counts and heuristic costs to seconds
+        rows_ratios = [
+            secs / self.rows_per_day[key]
+            for key, secs in self.secs_per_day.items()
+            if self.rows_per_day.get(key)
+        ]
+        heuristic_ratios = [
+            self.secs_per_day[key] * _days / request.estimated_cost()
+            for request, key, _days in zip(requests, keys, days, strict=True)
+            if key in self.secs_per_day and request.estimated_cost() > 0
+        ]
+        rows_scale = statistics.median(rows_ratios) if rows_ratios else 1.0
+        heuristic_scale = statistics.median(heuristic_ratios) if heuristic_ratios else 1.0
+
+        costs = []
+        for request, key, _days in zip(requests, keys, days, strict=True):
+            if key in self.secs_per_day:
+                costs.append(self.secs_per_day[key] * _days)
+            elif key in self.rows_per_day:
+                costs.append(self.rows_per_day[key] * rows_scale * _days)
+            else:
+                costs.append(request.estimated_cost() * heuristic_scale)
+        return costs
+
+
+def balance_partitions(
+    requests: list[BaseRequest],
+    costs: list[float],
+    n_partitions: int,
+) -> list[list[BaseRequest]]:
+    """Split requests in partitions of balanced total cost, longest requests first.
+
+    Greedy longest-processing-time-first: each request, by decreasing cost, is assigned to
+    the least loaded partition. Partitions are returned by decreasing load.
+    """
+    n_partitions = max(min(n_partitions, len(requests)), 1)
+    loads = [(0.0, i) for i in range(n_partitions)]
+    partitions: list[list[BaseRequest]] = [[] for _ in range(n_partitions)]
+    for cost, request in sorted(zip(costs, requests, strict=True), key=lambda x: -x[0]):
+        load, index = heapq.heappop(loads)
+        partitions[index].append(request)
+        heapq.heappush(loads, (load + cost, index))
+    load_by_partition = {index: load for load, index in loads}
+    ordered = sorted(range(n_partitions), key=lambda i: -load_by_partition[i])
+    logger.debug(
+        event="Balanced partitions.",
+        n_partitions=n_partitions,
+        max_load=max(load_by_partition.values(), default=0),
+        min_load=min(load_by_partition.values(), default=0),
+    )
+    return [partitions[i] for i in ordered if partitions[i]]
@@ -1,16 +1,54 @@
 import datetime as dt
+import itertools
 import multiprocessing
+import os
+import socket
+import threading
 import time
-from typing import Callable
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterator, Type
 
+import dask
 import pandas as pd
 import structlog
 from dask.bag.core import Bag, from_sequence
+from sqlmodel import select
 
 from power_stash.models.fetcher import FetcherInterface
 from power_stash.models.processor import BaseProcessor
-from power_stash.models.request import BaseRequest, BaseRequestBuilder, RequestStatusType
+from power_stash.models.request import (
+    BaseRequest,
+    BaseRequestBuilder,
+    RequestStatusType,
+    RevisionWindow,
+)
 from power_stash.models.storage.database import BaseTableModel, DatabaseRepository, RequestStatus
+from power_stash.models.storage.queue import QueuedRequest, WorkQueue
+from power_stash.models.storage.staging import StagingRepository
+from power_stash.services.handoff import (
+    ArrowFrameHandle,
+    create_handoff_dir,
+    open_frame,
+    remove_handoff_dir,
+    write_frame,
+)
+from power_stash.services.memory import (
+    MemoryBudget,
+    MemoryBudgetExceededError,
+    get_memory_accountant,
+    split_request,
+)
+from power_stash.services.negative_cache import DEFAULT_TTL as DEFAULT_NEGATIVE_CACHE_TTL
+from power_stash.services.negative_cache import NegativeCache
+from power_stash.services.profiling import ProfiledStage, merge_profiles, profiled_as
+from power_stash.services.retry import RetryPolicy
+from power_stash.services.scheduling import CostModel, balance_partitions
+from power_stash.services.worker import WorkerSetup, get_worker_resources
+from power_stash.utils import fingerprint_frame, floor_timestamp, peak_memory_bytes
 
 logger = structlog.get_logger()
 
@@ -18,6 +56,22 @@ DEFAULT_MONTHLY_CHUNKS = 1
 
 DEFAULT_N_PARTITIONS = multiprocessing.cpu_count() * 2
 
+DEFAULT_QUEUE_BATCH_SIZE = 10
+
+DEFAULT_QUEUE_LEASE = dt.timedelta(minutes=5)
+
+DEFAULT_QUEUE_POLL_INTERVAL_SECS = 10
+
+
+def create_staging_repository(
+    repository_factory: Callable[[], StagingRepository],
+    model: Type[BaseTableModel],
+) -> StagingRepository:
+    """Create a repository writing the records of a model to its staging table."""
+    repository = repository_factory()
+    repository.use_staging_table(model)
+    return repository
+
 
 class PowerConsumerService:
     """Service class for the power data consumer."""
@@ -26,14 +80,18 @@ class PowerConsumerService:
         self,
         *,
         request_builder: BaseRequestBuilder,
-        fetcher: FetcherInterface,
-        processor: BaseProcessor,
-        repository_factory: Callable,
+        fetcher_factory: Callable[[], FetcherInterface],
+        processor_factory: Callable[[], BaseProcessor],
+        repository_factory: Callable[[], DatabaseRepository],
     ) -> None:
         self.request_builder = request_builder
-        self.fetcher = fetcher
-        self.processor = processor
         self.repository_factory = repository_factory
+        # only this recipe is shipped to the workers, which build their own resources once.
+        self.worker_setup = WorkerSetup(
+            fetcher_factory=fetcher_factory,
+            processor_factory=processor_factory,
+            repository_factory=repository_factory,
+        )
 
     def _build_default_requests(
         self,
@@ -50,8 +108,8 @@ class PowerConsumerService:
     def _create_repository(self) -> DatabaseRepository:
         return self.repository_factory()
 
+    @staticmethod
     def _update_registry(
-        self,
         repository: DatabaseRepository,
         request: BaseRequest,
     ) -> RequestStatus:
@@ -77,81 +135,564 @@ class PowerConsumerService:
             return True
         return existing_record.status == RequestStatusType.FAILURE
 
-    def _download(self, request: BaseRequest) -> tuple[pd.DataFrame | None, BaseRequest]:
+    @staticmethod
+    def _record_failure(
+        request: BaseRequest,
+        *,
+        error: Exception,
+        retry_policy: RetryPolicy,
+    ) -> None:
+        """Flag a request as failed, planning its next attempt (if any) with the retry policy."""
+        request.status = RequestStatusType.FAILURE
+        request.last_error = type(error).__name__
+        request.next_attempt_at = retry_policy.next_attempt_at(
+            attempts=request.attempts,
+            error=error,
+        )
+
+    @staticmethod
+    def _record_duration(request: BaseRequest, stage: str, start_time: float) -> None:
+        """Record the time spent in a stage, added to the total processing time."""
+        duration_secs = time.perf_counter() - start_time
+        request.add_metric(f"{stage}_duration_secs", duration_secs)
+        request.add_metric("duration_secs", duration_secs)
+
+    @staticmethod
+    def _record_peak_memory_growth(request: BaseRequest, start_peak_bytes: int | None) -> None:
+        """Record how much a stage raised the peak resident memory of its worker process.
+
+        Stages may run in different processes, the largest growth is kept. It may include the
+        allocations of the stages running concurrently in the process.
+        """
+        peak_bytes = peak_memory_bytes()
+        if start_peak_bytes is None or peak_bytes is None:
+            return
+        request.metrics["peak_memory_growth_bytes"] = max(
+            request.metrics.get("peak_memory_growth_bytes", 0),
+            peak_bytes - start_peak_bytes,
+        )
+
+    @staticmethod
+    def _is_unchanged(
+        repository: DatabaseRepository,
+        request: BaseRequest,
+        *,
+        df_raw: pd.DataFrame,
+    ) -> bool:
+        """Fingerprint the raw data, comparing it with the last successful fetch of the request."""
+        request.fingerprint = fingerprint_frame(df_raw)
+        previous_status = repository.get(
+            record_type=RequestStatus,
+            record_uid=RequestStatus.from_request(request).uid,
+        )
+        if (
+            previous_status is None
+            or previous_status.status != RequestStatusType.SUCCESS
+            or previous_status.fingerprint != request.fingerprint
+        ):
+            return False
+        if previous_status.row_count is not None:
+            request.metrics["row_count"] = previous_status.row_count
+        request.metrics["changed_row_count"] = 0
+        logger.debug(event="Unchanged data, skipping.", request=request)
+        return True
+
+    @staticmethod
+    def _download(
+        request: BaseRequest,
+        *,
+        worker_setup: WorkerSetup,
+        retry_policy: RetryPolicy,
+        handoff_dir: Path | None = None,
+        memory_budget: MemoryBudget | None = None,
+    ) -> tuple[pd.DataFrame | ArrowFrameHandle | None, BaseRequest]:
         logger.debug(
             event="Init. download request...",
             request=request,
         )
+        start_time = time.perf_counter()
+        start_peak_bytes = peak_memory_bytes()
+        resources = get_worker_resources(worker_setup)
+        request.attempts += 1
+        request.next_attempt_at = None
+        # metrics of previous attempts are discarded
+        request.reset_metrics()
+        request.fingerprint = None
+        if memory_budget is not None:
+            memory_context = get_memory_accountant(memory_budget).measure(request, "fetch")
+        else:
+            memory_context = nullcontext()
         try:
-            df_raw = self.fetcher.fetch_data(request=request)
+            with memory_context:
+                df_raw = resources.fetcher.fetch_data(request=request)
+            if df_raw is not None:
+                request.metrics["payload_bytes"] = int(df_raw.memory_usage(deep=True).sum())
+                if memory_budget is not None:
+                    # split or defer requests too large for the workers, before transforming
+                    memory_budget.check(request.metrics["payload_bytes"])
             if df_raw is None:
                 # there are no data to fetch in this case, set status
                 request.status = RequestStatusType.NO_DATA
+            elif PowerConsumerService._is_unchanged(resources.repository, request, df_raw=df_raw):
+                # same data as the last successful fetch, skip transform and store
+                request.status = RequestStatusType.SUCCESS
+                df_raw = None
+            elif handoff_dir is not None:
+                # hand the frame over to the next stage as an Arrow IPC file
+                df_raw = write_frame(df_raw, handoff_dir=handoff_dir)
         except Exception as e:
             logger.error(
                 event="Failed fetching data.",
                 error=e,
                 request=request,
             )
-            request.status = RequestStatusType.FAILURE
+            PowerConsumerService._record_failure(request, error=e, retry_policy=retry_policy)
             df_raw = None
-        if df_raw is None:
-            repository = self._create_repository()
-            self._update_registry(repository=repository, request=request)
+        PowerConsumerService._record_duration(request, "fetch", start_time)
+        PowerConsumerService._record_peak_memory_growth(request, start_peak_bytes)
         return df_raw, request
 
+    @staticmethod
+    @profiled_as("transform")
+    def _iter_record_batches(
+        processor: BaseProcessor,
+        df_raw: pd.DataFrame | ArrowFrameHandle,
+        request: BaseRequest,
+        *,
+        batch_size: int | None = None,
+        memory_budget: MemoryBudget | None = None,
+    ) -> Iterator[list[BaseTableModel]]:
+        """Transform a raw frame in batches of records, in a single batch without `batch_size`.
+
+        Batches are transformed as they are consumed, possibly by the store stage: the profiler
+        counts them under the transform stage all the same.
+        """
+        if isinstance(df_raw, ArrowFrameHandle):
+            # memory-map the frame, its file is removed once transformed (or failed)
+            raw_context = open_frame(df_raw)
+        else:
+            raw_context = nullcontext(df_raw)
+        if memory_budget is not None:
+            # wait for the estimated memory of the transform to fit in the worker budget
+            accountant = get_memory_accountant(memory_budget)
+            estimated_bytes = memory_budget.estimate(request.metrics.get("payload_bytes", 0))
+            reserve_context = accountant.reserve(estimated_bytes)
+            memory_context = accountant.measure(request, "transform")
+        else:
+            reserve_context = memory_context = nullcontext()
+        with reserve_context, memory_context, raw_context as df:
+            if batch_size is None:
+                yield processor.transform(df_raw=df, request=request)
+            else:
+                yield from processor.transform_batches(
+                    df_raw=df,
+                    request=request,
+                    batch_size=batch_size,
+                )
+
+    @staticmethod
     def _transform(
-        self,
-        df_raw_request: tuple[pd.DataFrame, BaseRequest],
-    ) -> tuple[list[BaseTableModel] | None, BaseRequest]:
+        df_raw_request: tuple[pd.DataFrame | ArrowFrameHandle | None, BaseRequest],
+        *,
+        worker_setup: WorkerSetup,
+        retry_policy: RetryPolicy,
+        memory_budget: MemoryBudget | None = None,
+        batch_size: int | None = None,
+    ) -> tuple[list[BaseTableModel] | Iterator[list[BaseTableModel]] | None, BaseRequest]:
+        """Transform the raw frame of a request.
+
+        With `batch_size`, batches of records are only transformed as they are stored, and
+        an iterator of batches is returned instead of the records.
+        """
         df_raw, request = df_raw_request
+        if df_raw is None:
+            # nothing downloaded, status is set already
+            return None, request
+        resources = get_worker_resources(worker_setup)
+        batches = PowerConsumerService._iter_record_batches(
+            resources.processor,
+            df_raw,
+            request,
+            batch_size=batch_size,
+            memory_budget=memory_budget,
+        )
+        if batch_size is not None:
+            return batches, request
+        start_time = time.perf_counter()
+        start_peak_bytes = peak_memory_bytes()
         try:
             logger.debug(
                 event="Init. transform request...",
                 request=request,
             )
-            records = self.processor.transform(df_raw=df_raw, request=request)
+            records = list(itertools.chain.from_iterable(batches))
+            request.metrics["row_count"] = len(records)
         except Exception as e:
             records = None
-            request.error = str(e)
-            request.status = RequestStatusType.FAILURE
+            PowerConsumerService._record_failure(request, error=e, retry_policy=retry_policy)
             logger.error(
                 event="Failed transforming request!",
                 request=request,
                 error=e,
             )
+        PowerConsumerService._record_duration(request, "transform", start_time)
+        PowerConsumerService._record_peak_memory_growth(request, start_peak_bytes)
         return records, request
 
+    @staticmethod
     def _add_to_repository(
-        self,
-        records_request: tuple[list[BaseTableModel] | None, BaseRequest],
+        records_request: tuple[
+            list[BaseTableModel] | Iterator[list[BaseTableModel]] | None,
+            BaseRequest,
+        ],
+        *,
+        worker_setup: WorkerSetup,
+        register: bool = True,
+        memory_budget: MemoryBudget | None = None,
+        retry_policy: RetryPolicy | None = None,
     ) -> RequestStatus:
-        """Helper function to filter out existing records and add new one."""
+        """Helper function to filter out existing records and add new one.
+
+        Batches of records (c.f. `_transform`) are transformed and stored one at a time.
+        Without `register`, the status is returned but not saved, to be saved in bulk.
+        """
         records, request = records_request
-        repository = self._create_repository()
+        repository = get_worker_resources(worker_setup).repository
         if records is not None:
-            # store records in db
-            repository.bulk_add(records=records)
-            # update status
-            request.status = RequestStatusType.SUCCESS
+            is_lazy = not isinstance(records, list)
+            batches = records if is_lazy else iter([records])
+            if memory_budget is not None:
+                memory_context = get_memory_accountant(memory_budget).measure(request, "store")
+            else:
+                memory_context = nullcontext()
+            request.metrics["changed_row_count"] = 0
+            start_peak_bytes = peak_memory_bytes()
+            try:
+                with memory_context:
+                    while True:
+                        start_time = time.perf_counter()
+                        try:
+                            batch = next(batches, None)
+                        finally:
+                            if is_lazy:
+                                PowerConsumerService._record_duration(
+                                    request,
+                                    "transform",
+                                    start_time,
+                                )
+                        if batch is None:
+                            break
+                        if is_lazy:
+                            request.add_metric("row_count", len(batch))
+                        # store records in db
+                        start_time = time.perf_counter()
+                        request.add_metric("changed_row_count", repository.bulk_add(records=batch))
+                        PowerConsumerService._record_duration(request, "store", start_time)
+                # update status
+                request.status = RequestStatusType.SUCCESS
+            except Exception as e:
+                # batches stored already are upserted again by the next attempt
+                PowerConsumerService._record_failure(
+                    request,
+                    error=e,
+                    retry_policy=retry_policy or RetryPolicy(),
+                )
+                logger.error(
+                    event="Failed storing records!",
+                    request=request,
+                    error=e,
+                )
+            PowerConsumerService._record_peak_memory_growth(request, start_peak_bytes)
         else:
             if request.status is None:
                 request.status = RequestStatusType.FAILURE
+        if not register:
+            return RequestStatus.from_request(request)
         # update registry
-        request_status = self._update_registry(repository=repository, request=request)
+        request_status = PowerConsumerService._update_registry(
+            repository=repository,
+            request=request,
+        )
         return request_status
 
-    def _build_dask_pipeline(self, all_requests: list[BaseRequest], n_partitions: int) -> Bag:
+    @staticmethod
+    def _register_statuses(
+        list_status: list[RequestStatus],
+        *,
+        worker_setup: WorkerSetup,
+    ) -> list[RequestStatus]:
+        """Save the statuses of a partition of requests at once."""
+        list_status = list(list_status)
+        repository = get_worker_resources(worker_setup).repository
+        repository.bulk_add_or_update(records=list_status)
+        return list_status
+
+    def _build_dask_pipeline(
+        self,
+        partitions: list[list[BaseRequest]],
+        retry_policy: RetryPolicy,
+        handoff_dir: Path | None = None,
+        profile_dir: Path | None = None,
+        memory_budget: MemoryBudget | None = None,
+        transform_batch_size: int | None = None,
+        worker_setup: WorkerSetup | None = None,
+    ) -> tuple[Bag, Bag | None]:
+        """Build the pipeline of the stages, and the bag of the downloads to compute with it.
+
+        Dask fuses the stages of each request into a single task: with `handoff_dir`, downloads
+        are computed as outputs too, so that they remain tasks of their own, and their frames
+        are handed over to the transform tasks (possibly in other processes) as Arrow files.
+        """
+        # tasks only carry the requests and the (lightweight) worker setup, not the service.
+        # failed or empty downloads go through all stages to get their status registered.
+        if worker_setup is None:
+            worker_setup = self.worker_setup
+        download, transform, add_to_repository = (
+            self._download,
+            self._transform,
+            self._add_to_repository,
+        )
+        if profile_dir is not None:
+            download = ProfiledStage(download, name="download", profile_dir=profile_dir)
+            transform = ProfiledStage(transform, name="transform", profile_dir=profile_dir)
+            add_to_repository = ProfiledStage(
+                add_to_repository,
+                name="add_to_repository",
+                profile_dir=profile_dir,
+            )
+        downloads = (
+            # one (pre-balanced) list of requests per partition
+            from_sequence(partitions, npartitions=len(partitions))
+            .flatten()
+            .map(
+                download,
+                worker_setup=worker_setup,
+                retry_policy=retry_policy,
+                handoff_dir=handoff_dir,
+                memory_budget=memory_budget,
+            )
+        )
         dask_bag = (
-            from_sequence(all_requests, npartitions=n_partitions)
-            .map(self._download)
-            # filter out failed downloads
-            .filter(lambda x: x[0] is not None)
-            .map(self._transform)
+            downloads.map(
+                transform,
+                worker_setup=worker_setup,
+                retry_policy=retry_policy,
+                memory_budget=memory_budget,
+                batch_size=transform_batch_size,
+            )
             # store in repository
-            .map(self._add_to_repository)
+            .map(
+                add_to_repository,
+                worker_setup=worker_setup,
+                register=False,
+                memory_budget=memory_budget,
+                retry_policy=retry_policy,
+            )
+            # statuses are saved once per partition
+            .map_partitions(self._register_statuses, worker_setup=worker_setup)
+        )
+        return dask_bag, downloads if handoff_dir is not None else None
+
+    def _load_previous_attempts(
+        self,
+        repository: DatabaseRepository,
+        requests: list[BaseRequest],
+    ) -> None:
+        """Resume the attempt count of requests that failed in previous runs."""
+        attempts_by_uid = dict(
+            repository.query(
+                statement=select(RequestStatus.uid, RequestStatus.attempts).where(
+                    RequestStatus.status == RequestStatusType.FAILURE,
+                ),
+                return_df=False,
+            ),
+        )
+        for request in requests:
+            request.attempts = attempts_by_uid.get(RequestStatus.from_request(request).uid) or 0
+
+    def _run_with_retries(
+        self,
+        all_requests: list[BaseRequest],
+        *,
+        scheduler: str | None,
+        n_partitions: int,
+        retry_policy: RetryPolicy,
+        cost_model: CostModel,
+        handoff_dir: Path | None,
+        profile_dir: Path | None = None,
+        memory_budget: MemoryBudget | None = None,
+        transform_batch_size: int | None = None,
+        worker_setup: WorkerSetup | None = None,
+    ) -> list[RequestStatus]:
+        """Run the pipeline, requeueing failed requests as they become due.
+
+        Requests are spread in partitions of balanced estimated cost, longest first.
+        Waiting for the backoff happens here in the scheduling loop, not in the workers,
+        once all the requests of the run are done: the cluster stays idle meanwhile.
+        Requests above the memory budget are split in halves, run right away.
+        Workers are set up with `worker_setup` if given, the one of the service otherwise.
+        """
+        requests_by_uid = {RequestStatus.from_request(t).uid: t for t in all_requests}
+        run_attempts = dict.fromkeys(requests_by_uid, 0)
+        final_status: dict[str, RequestStatus] = {}
+        # uids of the halves of the requests split, by uid of the split request
+        split_uids: dict[str, list[str]] = {}
+
+        pending = all_requests
+        while pending:
+            for request in pending:
+                run_attempts[RequestStatus.from_request(request).uid] += 1
+            partitions = balance_partitions(
+                pending,
+                costs=cost_model.estimate(pending),
+                n_partitions=n_partitions,
+            )
+            pipeline, downloads = self._build_dask_pipeline(
+                partitions,
+                retry_policy=retry_policy,
+                handoff_dir=handoff_dir,
+                profile_dir=profile_dir,
+                memory_budget=memory_budget,
+                transform_batch_size=transform_batch_size,
+                worker_setup=worker_setup,
+            )
+            if downloads is None:
+                list_status: list[RequestStatus] = pipeline.compute(scheduler=scheduler)
+            else:
+                # only handles of the frames are returned by the downloads
+                list_status, _ = dask.compute(pipeline, downloads, scheduler=scheduler)
+            final_status.update({t.uid: t for t in list_status})
+
+            split_requests = []
+            for status in list_status:
+                if status.last_error != MemoryBudgetExceededError.__name__:
+                    continue
+                halves = split_request(requests_by_uid[status.uid])
+                if not halves:
+                    # too short to be split, deferred as any other failure
+                    continue
+                del final_status[status.uid]
+                split_uids[status.uid] = []
+                for half in halves:
+                    uid = RequestStatus.from_request(half).uid
+                    split_uids[status.uid].append(uid)
+                    requests_by_uid[uid] = half
+                    run_attempts[uid] = 0
+                    split_requests.append(half)
+            if split_requests:
+                logger.info(
+                    event="Splitting requests above the memory budget.",
+                    count_split_requests=len(split_uids),
+                )
+
+            to_retry = [
+                t
+                for t in final_status.values()
+                if t.status == RequestStatusType.FAILURE
+                and t.next_attempt_at is not None
+                and run_attempts[t.uid] < retry_policy.max_attempts
+            ]
+            if not to_retry and not split_requests:
+                break
+
+            batch = []
+            if to_retry:
+                # batch the requests due close to the earliest one, and wait for the last of them
+                earliest_due = min(t.next_attempt_at for t in to_retry)
+                batch = [
+                    t
+                    for t in to_retry
+                    if t.next_attempt_at <= earliest_due + retry_policy.delay(attempts=1)
+                ]
+                wait_secs = (
+                    max(t.next_attempt_at for t in batch) - dt.datetime.now(tz=dt.timezone.utc)
+                ).total_seconds()
+                logger.info(
+                    event="Requeueing failed requests.",
+                    count_failed_requests=len(to_retry),
+                    count_requeued_requests=len(batch),
+                    wait_secs=max(wait_secs, 0),
+                )
+                if wait_secs > 0:
+                    time.sleep(wait_secs)
+            pending = split_requests
+            for status in batch:
+                request = requests_by_uid[status.uid]
+                # resume from the state returned by the workers
+                request.status = None
+                request.attempts = status.attempts
+                request.last_error = status.last_error
+                pending.append(request)
+
+        if split_uids:
+            self._register_split_requests(split_uids, requests_by_uid, final_status)
+        return list(final_status.values())
+
+    def _register_split_requests(
+        self,
+        split_uids: dict[str, list[str]],
+        requests_by_uid: dict[str, BaseRequest],
+        final_status: dict[str, RequestStatus],
+    ) -> None:
+        """Register split requests as successful once all their halves are.
+
+        So that they are not planned (and split) again by the next runs.
+        """
+        repository = self._create_repository()
+        # halves split again come last, and are resolved first
+        for uid, half_uids in reversed(split_uids.items()):
+            halves_status = [final_status.get(t) for t in half_uids]
+            if any(t is None or t.status == RequestStatusType.FAILURE for t in halves_status):
+                continue
+            request = requests_by_uid[uid]
+            request.status = RequestStatusType.SUCCESS
+            request.last_error = None
+            request.next_attempt_at = None
+            request.reset_metrics()
+            request.metrics["row_count"] = sum(t.row_count or 0 for t in halves_status)
+            final_status[uid] = self._update_registry(repository=repository, request=request)
+
+    def _plan_requests(
+        self,
+        repository: DatabaseRepository,
+        *,
+        start: dt.datetime,
+        end: dt.datetime,
+        chunk_months: int,
+        negative_cache_ttl: dt.timedelta,
+        revalidate_empty: bool,
+    ) -> list[BaseRequest]:
+        """Build the requests to run, leaving aside the ones done or known to be empty."""
+        all_requests = self._build_default_requests(
+            start=start,
+            end=end,
+            chunk_months=chunk_months,
         )
-        return dask_bag
+
+        # filter new requests (retrying due failures)
+        existing_uids = set(
+            repository.get_existing_uids(
+                model_type=RequestStatus,
+                condition=RequestStatus.skip_condition(
+                    now=dt.datetime.now(tz=dt.timezone.utc),
+                    no_data_ttl=dt.timedelta(0) if revalidate_empty else negative_cache_ttl,
+                ),
+            ),
+        )
+        all_new_requests = [
+            t for t in all_requests if RequestStatus.from_request(t).uid not in existing_uids
+        ]
+        if not revalidate_empty:
+            negative_cache = NegativeCache.from_repository(repository, ttl=negative_cache_ttl)
+            all_new_requests = negative_cache.filter_requests(all_new_requests)
+        self._load_previous_attempts(repository, all_new_requests)
+
+        logger.debug(
+            event="Built requests.",
+            count_requests=len(all_requests),
+            count_new_request=len(all_new_requests),
+        )
+        return all_new_requests
 
     def download_data(
         self,
@@ -160,8 +701,31 @@ class PowerConsumerService:
         scheduler: str | None = None,
         chunk_months: int = DEFAULT_MONTHLY_CHUNKS,
         n_partitions: int = DEFAULT_N_PARTITIONS,
+        arrow_handoff: bool = False,
+        retry_policy: RetryPolicy | None = None,
+        negative_cache_ttl: dt.timedelta = DEFAULT_NEGATIVE_CACHE_TTL,
+        revalidate_empty: bool = False,
+        profile_dir: Path | None = None,
+        memory_budget: MemoryBudget | None = None,
+        transform_batch_size: int | None = None,
     ) -> None:
-        """Download all power data between start and end timestamps."""
+        """Download all power data between start and end timestamps.
+
+        With `arrow_handoff`, downloads run as tasks of their own rather than fused with the next
+        stages, and raw frames are handed over to the transform tasks (possibly in other worker
+        processes) as memory-mapped Arrow IPC files instead of being pickled.
+        Failed requests are retried within the run following `retry_policy`.
+        Requests known to return no data are skipped, unless the knowledge is older than
+        `negative_cache_ttl` or `revalidate_empty` is set.
+        With `profile_dir`, the stages are profiled on each worker process, and the profiles
+        merged in `profile_dir` (c.f. `power_stash.services.profiling`).
+        With `memory_budget`, the memory allocated by each request is traced and bounded by the
+        budget of the worker processes (c.f. `power_stash.services.memory`).
+        With `transform_batch_size`, raw frames are transformed and stored in batches of about
+        that many records, bounding the memory of large requests (e.g. generation).
+        """
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
         start_time = time.perf_counter()
         logger.info(
             event="Download data: START",
@@ -170,33 +734,36 @@ class PowerConsumerService:
             chunks=f"by {chunk_months} month(s)",
         )
 
-        all_requests = self._build_default_requests(
-            start=start,
-            end=end,
-            chunk_months=chunk_months,
-        )
-
         # make sure db and tables are ready
         repository = self._create_repository()
         repository.init_db()
 
-        # filter new requests (retrying failures)
-        existing_uids = repository.get_existing_uids(
-            model_type=RequestStatus,
-            condition=RequestStatus.status != RequestStatusType.FAILURE,
-        )
-        all_new_requests = [
-            t for t in all_requests if RequestStatus.from_request(t).uid not in existing_uids
-        ]
-
-        logger.debug(
-            event="Built requests.",
-            count_requests=len(all_requests),
-            count_new_request=len(all_new_requests),
+        all_new_requests = self._plan_requests(
+            repository,
+            start=start,
+            end=end,
+            chunk_months=chunk_months,
+            negative_cache_ttl=negative_cache_ttl,
+            revalidate_empty=revalidate_empty,
         )
-        pipeline = self._build_dask_pipeline(all_new_requests, n_partitions=n_partitions)
 
-        list_status: list[RequestStatus] = pipeline.compute(scheduler=scheduler)
+        handoff_dir = create_handoff_dir() if arrow_handoff else None
+        try:
+            list_status = self._run_with_retries(
+                all_new_requests,
+                scheduler=scheduler,
+                n_partitions=n_partitions,
+                retry_policy=retry_policy,
+                cost_model=CostModel.from_repository(repository),
+                handoff_dir=handoff_dir,
+                profile_dir=profile_dir,
+                memory_budget=memory_budget,
+                transform_batch_size=transform_batch_size,
+            )
+        finally:
+            if handoff_dir is not None:
+                # clean-up frames left behind by tasks that did not reach the transform stage
+                remove_handoff_dir(handoff_dir)
 
         failed_status = [t for t in list_status if t.status == RequestStatusType.FAILURE]
 
@@ -204,11 +771,462 @@ class PowerConsumerService:
             logger.error(
                 event="Failed processing some requests!",
                 num_failed_request=len(failed_status),
+                num_permanent_failures=len([t for t in failed_status if t.next_attempt_at is None]),
             )
 
+        if profile_dir is not None:
+            merge_profiles(profile_dir)
+            logger.info(event="Profiled download.", profile_dir=profile_dir)
+
         end_time = time.perf_counter()
         logger.info(
             event="Download datasets: END",
             elapsed_time_secs=end_time - start_time,
             total_processed_requests=len(list_status),
         )
+
+    def _build_revision_requests(
+        self,
+        end: dt.datetime,
+        windows: list[RevisionWindow],
+    ) -> dict[str, list[BaseRequest]]:
+        """Build the requests refreshing each revision window, chunked if the window says so."""
+        requests_by_window: dict[str, list[BaseRequest]] = {}
+        for window in windows:
+            alignment = window.chunk or dt.timedelta(days=1)
+            # cover the (partial) day or chunk in progress
+            window_end = floor_timestamp(end, alignment) + alignment
+            window_start = floor_timestamp(end - window.window, alignment)
+            requests = [
+                t
+                for t in self.request_builder.build_matching_requests(
+                    start=window_start,
+                    end=window_end,
+                    request_fields=window.request_fields,
+                )
+                if window.matches(t)
+            ]
+            if window.chunk is None:
+                requests_by_window[window.name] = requests
+                continue
+            chunks = []
+            for request in requests:
+                chunk_start = window_start
+                while chunk_start < window_end:
+                    chunk_end = chunk_start + window.chunk
+                    chunks.append(
+                        request.model_copy(update={"start": chunk_start, "end": chunk_end}),
+                    )
+                    chunk_start = chunk_end
+            requests_by_window[window.name] = chunks
+        return requests_by_window
+
+    def refresh_revisions(
+        self,
+        end: dt.datetime | None = None,
+        scheduler: str | None = None,
+        n_partitions: int = DEFAULT_N_PARTITIONS,
+        retry_policy: RetryPolicy | None = None,
+        windows: list[RevisionWindow] | None = None,
+    ) -> dict[str, dict[str, float]]:
+        """Re-fetch the trailing revision windows of the source to pick up revised data.
+
+        Requests are refreshed whatever their status, a chunk per area over each window unless the
+        window is split (`RevisionWindow.chunk`): chunks whose raw data did not change are skipped
+        before transform, and only revised records are rewritten.
+        Returns, by window, the number of chunks refreshed, the ones that changed, the number of
+        records changed and the age (in days) of the oldest changed chunk, to tune the windows
+        (the age is only telling for split windows).
+        """
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        if windows is None:
+            windows = self.request_builder.revision_windows()
+        if end is None:
+            end = dt.datetime.now(tz=dt.timezone.utc)
+        logger.info(event="Refresh revisions: START", end=end, windows=[t.name for t in windows])
+
+        repository = self._create_repository()
+        repository.init_db()
+
+        requests_by_window = self._build_revision_requests(end, windows)
+        window_by_uid = {
+            RequestStatus.from_request(request).uid: name
+            for name, requests in requests_by_window.items()
+            for request in requests
+        }
+        all_requests = [t for requests in requests_by_window.values() for t in requests]
+        self._load_previous_attempts(repository, all_requests)
+
+        list_status = self._run_with_retries(
+            all_requests,
+            scheduler=scheduler,
+            n_partitions=n_partitions,
+            retry_policy=retry_policy,
+            cost_model=CostModel.from_repository(repository),
+            handoff_dir=None,
+        )
+
+        report = {
+            name: {
+                "count_chunks": len(requests),
+                "count_changed_chunks": 0,
+                "count_changed_rows": 0,
+                "count_failed_chunks": 0,
+                "max_changed_age_days": 0.0,
+            }
+            for name, requests in requests_by_window.items()
+        }
+        for status in list_status:
+            window_report = report[window_by_uid[status.uid]]
+            if status.status == RequestStatusType.FAILURE:
+                window_report["count_failed_chunks"] += 1
+            if status.changed_row_count:
+                window_report["count_changed_chunks"] += 1
+                window_report["count_changed_rows"] += status.changed_row_count
+                window_report["max_changed_age_days"] = max(
+                    window_report["max_changed_age_days"],
+                    (end - status.start).total_seconds() / 86_400,
+                )
+        for name, window_report in report.items():
+            logger.info(event="Refreshed revision window.", window=name, **window_report)
+        logger.info(event="Refresh revisions: END", total_processed_requests=len(list_status))
+        return report
+
+    def fill_gaps(
+        self,
+        gaps: pd.DataFrame,
+        scheduler: str | None = None,
+        chunk_months: int = DEFAULT_MONTHLY_CHUNKS,
+        n_partitions: int = DEFAULT_N_PARTITIONS,
+        retry_policy: RetryPolicy | None = None,
+        negative_cache_ttl: dt.timedelta = DEFAULT_NEGATIVE_CACHE_TTL,
+        revalidate_empty: bool = False,
+    ) -> list[RequestStatus]:
+        """Download the data missing in gaps of stored records (c.f. `services.coverage`).
+
+        A request is built by gap (area, request type, start and end), split by `chunk_months`,
+        so that only the missing periods are fetched. Gaps known to return no data are skipped,
+        unless the knowledge is older than `negative_cache_ttl` or `revalidate_empty` is set.
+        """
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        logger.info(event="Fill gaps: START", count_gaps=len(gaps))
+
+        repository = self._create_repository()
+        repository.init_db()
+
+        all_requests = []
+        for gap in gaps.itertuples():
+            all_requests.extend(
+                self.request_builder.build_requests(
+                    start=gap.start.to_pydatetime(),
+                    end=gap.end.to_pydatetime(),
+                    chunk_months=chunk_months,
+                    areas=[gap.area],
+                    request_types=[gap.request_type],
+                ),
+            )
+        if not revalidate_empty:
+            negative_cache = NegativeCache.from_repository(repository, ttl=negative_cache_ttl)
+            all_requests = negative_cache.filter_requests(all_requests)
+        self._load_previous_attempts(repository, all_requests)
+
+        list_status = self._run_with_retries(
+            all_requests,
+            scheduler=scheduler,
+            n_partitions=n_partitions,
+            retry_policy=retry_policy,
+            cost_model=CostModel.from_repository(repository),
+            handoff_dir=None,
+        )
+        logger.info(
+            event="Fill gaps: END",
+            total_processed_requests=len(list_status),
+            count_failed_requests=len(
+                [t for t in list_status if t.status == RequestStatusType.FAILURE],
+            ),
+        )
+        return list_status
+
+    def reingest(
+        self,
+        *,
+        model: Type[BaseTableModel],
+        request_type: str,
+        start: dt.datetime,
+        end: dt.datetime,
+        scheduler: str | None = None,
+        chunk_months: int = DEFAULT_MONTHLY_CHUNKS,
+        n_partitions: int = DEFAULT_N_PARTITIONS,
+        retry_policy: RetryPolicy | None = None,
+    ) -> list[RequestStatus]:
+        """Rewrite all the records of a table between start and end, e.g. after a transform changed.
+
+        The period is extended to whole partitions of the table, and the requests of the
+        request type over the period are fetched and transformed again, their records written
+        to a staging table. Once all the requests succeeded, the staged records replace the
+        stored ones at once (c.f. `StagingRepository.swap_staging_table`), unless none were
+        staged. Otherwise the staging table is dropped, and the stored records left as they were.
+        Records of other tables produced by the requests are upserted as usual.
+        """
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        repository: StagingRepository = self._create_repository()
+        repository.init_db()
+        start, end = repository.align_period(model, start=start, end=end)
+        logger.info(
+            event="Reingest: START",
+            table=model.__tablename__,
+            request_type=request_type,
+            start=start,
+            end=end,
+        )
+
+        all_requests = self.request_builder.build_requests(
+            start=start,
+            end=end,
+            chunk_months=chunk_months,
+            request_types=[request_type],
+        )
+        if not all_requests:
+            logger.warning(event="No requests to reingest.", request_type=request_type)
+            return []
+        # so that unchanged raw data is transformed again, and reset requests are planned again
+        # by the next downloads if the re-ingest is aborted
+        repository.reset_statuses(
+            name=type(all_requests[0]).__name__,
+            start=start,
+            end=end,
+            filters={"request_type": request_type},
+        )
+        repository.create_staging_table(model)
+        worker_setup = WorkerSetup(
+            fetcher_factory=self.worker_setup.fetcher_factory,
+            processor_factory=self.worker_setup.processor_factory,
+            repository_factory=partial(create_staging_repository, self.repository_factory, model),
+        )
+        try:
+            list_status = self._run_with_retries(
+                all_requests,
+                scheduler=scheduler,
+                n_partitions=n_partitions,
+                retry_policy=retry_policy,
+                cost_model=CostModel.from_repository(repository),
+                handoff_dir=None,
+                worker_setup=worker_setup,
+            )
+            failed_status = [t for t in list_status if t.status == RequestStatusType.FAILURE]
+            if failed_status:
+                logger.error(
+                    event="Failed processing some requests, reingest aborted!",
+                    table=model.__tablename__,
+                    num_failed_request=len(failed_status),
+                )
+                repository.drop_staging_table(model)
+                return list_status
+            count_records = repository.swap_staging_table(model, start=start, end=end)
+        except Exception:
+            repository.drop_staging_table(model)
+            raise
+        logger.info(
+            event="Reingest: END",
+            table=model.__tablename__,
+            total_processed_requests=len(list_status),
+            count_records=count_records,
+        )
+        return list_status
+
+    def _process_request(self, request: BaseRequest, retry_policy: RetryPolicy) -> RequestStatus:
+        """Run all stages of a request in the current process."""
+        df_raw_request = self._download(
+            request,
+            worker_setup=self.worker_setup,
+            retry_policy=retry_policy,
+        )
+        records_request = self._transform(
+            df_raw_request,
+            worker_setup=self.worker_setup,
+            retry_policy=retry_policy,
+        )
+        return self._add_to_repository(
+            records_request,
+            worker_setup=self.worker_setup,
+            retry_policy=retry_policy,
+        )
+
+    def enqueue_requests(
+        self,
+        queue: WorkQueue,
+        start: dt.datetime,
+        end: dt.datetime,
+        chunk_months: int = DEFAULT_MONTHLY_CHUNKS,
+        negative_cache_ttl: dt.timedelta = DEFAULT_NEGATIVE_CACHE_TTL,
+        revalidate_empty: bool = False,
+    ) -> int:
+        """Plan the requests between start and end timestamps, and add them to a work queue.
+
+        Requests already queued (e.g. by an overlapping planner) are not added twice.
+        """
+        repository = self._create_repository()
+        repository.init_db()
+
+        all_new_requests = self._plan_requests(
+            repository,
+            start=start,
+            end=end,
+            chunk_months=chunk_months,
+            negative_cache_ttl=negative_cache_ttl,
+            revalidate_empty=revalidate_empty,
+        )
+        costs = CostModel.from_repository(repository).estimate(all_new_requests)
+        count_enqueued = queue.enqueue(
+            records=[
+                QueuedRequest.from_request(request, priority=cost)
+                for request, cost in zip(all_new_requests, costs, strict=True)
+            ],
+        )
+        logger.info(
+            event="Enqueued requests.",
+            count_requests=len(all_new_requests),
+            count_enqueued_requests=count_enqueued,
+        )
+        return count_enqueued
+
+    def _process_queued_request(
+        self,
+        queue: WorkQueue,
+        queued_request: QueuedRequest,
+        *,
+        owner: str,
+        retry_policy: RetryPolicy,
+        attempts: int,
+    ) -> RequestStatus | None:
+        """Process a claimed request, then ack it or give it back for a later retry."""
+        request = self.request_builder.parse_request(queued_request.request)
+        request.attempts = attempts
+        try:
+            request_status = self._process_request(request, retry_policy=retry_policy)
+        except Exception as e:
+            # e.g. the registry could not be updated, let another attempt handle it
+            logger.error(
+                event="Failed processing queued request!",
+                request=request,
+                error=e,
+            )
+            queue.release(
+                owner=owner,
+                uid=queued_request.uid,
+                not_before=dt.datetime.now(tz=dt.timezone.utc) + retry_policy.delay(attempts + 1),
+            )
+            return None
+        if (
+            request_status.status == RequestStatusType.FAILURE
+            and request_status.next_attempt_at is not None
+            and request_status.attempts < retry_policy.max_attempts
+        ):
+            queue.release(
+                owner=owner,
+                uid=queued_request.uid,
+                not_before=request_status.next_attempt_at,
+            )
+        else:
+            queue.ack(owner=owner, uid=queued_request.uid)
+        return request_status
+
+    def run_queue_worker(
+        self,
+        queue: WorkQueue,
+        *,
+        batch_size: int = DEFAULT_QUEUE_BATCH_SIZE,
+        n_threads: int = 1,
+        lease: dt.timedelta = DEFAULT_QUEUE_LEASE,
+        poll_interval_secs: float = DEFAULT_QUEUE_POLL_INTERVAL_SECS,
+        exit_when_empty: bool = True,
+        retry_policy: RetryPolicy | None = None,
+    ) -> int:
+        """Claim and process batches of requests from a work queue shared by several workers.
+
+        Leases of the claimed requests are extended by a heartbeat thread while processing,
+        requests of a worker that stopped sending heartbeats are claimed by other workers.
+        Returns the number of processed requests.
+        """
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        repository = self._create_repository()
+        in_flight: set[str] = set()
+        in_flight_lock = threading.Lock()
+        stop_heartbeat = threading.Event()
+
+        def _heartbeat() -> None:
+            while not stop_heartbeat.wait(lease.total_seconds() / 3):
+                with in_flight_lock:
+                    uids = list(in_flight)
+                try:
+                    queue.heartbeat(owner=owner, uids=uids, lease=lease)
+                except Exception as e:
+                    logger.error(event="Failed sending heartbeat!", owner=owner, error=e)
+
+        heartbeat_thread = threading.Thread(target=_heartbeat, daemon=True)
+        heartbeat_thread.start()
+        logger.info(event="Queue worker: START", owner=owner, n_threads=n_threads)
+
+        count_processed = 0
+        try:
+            with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                while True:
+                    claimed = queue.claim(owner=owner, batch_size=batch_size, lease=lease)
+                    if not claimed:
+                        if exit_when_empty and queue.count() == 0:
+                            break
+                        # remaining requests are claimed by others or not due yet
+                        time.sleep(poll_interval_secs)
+                        continue
+                    with in_flight_lock:
+                        in_flight.update(t.uid for t in claimed)
+                    attempts_by_uid = dict(
+                        repository.query(
+                            statement=select(RequestStatus.uid, RequestStatus.attempts).where(
+                                RequestStatus.uid.in_([t.uid for t in claimed]),
+                            ),
+                            return_df=False,
+                        ),
+                    )
+
+                    def _process(
+                        queued_request: QueuedRequest,
+                        attempts_by_uid: dict[str, int] = attempts_by_uid,
+                    ) -> RequestStatus | None:
+                        try:
+                            return self._process_queued_request(
+                                queue,
+                                queued_request,
+                                owner=owner,
+                                retry_policy=retry_policy,
+                                attempts=attempts_by_uid.get(queued_request.uid) or 0,
+                            )
+                        finally:
+                            with in_flight_lock:
+                                in_flight.discard(queued_request.uid)
+
+                    list_status = list(executor.map(_process, claimed))
+                    count_processed += len(list_status)
+                    logger.info(
+                        event="Processed batch of queued requests.",
+                        owner=owner,
+                        count_requests=len(list_status),
+                        count_failed_requests=len(
+                            [
+                                t
+                                for t in list_status
+                                if t is None or t.status == RequestStatusType.FAILURE
+                            ],
+                        ),
+                    )
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+        logger.info(event="Queue worker: END", owner=owner, count_processed=count_processed)
+        return count_processed
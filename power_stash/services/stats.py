@@ -0,0 +1,83 @@
+import datetime as dt
+
+import pandas as pd
+from sqlmodel import select
+
+from power_stash.models.request import RequestStatusType
+from power_stash.models.storage.database import DatabaseRepository, RequestStatus
+
+# groups of requests by default, `month` being the month of the start of the requests
+DEFAULT_GROUP_BY = ("area", "request_type", "month")
+
+MONTH = "month"
+
+SUMMED_METRICS = (
+    "attempts",
+    "duration_secs",
+    "fetch_duration_secs",
+    "transform_duration_secs",
+    "store_duration_secs",
+    "payload_bytes",
+    "row_count",
+    "changed_row_count",
+)
+
+
+def load_statuses(
+    repository: DatabaseRepository,
+    *,
+    start: dt.datetime | None = None,
+    end: dt.datetime | None = None,
+) -> pd.DataFrame:
+    """Load the statuses of the requests starting between start and end, one row per request.
+
+    The fields of the requests (e.g. area and request type) are added as columns, as well as
+    the month of their start.
+    """
+    statement = select(RequestStatus)
+    if start is not None:
+        statement = statement.where(RequestStatus.start >= start)
+    if end is not None:
+        statement = statement.where(RequestStatus.start < end)
+    statuses = repository.query(statement=statement, return_df=False)
+    df = pd.DataFrame([t.model_dump() for t in statuses])
+    if df.empty:
+        return df
+    request_fields = pd.DataFrame(df.pop("request").tolist(), index=df.index)
+    # fields of the status take precedence (e.g. start and end)
+    df = df.join(request_fields[request_fields.columns.difference(df.columns)])
+    df[MONTH] = pd.to_datetime(df["start"], utc=True).dt.strftime("%Y-%m")
+    return df
+
+
+def summarise_statuses(
+    df: pd.DataFrame,
+    group_by: list[str] | tuple[str, ...] = DEFAULT_GROUP_BY,
+) -> pd.DataFrame:
+    """Aggregate the resources used by requests, by group, most expensive groups first.
+
+    Durations, bytes, rows and attempts are summed, peak memories are the max of the group.
+    Throughputs are computed over the requests with a measured duration.
+    """
+    missing_columns = [t for t in group_by if t not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Unknown request fields {missing_columns}.")
+    df = df.assign(
+        is_failure=df["status"] == RequestStatusType.FAILURE,
+        # groups of requests without a field (e.g. other request types) are kept
+        **{t: df[t].fillna("") for t in group_by},
+    )
+    stats = df.groupby(list(group_by)).agg(
+        count_requests=("uid", "count"),
+        count_failed_requests=("is_failure", "sum"),
+        **{t: (t, "sum") for t in SUMMED_METRICS},
+        peak_memory_growth_bytes=("peak_memory_growth_bytes", "max"),
+        traced_peak_bytes=("traced_peak_bytes", "max"),
+    )
+    stats["rows_per_sec"] = stats["row_count"] / stats["duration_secs"].where(
+        stats["duration_secs"] > 0,
+    )
+    stats["payload_bytes_per_sec"] = stats["payload_bytes"] / stats["fetch_duration_secs"].where(
+        stats["fetch_duration_secs"] > 0,
+    )
+    return stats.sort_values("duration_secs", ascending=False)
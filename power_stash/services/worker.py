@@ -0,0 +1,72 @@
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable
+
+import structlog
+
+from power_stash.models.fetcher import FetcherInterface
+from power_stash.models.processor import BaseProcessor
+from power_stash.models.storage.database import DatabaseRepository
+
+logger = structlog.get_logger()
+
+
+class WorkerResources:
+    """Resources (fetcher, processor, repository) shared by all the tasks of a worker process."""
+
+    def __init__(
+        self,
+        *,
+        fetcher: FetcherInterface,
+        processor: BaseProcessor,
+        repository: DatabaseRepository,
+    ) -> None:
+        self.fetcher = fetcher
+        self.processor = processor
+        self.repository = repository
+
+
+@dataclass(frozen=True)
+class WorkerSetup:
+    """Lightweight and picklable recipe to build the resources of a worker.
+
+    Only the factories are shipped with the tasks, the resources themselves (HTTP sessions,
+    database engines, ...) are built once per worker process on first use.
+    """
+
+    fetcher_factory: Callable[[], FetcherInterface] = field(compare=False)
+    processor_factory: Callable[[], BaseProcessor] = field(compare=False)
+    repository_factory: Callable[[], DatabaseRepository] = field(compare=False)
+    key: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    def build(self) -> WorkerResources:
+        """Build the resources of a worker."""
+        return WorkerResources(
+            fetcher=self.fetcher_factory(),
+            processor=self.processor_factory(),
+            repository=self.repository_factory(),
+        )
+
+
+# resources of the current process, by WorkerSetup.key
+_worker_resources: dict[str, WorkerResources] = {}
+_worker_resources_lock = threading.Lock()
+
+
+def get_worker_resources(setup: WorkerSetup) -> WorkerResources:
+    """Return the resources of the current worker process, building them on first use."""
+    resources = _worker_resources.get(setup.key)
+    if resources is not None:
+        return resources
+    with _worker_resources_lock:
+        # double check, another thread of the same worker might have built them already
+        resources = _worker_resources.get(setup.key)
+        if resources is None:
+            resources = setup.build()
+            _worker_resources[setup.key] = resources
+            logger.debug(
+                event="Built worker resources.",
+                key=setup.key,
+            )
+    return resources
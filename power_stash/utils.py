@@ -1,8 +1,16 @@
-from datetime import datetime
-from typing import List, Tuple
+import hashlib
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, List, Tuple
 
 from dateutil.relativedelta import relativedelta
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
 
 def generate_monthly_datetime_chunks(
     start: datetime,
@@ -19,3 +27,56 @@ def generate_monthly_datetime_chunks(
         chunks.append((current_start, current_end))
         current_start = current_end
     return chunks
+
+
+def floor_timestamp(timestamp: datetime, interval: timedelta) -> datetime:
+    """Floor a timestamp to a multiple of interval (since epoch, UTC)."""
+    return timestamp - (timestamp - EPOCH) % interval
+
+
+def measure_import_time(module: str) -> tuple[float, list[tuple[str, float]]]:
+    """Measure the import time of a module in a fresh interpreter.
+
+    Returns the cumulative import time in seconds, and the list of imported modules with their
+    own (self) import time in seconds, sorted by decreasing cost.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],  # noqa: S603
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    self_times = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|", maxsplit=2)
+        name = name.strip()
+        self_times.append((name, int(self_us) / 1e6))
+        if name == module:
+            total_us = int(cumulative_us)
+    self_times.sort(key=lambda x: x[1], reverse=True)
+    return total_us / 1e6, self_times
+
+
+def fingerprint_frame(df: "pd.DataFrame") -> str:
+    """Hash the content of a DataFrame (columns, index and values) to detect changes."""
+    import pandas as pd
+
+    row_hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    hasher = hashlib.sha1(usedforsecurity=False)
+    hasher.update(repr(list(df.columns)).encode("utf-8"))
+    hasher.update(row_hashes.tobytes())
+    return hasher.hexdigest()
+
+
+def peak_memory_bytes() -> int | None:
+    """Peak resident memory of the current process, None where not available (e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -0,0 +1,145 @@
+import datetime as dt
+import json
+import threading
+from concurrent.futures import wait
+from pathlib import Path
+
+import pytest
+from entsoe.mappings import Area
+
+from power_stash.inputs.entsoe.request import EntsoeRequest, RequestType
+from power_stash.models.request import PollingSchedule, RequestStatusType
+from power_stash.models.storage.database import RequestStatus
+from power_stash.services.daemon import PollingDaemon
+from power_stash.services.retry import RetryPolicy
+
+NOW = dt.datetime(2024, 6, 1, 12, tzinfo=dt.timezone.utc)
+
+SCHEDULE = PollingSchedule(
+    name="consumption",
+    interval=dt.timedelta(hours=1),
+    lookback=dt.timedelta(hours=3),
+    request_fields={"request_type": RequestType.CONSUMPTION},
+)
+
+AREAS = [Area.FR, Area.BE, Area.NL]
+
+
+class StubRequestBuilder:
+    def polling_schedules(self) -> list[PollingSchedule]:
+        return [SCHEDULE]
+
+    def build_matching_requests(self, start, end, request_fields, chunk_months=None):  # noqa: ARG002
+        return [EntsoeRequest(area=area, start=start, end=end, **request_fields) for area in AREAS]
+
+
+class StubRepository:
+    def __init__(self, statuses: list[RequestStatus]) -> None:
+        self.statuses = statuses
+        self.records: list[RequestStatus] = []
+
+    def query(self, *, statement, return_df=False):  # noqa: ARG002
+        return self.statuses
+
+    def add_or_update(self, record: RequestStatus) -> None:
+        self.records.append(record)
+
+
+class StubService:
+    """Service processing requests once released, in the threads of the daemon."""
+
+    def __init__(self, statuses: list[RequestStatus] | None = None) -> None:
+        self.request_builder = StubRequestBuilder()
+        self.repository = StubRepository(statuses or [])
+        self.started = threading.Event()
+        self.released = threading.Event()
+        self.processed: list[EntsoeRequest] = []
+
+    def _create_repository(self) -> StubRepository:
+        return self.repository
+
+    def _process_request(self, request, retry_policy: RetryPolicy) -> RequestStatus:  # noqa: ARG002
+        self.started.set()
+        self.released.wait(timeout=10)
+        self.processed.append(request)
+        request.status = RequestStatusType.SUCCESS
+        return RequestStatus.from_request(request)
+
+
+@pytest.fixture()
+def state_path(tmp_path: Path) -> Path:
+    return tmp_path / "daemon_state.json"
+
+
+def test_complete_poll_advances_cursor(state_path: Path):
+    service = StubService()
+    daemon = PollingDaemon(service, n_threads=2, state_path=state_path)
+    service.released.set()
+    daemon._poll(SCHEDULE, poll_at=NOW)
+    _, futures = daemon.in_flight[SCHEDULE.name]
+    wait(futures)
+    daemon._collect()
+    daemon.executor.shutdown()
+
+    assert daemon.in_flight == {}
+    assert daemon.cursors == {SCHEDULE.name: NOW}
+    assert json.loads(state_path.read_text())["cursors"] == {SCHEDULE.name: NOW.isoformat()}
+
+
+def test_shutdown_with_in_flight_requests(state_path: Path):
+    service = StubService()
+    daemon = PollingDaemon(service, n_threads=1, state_path=state_path, shutdown_timeout_secs=10)
+    daemon._poll(SCHEDULE, poll_at=NOW)
+    assert service.started.wait(timeout=10)
+
+    # the running request completes within the grace period, the pending ones are cancelled
+    threading.Timer(0.1, service.released.set).start()
+    daemon._checkpoint()
+    daemon.executor.shutdown(wait=True)
+
+    assert [t.area for t in service.processed] == AREAS[:1]
+    interrupted = service.repository.records
+    assert sorted(t.request["area"] for t in interrupted) == sorted(t.value for t in AREAS[1:])
+    assert all(t.status == RequestStatusType.FAILURE for t in interrupted)
+    assert all(t.last_error == "Interrupted" for t in interrupted)
+    # the window is polled again by the next run
+    assert daemon.cursors == {}
+    assert json.loads(state_path.read_text()) == {"cursors": {}}
+
+
+def test_shutdown_past_grace_period(state_path: Path):
+    service = StubService()
+    daemon = PollingDaemon(service, n_threads=1, state_path=state_path, shutdown_timeout_secs=0.1)
+    daemon._poll(SCHEDULE, poll_at=NOW)
+    assert service.started.wait(timeout=10)
+
+    # the running request doesn't complete within the grace period
+    daemon._checkpoint()
+    service.released.set()
+    daemon.executor.shutdown(wait=True)
+
+    interrupted = service.repository.records
+    assert sorted(t.request["area"] for t in interrupted) == sorted(t.value for t in AREAS)
+    assert daemon.cursors == {}
+
+
+def test_poll_skips_requests_known_to_be_empty(state_path: Path):
+    empty_request = StubRequestBuilder().build_matching_requests(
+        start=NOW - dt.timedelta(days=1),
+        end=NOW + dt.timedelta(days=1),
+        request_fields=SCHEDULE.request_fields,
+    )[0]
+    status = RequestStatus.from_request(empty_request)
+    status.status = RequestStatusType.NO_DATA
+    status.updated_at = dt.datetime.now(tz=dt.timezone.utc)
+    service = StubService(statuses=[status])
+    daemon = PollingDaemon(service, n_threads=2, state_path=state_path)
+    service.released.set()
+    daemon._poll(SCHEDULE, poll_at=NOW)
+    _, futures = daemon.in_flight[SCHEDULE.name]
+    wait(futures)
+    daemon.executor.shutdown()
+
+    assert sorted(t.area.name for t in service.processed) == sorted(
+        t.name for t in AREAS if t != empty_request.area
+    )
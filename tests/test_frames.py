@@ -0,0 +1,52 @@
+import datetime as dt
+
+import pandas as pd
+from entsoe.mappings import Area
+
+from power_stash.inputs.entsoe.models import EntsoeHourlyConsumption
+from power_stash.services.frames import concat_frames, records_to_frame
+
+CET = dt.timezone(dt.timedelta(hours=1))
+
+
+def make_records(area: Area, values: list[float | None]) -> list[EntsoeHourlyConsumption]:
+    return [
+        EntsoeHourlyConsumption(
+            timestamp=dt.datetime(2024, 1, 1, hour, tzinfo=CET),
+            value=value,
+            unit="MW",
+            area=area,
+        )
+        for hour, value in enumerate(values)
+    ]
+
+
+def test_records_to_frame():
+    df = records_to_frame(make_records(Area.FR, [1.0, None]))
+    # metadata fields of the records are dropped
+    assert list(df.columns) == ["timestamp", "value", "unit", "area"]
+    assert df["timestamp"].tolist() == [
+        pd.Timestamp("2023-12-31 23:00", tz="UTC"),
+        pd.Timestamp("2024-01-01 00:00", tz="UTC"),
+    ]
+    assert df["area"].dtype == "category"
+    assert df["area"].tolist() == ["FR", "FR"]
+    assert df["unit"].dtype == "category"
+    assert df["value"].isna().tolist() == [False, True]
+
+
+def test_records_without_values():
+    df = records_to_frame(make_records(Area.FR, [None, None]))
+    assert df["value"].dtype == "float64"
+
+
+def test_concat_frames_keeps_categories():
+    df = concat_frames(
+        [
+            records_to_frame(make_records(Area.FR, [1.0])),
+            records_to_frame(make_records(Area.DE_LU, [2.0])),
+        ],
+    )
+    assert df["area"].dtype == "category"
+    assert df["area"].tolist() == ["FR", "DE_LU"]
+    assert df["value"].tolist() == [1.0, 2.0]
@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import create_engine
+
+from power_stash.models.storage.labels import (
+    AreaLabel,
+    EncodedLabel,
+    bind_label_cache,
+    get_label_cache,
+)
+
+
+def test_label_caches_by_database():
+    first_engine = create_engine("sqlite:///first.db")
+    other_engine = create_engine("sqlite:///other.db")
+    first_cache = bind_label_cache(first_engine, loader=lambda _: {"FR": 1})
+    other_cache = bind_label_cache(other_engine, loader=lambda _: {"FR": 2})
+    # engines of the same database share their cache, and its loader
+    assert bind_label_cache(create_engine("sqlite:///first.db"), loader=dict) is first_cache
+
+    column_type = EncodedLabel(AreaLabel)
+    assert column_type.process_bind_param("FR", first_engine.dialect) == 1
+    assert column_type.process_bind_param("FR", other_engine.dialect) == 2
+    assert column_type.process_result_value(2, other_engine.dialect) == "FR"
+    assert get_label_cache(other_engine.dialect) is other_cache
+
+
+def test_unbound_engine():
+    with pytest.raises(KeyError):
+        EncodedLabel(AreaLabel).process_bind_param("FR", create_engine("sqlite://").dialect)
@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+# modules the CLI defers to the commands needing them, c.f. `power_stash.main`.
+HEAVY_MODULES = {"dask", "distributed", "entsoe", "sqlmodel"}
+
+SHOW_HELP = """
+import runpy
+import sys
+
+sys.argv = ["power_stash", "--help"]
+try:
+    runpy.run_module("power_stash.main", run_name="__main__")
+except SystemExit as e:
+    assert not e.code, e.code
+print(",".join(sorted({name.split(".")[0] for name in sys.modules})))
+"""
+
+
+def test_help_does_not_import_heavy_modules():
+    completed = subprocess.run(
+        [sys.executable, "-c", SHOW_HELP],  # noqa: S603
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported_modules = set(completed.stdout.strip().splitlines()[-1].split(","))
+    assert "power_stash" in imported_modules
+    assert not imported_modules & HEAVY_MODULES
@@ -0,0 +1,53 @@
+import datetime as dt
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from power_stash.outputs.localfs.manifest import FileManifest, ManifestEntry, file_checksum
+
+pytest.importorskip("pyarrow")
+
+
+def write_frame(path: Path, start: str, periods: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    timestamps = pd.date_range(start, periods=periods, freq="h", tz="UTC")
+    pd.DataFrame({"timestamp": timestamps, "value": range(periods)}).to_parquet(path)
+
+
+def test_rebuild(tmp_path: Path):
+    folder = tmp_path / "store"
+    manifest = FileManifest(tmp_path / "manifest.sqlite")
+    first, other = folder / "2024" / "01.parquet", folder / "2024" / "02.parquet"
+    write_frame(first, "2024-01-01", periods=24)
+    write_frame(other, "2024-02-01", periods=48)
+    # a partially written file, and an entry of a file removed outside the store
+    partial = folder / "2024" / "03.parquet"
+    partial.write_bytes(b"PAR1")
+    manifest.add([ManifestEntry(path=folder / "removed.parquet", size_bytes=1)])
+
+    assert manifest.rebuild(folder) == (3, 1)
+    assert manifest.get(folder / "removed.parquet") is None
+    assert manifest.get(first) == ManifestEntry(
+        path=first.resolve(),
+        size_bytes=first.stat().st_size,
+        row_count=24,
+        min_timestamp=dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc),
+        max_timestamp=dt.datetime(2024, 1, 1, 23, tzinfo=dt.timezone.utc),
+        checksum=file_checksum(first),
+    )
+    assert manifest.get(partial) == ManifestEntry(path=partial.resolve(), size_bytes=4)
+    feb = manifest.list_files(
+        folder / "2024",
+        start=dt.datetime(2024, 2, 1, 12, tzinfo=dt.timezone.utc),
+        end=dt.datetime(2024, 2, 2, tzinfo=dt.timezone.utc),
+    )
+    assert [t.path for t in feb] == [other.resolve()]
+
+
+def test_rebuild_keeps_other_folders(tmp_path: Path):
+    manifest = FileManifest(tmp_path / "manifest.sqlite")
+    other_folder = tmp_path / "other"
+    manifest.add([ManifestEntry(path=other_folder / "01.parquet", size_bytes=1)])
+    assert manifest.rebuild(tmp_path / "store") == (0, 0)
+    assert manifest.total_size(other_folder) == 1
@@ -0,0 +1,54 @@
+import datetime as dt
+
+import pytest
+
+from power_stash.inputs.entsoe.request import Area, EntsoeRequest, RequestType
+from power_stash.models.request import RequestStatusType
+from power_stash.services.memory import (
+    MEBIBYTE,
+    MemoryBudget,
+    MemoryBudgetExceededError,
+    split_request,
+)
+
+
+def make_request(start: dt.datetime, end: dt.datetime) -> EntsoeRequest:
+    return EntsoeRequest(
+        area=Area.FR,
+        request_type=RequestType.GENERATION,
+        start=start,
+        end=end,
+    )
+
+
+def test_split_request_in_halves():
+    request = make_request(
+        dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc),
+        dt.datetime(2024, 1, 4, 1, tzinfo=dt.timezone.utc),
+    )
+    request.status = RequestStatusType.FAILURE
+    request.attempts = 2
+    halves = split_request(request)
+    # halves meet on a whole hour
+    middle = dt.datetime(2024, 1, 2, 12, tzinfo=dt.timezone.utc)
+    assert [(t.start, t.end) for t in halves] == [
+        (request.start, middle),
+        (middle, request.end),
+    ]
+    assert all(t.area == request.area and t.request_type == request.request_type for t in halves)
+    assert all(t.status is None and t.attempts == 0 for t in halves)
+
+
+def test_split_request_too_short():
+    request = make_request(
+        dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc),
+        dt.datetime(2024, 1, 2, 12, tzinfo=dt.timezone.utc),
+    )
+    assert split_request(request, min_span=dt.timedelta(days=1)) == []
+
+
+def test_budget_check():
+    budget = MemoryBudget(max_bytes=100 * MEBIBYTE, expansion_ratio=4.0)
+    budget.check(25 * MEBIBYTE)
+    with pytest.raises(MemoryBudgetExceededError):
+        budget.check(26 * MEBIBYTE)
@@ -0,0 +1,88 @@
+import datetime as dt
+
+from entsoe.mappings import Area
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from power_stash.inputs.entsoe.request import EntsoeRequest, RequestType
+from power_stash.models.request import RequestStatusType
+from power_stash.models.storage.database import RequestStatus
+from power_stash.services.negative_cache import NegativeCache
+
+NOW = dt.datetime(2024, 6, 1, tzinfo=dt.timezone.utc)
+TTL = dt.timedelta(days=30)
+
+
+def make_request(month: int, area: Area = Area.FR) -> EntsoeRequest:
+    return EntsoeRequest(
+        area=area,
+        request_type=RequestType.GENERATION,
+        start=dt.datetime(2024, month, 1, tzinfo=dt.timezone.utc),
+        end=dt.datetime(2024, month + 1, 1, tzinfo=dt.timezone.utc),
+    )
+
+
+def make_status(
+    request: EntsoeRequest,
+    status: RequestStatusType,
+    age: dt.timedelta,
+) -> RequestStatus:
+    request_status = RequestStatus.from_request(request)
+    request_status.status = status
+    request_status.updated_at = NOW - age
+    return request_status
+
+
+def test_empty_range_skipped_within_ttl():
+    statuses = [make_status(make_request(1), RequestStatusType.NO_DATA, dt.timedelta(days=1))]
+    cache = NegativeCache.from_statuses(statuses, ttl=TTL, now=NOW)
+    assert cache.is_known_empty(make_request(1))
+    assert not cache.is_known_empty(make_request(2))
+    assert not cache.is_known_empty(make_request(1, area=Area.DE_LU))
+
+
+def test_empty_range_revalidated_after_ttl():
+    statuses = [make_status(make_request(1), RequestStatusType.NO_DATA, dt.timedelta(days=31))]
+    cache = NegativeCache.from_statuses(statuses, ttl=TTL, now=NOW)
+    assert not cache.is_known_empty(make_request(1))
+
+
+def test_combination_empty_after_several_requests():
+    statuses = [
+        make_status(make_request(month), RequestStatusType.NO_DATA, dt.timedelta(days=1))
+        for month in (1, 2, 3)
+    ]
+    cache = NegativeCache.from_statuses(statuses, ttl=TTL, now=NOW, min_empty_requests=3)
+    # never published anything, even outside the known empty ranges
+    assert cache.is_known_empty(make_request(5))
+    assert cache.filter_requests([make_request(5), make_request(5, area=Area.DE_LU)]) == [
+        make_request(5, area=Area.DE_LU),
+    ]
+
+
+def test_combination_with_data_not_skipped():
+    statuses = [
+        make_status(make_request(month), RequestStatusType.NO_DATA, dt.timedelta(days=1))
+        for month in (1, 2, 3)
+    ]
+    statuses.append(make_status(make_request(4), RequestStatusType.SUCCESS, dt.timedelta(0)))
+    cache = NegativeCache.from_statuses(statuses, ttl=TTL, now=NOW, min_empty_requests=3)
+    assert not cache.is_known_empty(make_request(5))
+
+
+def test_skip_condition_revalidates_expired_empty_requests():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine, tables=[RequestStatus.__table__])
+    recent = make_status(make_request(1), RequestStatusType.NO_DATA, dt.timedelta(days=1))
+    expired = make_status(make_request(2), RequestStatusType.NO_DATA, dt.timedelta(days=31))
+    success = make_status(make_request(3), RequestStatusType.SUCCESS, dt.timedelta(days=31))
+    with Session(engine) as session:
+        session.add_all([recent, expired, success])
+        session.commit()
+
+        def skipped_uids(no_data_ttl: dt.timedelta | None) -> set[str]:
+            condition = RequestStatus.skip_condition(now=NOW, no_data_ttl=no_data_ttl)
+            return set(session.exec(select(RequestStatus.uid).where(condition)).all())
+
+        assert skipped_uids(None) == {recent.uid, expired.uid, success.uid}
+        assert skipped_uids(TTL) == {recent.uid, success.uid}
+        assert skipped_uids(dt.timedelta(0)) == {success.uid}
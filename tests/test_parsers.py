@@ -0,0 +1,86 @@
+import entsoe.parsers
+import pandas as pd
+import pytest
+
+from power_stash.inputs.entsoe.parsers import parse_generation
+
+# entsoe-py parses XML documents with the HTML parser of BeautifulSoup
+pytestmark = pytest.mark.filterwarnings("ignore::bs4.XMLParsedAsHTMLWarning")
+
+NAMESPACE = "urn:iec62325.351:tc57wg16:451-6:generationloaddocument:3:0"
+
+
+def make_timeseries(
+    psr_type: str,
+    resolution: str,
+    points: list[tuple[int, float]],
+    curve_type: str = "A01",
+    consumption: bool = False,
+) -> str:
+    domain = "outBiddingZone_Domain.mRID" if consumption else "inBiddingZone_Domain.mRID"
+    return f"""
+    <TimeSeries>
+        <mRID>1</mRID>
+        <businessType>A01</businessType>
+        <objectAggregation>A08</objectAggregation>
+        <{domain} codingScheme="A01">10YFR-RTE------C</{domain}>
+        <quantity_Measure_Unit.name>MAW</quantity_Measure_Unit.name>
+        <curveType>{curve_type}</curveType>
+        <MktPSRType>
+            <psrType>{psr_type}</psrType>
+        </MktPSRType>
+        <Period>
+            <timeInterval>
+                <start>2024-01-01T00:00Z</start>
+                <end>2024-01-01T04:00Z</end>
+            </timeInterval>
+            <resolution>{resolution}</resolution>
+            {"".join(
+                f"<Point><position>{p}</position><quantity>{v}</quantity></Point>"
+                for p, v in points
+            )}
+        </Period>
+    </TimeSeries>"""
+
+
+def make_document(*timeseries: str) -> str:
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+    <GL_MarketDocument xmlns="{NAMESPACE}">
+        <mRID>1</mRID>
+        <type>A75</type>
+        <time_Period.timeInterval>
+            <start>2024-01-01T00:00Z</start>
+            <end>2024-01-01T04:00Z</end>
+        </time_Period.timeInterval>
+        {"".join(timeseries)}
+    </GL_MarketDocument>"""
+
+
+DOCUMENTS = {
+    "hourly": make_document(
+        make_timeseries("B16", "PT60M", [(1, 0), (2, 10.5), (3, 20), (4, 5)]),
+        make_timeseries("B19", "PT60M", [(1, 100), (2, 110), (3, 90), (4, 80)]),
+    ),
+    "quarter-hourly": make_document(
+        make_timeseries("B14", "PT15M", [(t, 1000.0 + t) for t in range(1, 17)]),
+    ),
+    "curve A03 with missing positions": make_document(
+        make_timeseries("B19", "PT60M", [(1, 100), (3, 90)], curve_type="A03"),
+    ),
+    "generation and consumption": make_document(
+        make_timeseries("B10", "PT60M", [(1, 300), (2, 310), (3, 0), (4, 0)]),
+        make_timeseries("B10", "PT60M", [(1, 0), (2, 0), (3, 250), (4, 260)], consumption=True),
+    ),
+}
+
+
+@pytest.mark.parametrize("name", DOCUMENTS)
+@pytest.mark.parametrize("nett", [False, True])
+def test_parse_generation_as_entsoe_py(name: str, nett: bool):
+    expected = entsoe.parsers.parse_generation(DOCUMENTS[name], nett=nett)
+    actual = parse_generation(DOCUMENTS[name], nett=nett)
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_parse_empty_document():
+    assert parse_generation(make_document()).empty
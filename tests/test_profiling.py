@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+from typing import Iterator
+
+from power_stash.services.profiling import StageProfiler, profiled_as
+
+
+@profiled_as("transform")
+def transform_batches(profiler: StageProfiler) -> Iterator[int]:
+    profiler._sample()
+    yield 1
+
+
+def store(profiler: StageProfiler, batches: Iterator[int]) -> None:
+    with profiler.stage("store", entry_frame=sys._getframe()):
+        for _ in batches:
+            profiler._sample()
+
+
+def test_deferred_work_counted_under_its_stage(tmp_path: Path):
+    profiler = StageProfiler(tmp_path, interval_secs=3600)
+    store(profiler, transform_batches(profiler))
+    stages = {stack.split(";")[0]: stack for stack in profiler.samples}
+    assert set(stages) == {"transform", "store"}
+    # the stack of deferred work starts from the tagged function
+    assert stages["transform"].split(";")[1] == f"{__name__}.transform_batches"
+    assert "transform_batches" not in stages["store"]
@@ -0,0 +1,129 @@
+import datetime as dt
+from typing import ClassVar
+
+import pytest
+from entsoe.mappings import Area
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from power_stash.inputs.entsoe.models import EntsoeHourlyConsumption
+from power_stash.inputs.entsoe.request import EntsoeRequest, RequestType
+from power_stash.models.request import RequestStatusType
+from power_stash.models.storage.database import RequestStatus
+from power_stash.outputs.database import repository as repository_module
+from power_stash.outputs.database.repository import SqlRepository, deduplicate_records
+
+TIMESTAMP = dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def make_record(hour: int, value: float) -> EntsoeHourlyConsumption:
+    return EntsoeHourlyConsumption(
+        timestamp=TIMESTAMP + dt.timedelta(hours=hour),
+        value=value,
+        unit="MW",
+        area=Area.FR,
+    )
+
+
+class RecordingSession:
+    """Session recording the statements executed, instead of sending them to a database."""
+
+    statements: ClassVar[list] = []
+
+    def __init__(self, engine: object) -> None:
+        self.engine = engine
+
+    def __enter__(self) -> "RecordingSession":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        pass
+
+    def execute(self, statement: object) -> object:
+        self.statements.append(statement)
+        return type("Result", (), {"rowcount": 1})()
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+
+@pytest.fixture()
+def repository(monkeypatch: pytest.MonkeyPatch) -> SqlRepository:
+    RecordingSession.statements = []
+    monkeypatch.setattr(repository_module, "Session", RecordingSession)
+    repository = SqlRepository.__new__(SqlRepository)
+    repository.staging_tables = {}
+    monkeypatch.setattr(repository, "register_labels", lambda **_: None)
+    return repository
+
+
+def inserted_values(statement: object) -> list[tuple]:
+    """(uid, value) of the rows inserted by a multi-values statement."""
+    params = statement.compile(dialect=postgresql.dialect()).params
+    count_rows = len([k for k in params if k.startswith("uid_m")])
+    return [(params[f"uid_m{i}"], params[f"value_m{i}"]) for i in range(count_rows)]
+
+
+def test_deduplicate_records_keeps_the_last():
+    first, other, revised = make_record(0, 1.0), make_record(1, 2.0), make_record(0, 3.0)
+    assert deduplicate_records([first, other, revised], ["uid", "timestamp"]) == [
+        revised,
+        other,
+    ]
+
+
+def test_bulk_add_with_duplicated_record(repository: SqlRepository):
+    records = [make_record(0, 1.0), make_record(1, 2.0), make_record(0, 3.0)]
+    repository.bulk_add(records=records, engine=object())
+
+    (statement,) = RecordingSession.statements
+    assert inserted_values(statement) == [(records[2].uid, 3.0), (records[1].uid, 2.0)]
+
+
+def test_reset_statuses_overlapping_period():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine, tables=[RequestStatus.__table__])
+    repository = SqlRepository.__new__(SqlRepository)
+    repository._engine = engine
+
+    def make_status(start_day: int, end_day: int, request_type: RequestType) -> RequestStatus:
+        request = EntsoeRequest(
+            area=Area.FR,
+            request_type=request_type,
+            start=TIMESTAMP + dt.timedelta(days=start_day),
+            end=TIMESTAMP + dt.timedelta(days=end_day),
+        )
+        request.status = RequestStatusType.SUCCESS
+        request.attempts = 1
+        return RequestStatus.from_request(request)
+
+    statuses = {
+        "before": make_status(0, 7, RequestType.GENERATION),
+        "across start": make_status(7, 14, RequestType.GENERATION),
+        "within": make_status(14, 21, RequestType.GENERATION),
+        "across end": make_status(21, 28, RequestType.GENERATION),
+        "after": make_status(28, 35, RequestType.GENERATION),
+        "other type": make_status(14, 21, RequestType.CONSUMPTION),
+    }
+    uids = {name: status.uid for name, status in statuses.items()}
+    with Session(engine) as session:
+        session.add_all(statuses.values())
+        session.commit()
+
+    # a period within chunks of a week, not on their boundaries
+    count_statuses = repository.reset_statuses(
+        name="EntsoeRequest",
+        start=TIMESTAMP + dt.timedelta(days=10),
+        end=TIMESTAMP + dt.timedelta(days=24),
+        filters={"request_type": RequestType.GENERATION.value},
+    )
+    assert count_statuses == 3
+    with Session(engine) as session:
+        reset_uids = set(
+            session.exec(select(RequestStatus.uid).where(RequestStatus.status.is_(None))).all(),
+        )
+    assert reset_uids == {uids[t] for t in ("across start", "within", "across end")}
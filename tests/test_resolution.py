@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from power_stash.inputs.entsoe.resolution import HOURLY, detect_resolutions, resample_hourly
+
+QUARTER_HOURLY = pd.Timedelta(minutes=15)
+
+
+def make_frame() -> pd.DataFrame:
+    index = pd.date_range("2024-01-01", periods=8, freq="15min", tz="UTC")
+    return pd.DataFrame(
+        {
+            "quarter-hourly": np.arange(8, dtype=float),
+            # reported hourly among quarter-hourly columns
+            "hourly": [10.0, np.nan, np.nan, np.nan, 20.0, np.nan, np.nan, np.nan],
+            "single value": [np.nan] * 7 + [5.0],
+        },
+        index=index,
+    )
+
+
+def test_detect_resolutions():
+    resolutions = detect_resolutions(make_frame())
+    assert resolutions.to_dict() == {
+        "quarter-hourly": QUARTER_HOURLY,
+        "hourly": HOURLY,
+        "single value": HOURLY,
+    }
+
+
+def test_detect_resolutions_with_repeated_timestamps():
+    index = pd.DatetimeIndex(
+        ["2024-01-01 00:00", "2024-01-01 00:30", "2024-01-01 00:30", "2024-01-01 01:00"],
+        tz="UTC",
+    )
+    df = pd.DataFrame({"half-hourly": [1.0, 2.0, 2.5, 3.0]}, index=index)
+    assert detect_resolutions(df)["half-hourly"] == pd.Timedelta(minutes=30)
+
+
+def test_resample_hourly():
+    df = make_frame()
+    # an hour without any value is dropped
+    df = pd.concat(
+        [df, pd.DataFrame(index=pd.DatetimeIndex(["2024-01-01 03:00"], tz="UTC"))],
+    )
+    hourly = resample_hourly(df)
+    pd.testing.assert_frame_equal(
+        hourly,
+        pd.DataFrame(
+            {
+                "quarter-hourly": [1.5, 5.5],
+                "hourly": [10.0, 20.0],
+                "single value": [np.nan, 5.0],
+            },
+            index=pd.date_range("2024-01-01", periods=2, freq="h", tz="UTC"),
+        ),
+        check_freq=False,
+    )
@@ -0,0 +1,49 @@
+import datetime as dt
+
+import pytest
+from entsoe.exceptions import InvalidBusinessParameterError
+from requests import HTTPError, Response
+
+from power_stash.services.retry import RetryPolicy, is_permanent_error
+
+NOW = dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def http_error(status_code: int) -> HTTPError:
+    response = Response()
+    response.status_code = status_code
+    return HTTPError(response=response)
+
+
+def test_delay_doubles_up_to_max():
+    policy = RetryPolicy(base_delay_secs=10, max_delay_secs=60)
+    delays = [policy.delay(attempts).total_seconds() for attempts in range(1, 6)]
+    assert delays == [10, 20, 40, 60, 60]
+
+
+def test_next_attempt_at_after_backoff():
+    policy = RetryPolicy(base_delay_secs=10)
+    next_attempt_at = policy.next_attempt_at(attempts=2, error=TimeoutError(), now=NOW)
+    assert next_attempt_at == NOW + dt.timedelta(seconds=20)
+
+
+def test_no_next_attempt_after_permanent_error():
+    policy = RetryPolicy()
+    assert policy.next_attempt_at(attempts=1, error=NotImplementedError(), now=NOW) is None
+
+
+@pytest.mark.parametrize(
+    ("error", "expected"),
+    [
+        (NotImplementedError(), True),
+        (InvalidBusinessParameterError(), True),
+        (http_error(400), True),
+        (http_error(429), False),
+        (http_error(503), False),
+        (ValueError(), False),
+        (TypeError(), False),
+        (ConnectionError(), False),
+    ],
+)
+def test_is_permanent_error(error: BaseException, expected: bool):
+    assert is_permanent_error(error) is expected
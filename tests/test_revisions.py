@@ -0,0 +1,48 @@
+import datetime as dt
+
+from power_stash.inputs.entsoe.request import EntsoeRequestBuilder, RequestType
+from power_stash.models.request import RevisionWindow
+from power_stash.services.service import PowerConsumerService
+
+END = dt.datetime(2024, 3, 10, 13, 30, tzinfo=dt.timezone.utc)
+
+
+def make_service() -> PowerConsumerService:
+    return PowerConsumerService(
+        request_builder=EntsoeRequestBuilder(),
+        fetcher_factory=lambda: None,
+        processor_factory=lambda: None,
+        repository_factory=lambda: None,
+    )
+
+
+def test_window_refreshed_in_a_request_per_area():
+    window = RevisionWindow(
+        name="generation",
+        window=dt.timedelta(days=14),
+        request_fields={"request_type": RequestType.GENERATION},
+    )
+    requests = make_service()._build_revision_requests(END, [window])["generation"]
+    builder = EntsoeRequestBuilder()
+    assert len(requests) == len(builder.areas)
+    assert {t.request_type for t in requests} == {RequestType.GENERATION}
+    assert {(t.start, t.end) for t in requests} == {
+        (
+            dt.datetime(2024, 2, 25, tzinfo=dt.timezone.utc),
+            dt.datetime(2024, 3, 11, tzinfo=dt.timezone.utc),
+        ),
+    }
+
+
+def test_window_split_in_chunks():
+    window = RevisionWindow(
+        name="day-ahead price",
+        window=dt.timedelta(days=3),
+        chunk=dt.timedelta(days=1),
+        request_fields={"request_type": RequestType.DAY_AHEAD_PRICE},
+    )
+    requests = make_service()._build_revision_requests(END, [window])["day-ahead price"]
+    builder = EntsoeRequestBuilder()
+    assert len(requests) == 4 * len(builder.areas)
+    assert sorted({t.start.day for t in requests}) == [7, 8, 9, 10]
+    assert all(t.end - t.start == dt.timedelta(days=1) for t in requests)
@@ -0,0 +1,29 @@
+from power_stash.services.scheduling import balance_partitions
+
+
+def test_longest_requests_first_to_least_loaded_partition():
+    requests = ["a", "b", "c", "d", "e"]
+    costs = [5.0, 4.0, 3.0, 3.0, 3.0]
+    partitions = balance_partitions(requests, costs=costs, n_partitions=2)
+    # partitions by decreasing load: b+c+e=10, a+d=8
+    assert partitions == [["b", "c", "e"], ["a", "d"]]
+
+
+def test_all_requests_assigned_once():
+    requests = list(range(20))
+    costs = [float(t % 7 + 1) for t in requests]
+    partitions = balance_partitions(requests, costs=costs, n_partitions=4)
+    assert len(partitions) == 4
+    assert sorted(t for partition in partitions for t in partition) == requests
+    loads = [sum(costs[t] for t in partition) for partition in partitions]
+    assert loads == sorted(loads, reverse=True)
+    assert loads[0] - loads[-1] <= max(costs)
+
+
+def test_no_more_partitions_than_requests():
+    partitions = balance_partitions(["a", "b"], costs=[1.0, 1.0], n_partitions=8)
+    assert partitions == [["a"], ["b"]]
+
+
+def test_no_requests():
+    assert balance_partitions([], costs=[], n_partitions=4) == []